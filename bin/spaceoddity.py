@@ -21,7 +21,8 @@ etc.
 
 (The extension will be removed by the installer)\n
 All command line options will be passed to the main class, usually located at
-~/.local/share/spaceoddity/src/spaceoddity.py.
+~/.local/share/spaceoddity/src/spaceoddity.py, which is run by the venv's
+interpreter in place of this process.
 
 Typical usage is show in the main() method.
 """
@@ -31,8 +32,8 @@ Typical usage is show in the main() method.
 # ------------------------------------------------------------------------------
 
 # NB: pure python
+import os
 from pathlib import Path
-import subprocess
 import sys
 
 # ------------------------------------------------------------------------------
@@ -42,6 +43,10 @@ import sys
 # find path to prj/lib
 P_DIR_USR_INST = Path.home() / ".local/share/spaceoddity"
 
+# the venv's interpreter and the real main file
+P_VENV_PY = P_DIR_USR_INST / ".venv-spaceoddity/bin/python"
+P_MAIN = P_DIR_USR_INST / "src/spaceoddity.py"
+
 # ------------------------------------------------------------------------------
 # Classes
 # ------------------------------------------------------------------------------
@@ -61,26 +66,10 @@ class Spaceoddity:
     directories that are defined in the $PATH variable. These are places like
     /usr/bin, ~/.local/bin, etc. and can be called from the command line
     regardless of the current working directory. It is basically a "bootstrap"
-    file, activating the venv and calling the main program.
+    file, replacing itself with the venv's interpreter running the main
+    program.
     """
 
-    # --------------------------------------------------------------------------
-    # Class constants
-    # --------------------------------------------------------------------------
-
-    # commands
-    # NB: format params are inst dir, venv name, prog name, and cmd line
-    S_CMD = (
-        # cd to prj dir
-        "cd {};"
-        # activate prj venv
-        ". .venv-spaceoddity/bin/activate;"
-        # cd to old cwd
-        "cd {};"
-        # call prj with full pat
-        "{}/src/spaceoddity.py {}"
-    )
-
     # --------------------------------------------------------------------------
     # Public methods
     # --------------------------------------------------------------------------
@@ -95,35 +84,19 @@ class Spaceoddity:
         This method is the main entry point for the program, initializing the
         program, and performing its steps.
 
-        It then calls the real main module, located in the install dir.
+        It then replaces this process with the real main module, located in
+        the install dir, run by the venv's interpreter. Running the venv's
+        python directly is the same as activating the venv, but needs no
+        shell, and the args are passed through untouched. The cwd is kept.
         """
 
-        # save project path to return after venv activate
-        start_dir = Path.cwd()
-
-        # get args
-        args = sys.argv
-
-        # remove our path
-        args = args[1:]
-
-        # quote any args with spaces
-        args = [f'"{item}"' if " " in item else item for item in args]
-
-        # put args back together with spaces
-        args = " ".join(args)
-
-        # ----------------------------------------------------------------------
-
-        # build cmd
-        cmd = self.S_CMD.format(
-            P_DIR_USR_INST, start_dir, P_DIR_USR_INST, args
-        )
+        # build argv for the new process (argv[0] is the interpreter)
+        args = [str(P_VENV_PY), str(P_MAIN)] + sys.argv[1:]
 
-        # run cmd
+        # become the real program (does not return)
         try:
-            subprocess.run(cmd, shell=True, check=True)
-        except (FileNotFoundError, subprocess.CalledProcessError):
+            os.execv(P_VENV_PY, args)
+        except OSError:
             sys.exit(-1)
 
 
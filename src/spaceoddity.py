@@ -41,19 +41,62 @@ Typical usage is show in the main() method.
 # ------------------------------------------------------------------------------
 
 # system imports
-from datetime import datetime
+import sys
+
+# local imports
+import spaceoddity_sched as S
+
+# ------------------------------------------------------------------------------
+# Fast path
+# ------------------------------------------------------------------------------
+
+# NB: a scheduled run that is not due yet exits here, before any of the heavy
+# imports below or any network access
+if (
+    __name__ == "__main__"
+    and S.S_ARG_SCHED_OPTION in sys.argv[1:]
+    and not S.is_due()
+):
+    sys.exit(0)
+
+# ------------------------------------------------------------------------------
+# Main imports
+# ------------------------------------------------------------------------------
+
+# pylint: disable=wrong-import-position
+
+# system imports
+import copy
+from datetime import datetime, timedelta
+from urllib import parse
 import json
 import os
 from pathlib import Path
-import sys
-from urllib import request
+import signal
+import textwrap
+import time
+from urllib.error import HTTPError
 
 # third party imports
+# NB: crontab is imported in _enable/_disable and Pillow where the image is
+# composited, so a normal run never pays for them. The same goes for the
+# network, archive, store, and caption modules (and sqlite3), which are
+# imported by the steps that use them, so a run that gets a 304 only loads
+# the network code
 import cnlib.cnfunctions as F
-from crontab import CronTab
 import spaceoddity_base as B
+import spaceoddity_deadline as D
+import spaceoddity_imgsize as IS
+import spaceoddity_limits as LM
+import spaceoddity_ratelimit as RL
+import spaceoddity_screen as SC
 from spaceoddity_base import _
 from spaceoddity_base import SpaceoddityBase
+from spaceoddity_deadline import Deadline, StageTimeout
+from spaceoddity_lock import RunLock
+from spaceoddity_prof import Profiler, RunStats
+
+# pylint: enable=wrong-import-position
 
 # ------------------------------------------------------------------------------
 # Classes
@@ -92,6 +135,35 @@ class Spaceoddity(SpaceoddityBase):
     S_KEY_APOD_TITLE = "title"
     S_KEY_APOD_URL = "url"
     S_KEY_FILE_OLD = "file_old"
+    S_KEY_ETAG = "etag"
+    S_KEY_LAST_MOD = "last_modified"
+    S_KEY_DEADLINE = "deadline"
+    S_KEY_TIMEOUT = "last_timeout"
+    S_KEY_TIMEOUT_STAGE = "stage"
+    S_KEY_TIMEOUT_TIME = "time"
+    S_KEY_LAST_SYNC = "last_sync"
+    S_KEY_RETENTION = "retention"
+    S_KEY_SCALE = "scale_mode"
+    S_KEY_PROGRESSIVE = "progressive"
+    S_KEY_API_KEY = "api_key"
+    S_KEY_API_URL = "api_url"
+    S_KEY_API_RESERVE = "api_reserve"
+    S_KEY_CAPTION = "caption"
+    S_KEY_BASE = "base"
+    S_KEY_SHOWN = "shown"
+    S_KEY_LIMITS = "limits"
+
+    # query param of the api key
+    S_PARAM_API_KEY = "api_key"
+
+    # http headers for conditional requests
+    S_HDR_ETAG = "ETag"
+    S_HDR_LAST_MOD = "Last-Modified"
+    S_HDR_IF_NONE_MATCH = "If-None-Match"
+    S_HDR_IF_MOD_SINCE = "If-Modified-Since"
+
+    # http status for an unchanged resource
+    I_HTTP_NOT_MOD = 304
 
     # the url to load json from
     S_APOD_URL = (
@@ -107,6 +179,35 @@ class Spaceoddity(SpaceoddityBase):
     # NB: format params are now and file ext
     S_FILE_FMT = "wallpaper_{}.{}"
 
+    # step names for stats
+    S_STEP_DICT = "get_apod_dict"
+    S_STEP_IMAGE = "get_apod_image"
+    S_STEP_TEXT = "do_text"
+    S_STEP_SET = "set_image"
+    S_STEP_DEL = "delete_old_image"
+    S_STEP_SWAP = "swap_hd_image"
+
+    # results for stats
+    S_RES_NEW = "new"
+    S_RES_SAME = "same"
+    S_RES_NOT_MOD = "not_modified"
+    S_RES_TIMEOUT = "timeout"
+    S_RES_ERROR = "error"
+
+    # lock file that keeps runs from overlapping
+    S_FILE_LOCK = "spaceoddity.lock"
+
+    # cache file of the monitor layout
+    S_FILE_SCREEN = "screen.json"
+
+    # daemon sleep limits, in seconds
+    F_DAEMON_MIN = 60
+    F_DAEMON_MAX = 30 * 60
+    F_DAEMON_RETRY = 10 * 60
+
+    # days to get on the first backfill with no dates
+    I_BACKFILL_DAYS = 30
+
     # cmd line options
 
     # enable option strings
@@ -123,6 +224,84 @@ class Spaceoddity(SpaceoddityBase):
     # I18N: disable mode help
     S_ARG_DISABLE_HELP = _("disable the program")
 
+    # daemon option strings
+    S_ARG_DAEMON_OPTION = "--daemon"
+    S_ARG_DAEMON_ACTION = "store_true"
+    S_ARG_DAEMON_DEST = "DAEMON_DEST"
+    # I18N: daemon mode help
+    S_ARG_DAEMON_HELP = _(
+        "stay running and check for new pictures on a schedule"
+    )
+
+    # backfill option strings
+    S_ARG_BACKFILL_OPTION = "--backfill"
+    S_ARG_BACKFILL_DEST = "BACKFILL_DEST"
+    S_ARG_BACKFILL_NARGS = "*"
+    # I18N: backfill option dest
+    S_ARG_BACKFILL_METAVAR = _("DATE")
+    # I18N: backfill mode help
+    S_ARG_BACKFILL_HELP = _(
+        "download past pictures to the archive, from START to END "
+        "(YYYY-MM-DD), from START to today, or with no dates, every day "
+        "missing since the last backfill"
+    )
+
+    # search option strings
+    S_ARG_SEARCH_OPTION = "--search"
+    S_ARG_SEARCH_DEST = "SEARCH_DEST"
+    # I18N: search option dest
+    S_ARG_SEARCH_METAVAR = _("QUERY")
+    # I18N: search mode help
+    S_ARG_SEARCH_HELP = _(
+        "search the titles and explanations in the archive"
+    )
+
+    # show option strings
+    S_ARG_SHOW_OPTION = "--show"
+    S_ARG_SHOW_DEST = "SHOW_DEST"
+    # I18N: show option dest
+    S_ARG_SHOW_METAVAR = _("DATE")
+    # I18N: show mode help
+    S_ARG_SHOW_HELP = _("show the archived picture info for a date")
+
+    # pin option strings
+    S_ARG_PIN_OPTION = "--pin"
+    S_ARG_PIN_DEST = "PIN_DEST"
+    # I18N: pin option dest
+    S_ARG_PIN_METAVAR = _("DATE")
+    # I18N: pin mode help
+    S_ARG_PIN_HELP = _(
+        "keep the archived picture for a date from ever being removed"
+    )
+
+    # unpin option strings
+    S_ARG_UNPIN_OPTION = "--unpin"
+    S_ARG_UNPIN_DEST = "UNPIN_DEST"
+    # I18N: unpin option dest
+    S_ARG_UNPIN_METAVAR = _("DATE")
+    # I18N: unpin mode help
+    S_ARG_UNPIN_HELP = _(
+        "allow the archived picture for a date to be removed again"
+    )
+
+    # profile option strings
+    S_ARG_PROF_OPTION = "--profile"
+    S_ARG_PROF_ACTION = "store_true"
+    S_ARG_PROF_DEST = "PROF_DEST"
+    # I18N: profile mode help
+    S_ARG_PROF_HELP = _(
+        "write cProfile and tracemalloc reports to the log dir"
+    )
+
+    # scheduled option strings
+    S_ARG_SCHED_OPTION = S.S_ARG_SCHED_OPTION
+    S_ARG_SCHED_ACTION = "store_true"
+    S_ARG_SCHED_DEST = "SCHED_DEST"
+    # I18N: scheduled mode help
+    S_ARG_SCHED_HELP = _(
+        "only check the server when a new picture is expected (used by cron)"
+    )
+
     # messages
 
     # TODO: make all msg in color and have start/done/fail
@@ -135,16 +314,70 @@ class Spaceoddity(SpaceoddityBase):
     # I18N: get initial apod dict
     # NB: param is dict
     S_MSG_GET = _("Get data from server")
+    # I18N: server says nothing changed, exit
+    S_MSG_NOT_MOD = _("The APOD data has not been modified")
     # I18N: no change, exit
     S_MSG_SAME_URL = _("The APOD picture has not changed")
     # I18N: new download is not image
     S_MSG_NOT_IMG = _("The new APOD is not an image")
     # I18N: download succeeded
     S_MSG_DL = _("Downloaded image")
+    # I18N: picked an image size for the screen
+    # NB: params are image width, image height, screen width, screen height
+    S_MSG_PICK = _("Using {}x{} image for {}x{} screen")
+    # I18N: another run is active, exit
+    S_MSG_LOCKED = _("Another instance is already running")
+    # I18N: profile reports written
+    # NB: param is path to report
+    S_MSG_PROF = _("Wrote profile report {}")
+    # I18N: nothing to backfill
+    S_MSG_BACKFILL_NONE = _("The archive is up to date")
+    # I18N: backfill would use requests saved for the daily check
+    # NB: params are requests needed and requests left
+    S_MSG_BACKFILL_BUDGET = _(
+        "Backfill needs {} api requests but only {} are left, try later"
+    )
+    # I18N: backfill paused by the server
+    # NB: param is time the pause ends
+    S_MSG_BACKFILL_PAUSED = _("Backfill is paused by the server until {}")
+    # I18N: start backfill
+    # NB: param is number of days
+    S_MSG_BACKFILL_START = _("Backfilling {} days... ")
+    # I18N: done backfill
+    # NB: params are number of days saved and failed
+    S_MSG_BACKFILL_DONE = _("Saved {} days, {} failed")
+    # I18N: no search results
+    S_MSG_SEARCH_NONE = _("No matches")
+    # NB: format params are date and title
+    S_MSG_SEARCH_ITEM = "{}  {}"
+    # NB: format param is snippet
+    S_MSG_SEARCH_SNIPPET = "            {}"
+    # NB: format params are title, date, url, path
+    # I18N: show one day
+    S_MSG_SHOW = _("{}\nDate: {}\nURL:  {}\nFile: {}")
+    # width of explanation in show
+    I_SHOW_WIDTH = 78
+    # I18N: pinned a picture
+    # NB: param is date
+    S_MSG_PIN = _("Pinned {}")
+    # I18N: unpinned a picture
+    # NB: param is date
+    S_MSG_UNPIN = _("Unpinned {}")
+    # I18N: removed pictures to stay under the disk limits
+    # NB: param is number of pictures
+    S_MSG_EVICT = _("Removed {} old pictures")
+    # I18N: daemon started
+    S_MSG_DAEMON = _("Running as daemon")
     # I18N: set image as background
     S_MSG_SET = _("Set image as background")
     # I18N: delete old image
     S_MSG_DEL = _("Deleted old image")
+    # I18N: showing the small image while the big one downloads
+    S_MSG_SD_FIRST = _("Showing small image, getting large image... ")
+    # I18N: swapped in the big image
+    S_MSG_SWAP = _("Swapped in large image")
+    # I18N: scaled the image to the screen and drew the caption on it
+    S_MSG_TEXT = _("Rendered wallpaper")
 
     # errors
     # I18N: error on initial get
@@ -156,9 +389,46 @@ class Spaceoddity(SpaceoddityBase):
     # I18N: could not set new image
     # NB: param is error
     S_ERR_SET = _("Could not set new image: {}")
+    # I18N: server says we sent too many requests
+    # NB: param is time the pause ends
+    S_ERR_RATE = _("Too many api requests, paused until {}")
+    # I18N: a stage of the run took too long
+    # NB: param is stage name
+    S_ERR_TIMEOUT = _("Timed out during {}, keeping previous image")
+    # I18N: bad date for backfill
+    # NB: param is error
+    S_ERR_BACKFILL_DATE = _("Invalid date: {}")
+    # I18N: one day of a backfill failed
+    # NB: params are date and error
+    S_ERR_BACKFILL_DAY = _("Could not save {}: {}")
+    # I18N: archive db failed
+    # NB: param is error
+    S_ERR_ARCHIVE = _("Archive error: {}")
+    # I18N: image store failed
+    # NB: param is error
+    S_ERR_STORE = _("Image store error: {}")
+    # I18N: date not in archive
+    # NB: param is date
+    S_ERR_SHOW = _("{} is not in the archive")
+    # I18N: date has no picture in the store
+    # NB: param is date
+    S_ERR_PIN = _("{} has no picture to pin")
     # I18N: could not delete old image
     # NB: param is error
     S_ERR_DEL = _("Could not delete old image: {}")
+    # I18N: too many failures, scheduled runs will pause
+    # NB: param is number of failures
+    S_ERR_CIRCUIT = _(
+        "{} failed checks in a row, pausing scheduled checks for a while"
+    )
+    # I18N: could not get the big image, the small one stays
+    # NB: param is error
+    S_ERR_SWAP = _("Could not get large image, keeping small one: {}")
+    # I18N: downloaded file is not an image we can read
+    S_ERR_NOT_IMG = _("Downloaded file is not a valid image")
+    # I18N: could not render the wallpaper, the plain image is used
+    # NB: param is error
+    S_ERR_TEXT = _("Could not render wallpaper: {}")
 
     # commands
     S_CMD_LIGHT = (
@@ -167,16 +437,19 @@ class Spaceoddity(SpaceoddityBase):
     S_CMD_DARK = (
         "gsettings set org.gnome.desktop.background picture-uri-dark file://{}"
     )
+    S_CMD_SPAN = (
+        "gsettings set org.gnome.desktop.background picture-options spanned"
+    )
     # NB: the env stuff is required to futz w/ the screen from cron (which
     # technically runs headless)
-    # NB: format params are uid and prg name
+    # NB: the venv's python is called directly, which needs no activation
+    # NB: format params are uid, path to python, path to this file, and
+    # scheduled option
     S_CMD_CRON = (
         "env "
         "DISPLAY=:0 "
         "DBUS_SESSION_BUS_ADDRESS=unix:path=/run/user/{}/bus "
-        # TODO: need this?
-        # "/usr/bin/python3 "
-        "{}"
+        "{} {} {}"
     )
 
     # --------------------------------------------------------------------------
@@ -198,11 +471,53 @@ class Spaceoddity(SpaceoddityBase):
         self._dict_cfg = {
             self.S_KEY_APOD: {},
             self.S_KEY_FILE_OLD: "",
+            self.S_KEY_ETAG: "",
+            self.S_KEY_LAST_MOD: "",
+            self.S_KEY_DEADLINE: dict(D.D_BUDGETS),
+            # NB: missing keys use ST.D_RETENTION, see Store.evict
+            self.S_KEY_RETENTION: {},
+            self.S_KEY_SCALE: SC.S_MODE_FILL,
+            self.S_KEY_PROGRESSIVE: False,
+            self.S_KEY_API_KEY: "",
+            self.S_KEY_API_URL: "",
+            self.S_KEY_API_RESERVE: RL.I_RESERVE,
+            # NB: missing keys use CP.D_CAPTION, see CP.get_settings
+            self.S_KEY_CAPTION: {},
+            self.S_KEY_BASE: "",
+            self.S_KEY_SHOWN: "",
+            self.S_KEY_LIMITS: dict(LM.D_LIMITS),
         }
 
         # location of new file (soon to be old file)
         self._new_file = ""
 
+        # date of the apod the server sent us (for the scheduler)
+        self._apod_date = None
+
+        # large image to swap in after the small one is shown
+        self._url_swap = ""
+
+        # monitors for the current cycle (found on first use)
+        self._monitors = None
+
+        # time limits for the current cycle
+        self._deadline = Deadline()
+
+        # timings and byte counts for the current cycle
+        self._stats = RunStats()
+
+        # archive db (opened on first use)
+        self._archive = None
+
+        # image store (opened on first use)
+        self._store = None
+
+        # caption cache (opened on first use)
+        self._compositor = None
+
+        # lock that keeps runs from overlapping
+        self._lock = RunLock(B.P_DIR_CONF / self.S_FILE_LOCK)
+
     # --------------------------------------------------------------------------
     # Public methods
     # --------------------------------------------------------------------------
@@ -227,32 +542,67 @@ class Spaceoddity(SpaceoddityBase):
             self._teardown()
             sys.exit(0)
 
+        # look things up in the archive
+        if self._dict_args[self.S_ARG_SEARCH_DEST] is not None:
+            self._do_search()
+            self._teardown()
+            sys.exit(0)
+        if self._dict_args[self.S_ARG_SHOW_DEST] is not None:
+            self._do_show()
+            self._teardown()
+            sys.exit(0)
+
+        # keep a picture (or let it go)
+        if self._dict_args[self.S_ARG_PIN_DEST] is not None:
+            self._do_pin(self._dict_args[self.S_ARG_PIN_DEST], True)
+            self._teardown()
+            sys.exit(0)
+        if self._dict_args[self.S_ARG_UNPIN_DEST] is not None:
+            self._do_pin(self._dict_args[self.S_ARG_UNPIN_DEST], False)
+            self._teardown()
+            sys.exit(0)
+
         # check if we are being enabled
         if self._dict_args[self.S_ARG_ENABLE_DEST]:
             self._enable()
 
-        # ----------------------------------------------------------------------
-        # main stuff
+        # start profiling if asked
+        profiler = None
+        if self._dict_args[self.S_ARG_PROF_DEST]:
+            profiler = Profiler()
+            profiler.start()
 
-        # do the thing with the thing
-        res = self._get_apod_dict()
+        try:
 
-        self._new_file = self._dict_cfg.get(self.S_KEY_FILE_OLD, "")
-        if res:
-            self._get_apod_image()
+            # stay resident and check on a schedule
+            if self._dict_args[self.S_ARG_DAEMON_DEST]:
+                self._run_daemon()
+                return
 
-        self._do_text()
+            # fill the archive instead of a normal run
+            if self._dict_args[self.S_ARG_BACKFILL_DEST] is not None:
+                self._do_backfill()
+                self._teardown()
+                return
 
-        self._set_image()
+            # ------------------------------------------------------------------
+            # main stuff
 
-        if res:
-            self._delete_old_image()
+            # do the thing with the thing
+            self._run_cycle()
 
-        # ----------------------------------------------------------------------
-        # teardown
+            # ------------------------------------------------------------------
+            # teardown
 
-        # call boilerplate code
-        self._teardown()
+            # call boilerplate code
+            self._teardown()
+
+        finally:
+
+            # write reports, however we got here
+            if profiler:
+                for a_path in profiler.stop(B.P_LOG_DEF.parent):
+                    print(self.S_MSG_PROF.format(a_path))
 
     # --------------------------------------------------------------------------
     # Private methods
@@ -261,257 +611,1705 @@ class Spaceoddity(SpaceoddityBase):
     # NB: these are the main steps, called in order from main
 
     # --------------------------------------------------------------------------
-    # Boilerplate to use at the start of main
+    # Run one check of the server and apply the result
     # --------------------------------------------------------------------------
-    def _setup(self):
-        """
-        Boilerplate to use at the start of main
-
-        Perform some mundane stuff like setting properties.
-        If you implement this function. make sure to call super() LAST!!!
+    def _run_cycle(self):
         """
+        Run one check of the server and apply the result
 
-        # get a mutually exclusive group
-        group = self._parser.add_mutually_exclusive_group()
-
-        # add debug option
-        group.add_argument(
-            self.S_ARG_ENABLE_OPTION,
-            action=self.S_ARG_ENABLE_ACTION,
-            dest=self.S_ARG_ENABLE_DEST,
-            help=self.S_ARG_ENABLE_HELP,
-        )
-
-        # add debug option
-        group.add_argument(
-            self.S_ARG_DISABLE_OPTION,
-            action=self.S_ARG_DISABLE_ACTION,
-            dest=self.S_ARG_DISABLE_DEST,
-            help=self.S_ARG_DISABLE_HELP,
-        )
-
-        # do setup
-        super()._setup()
-
-    # --------------------------------------------------------------------------
-    # Enable cron job
-    # --------------------------------------------------------------------------
-    def _enable(self):
-        """
-        Enable cron job
+        This is the body of a normal run, and is called once per wakeup in
+        daemon mode.
         """
 
-        # debug foo
-        if self._cmd_debug:
-            print("_enable")
-            return
-
-        # show some text
-        print(self.S_MSG_CRON_ADD, end="", flush=True)
-
-        # */10 * * * * env DISPLAY=:0
-        # DBUS_SESSION_BUS_ADDRESS=unix:path=/run/user/1000/bus /usr/bin/python3
-        # /home/dana/.local/spaceoddity/src/spaceoddity.py # spaceoddity
-
-        # ----------------------------------------------------------------------
-        # get cron command
-
-        # set the job command
-        uid = os.getuid()
-        cron_cmd = self.S_CMD_CRON.format(uid, self.S_PRG_NAME)
+        # reset per-cycle state
+        self._new_file = ""
+        self._apod_date = None
+        self._url_swap = ""
+        self._monitors = None
 
-        # ----------------------------------------------------------------------
-        # create cron object
+        # start the clock
+        self._deadline = Deadline(self._dict_cfg.get(self.S_KEY_DEADLINE))
 
-        # get current user's crontab
-        my_cron = CronTab(user=True)
+        # keep a copy of the config to go back to if we run out of time
+        dict_cfg_old = copy.deepcopy(self._dict_cfg)
 
-        # find 'every' job
-        my_job = None
-        for job in my_cron:
+        # start measuring
+        self._stats = RunStats()
+        self._stats.set_result(self.S_RES_ERROR)
 
-            # find our job
-            if job.comment == self.S_PRG_NAME:
-                my_job = job
-                break
+        try:
 
-        # create new job if necessary
-        if not my_job:
-            my_job = my_cron.new(command=cron_cmd, comment=self.S_PRG_NAME)
+            # do the thing with the thing
+            with self._stats.timer(self.S_STEP_DICT):
+                res = self._get_apod_dict()
+
+            # server sent 304, nothing to do
+            if res is None:
+                self._update_sched()
+                self._stats.set_result(self.S_RES_NOT_MOD)
+                return
+
+            self._new_file = self._dict_cfg.get(self.S_KEY_FILE_OLD, "")
+            if res:
+                with self._stats.timer(self.S_STEP_IMAGE):
+                    self._get_apod_image()
+
+            with self._stats.timer(self.S_STEP_TEXT):
+                with self._deadline.stage(D.S_STAGE_COMP):
+                    self._do_text()
+
+            with self._stats.timer(self.S_STEP_SET):
+                self._set_image()
+
+            # tell the scheduler what we found
+            # NB: only now is the day done, if any step before this failed,
+            # the day is not confirmed and the backoff says when to try again
+            self._update_sched()
+
+            # NB: a new caption makes a new file, even for the same image
+            if self._new_file != self._dict_cfg[self.S_KEY_FILE_OLD]:
+                with self._stats.timer(self.S_STEP_DEL):
+                    self._delete_old_image()
+
+            # the small image is up, now get the large one
+            if self._url_swap:
+                with self._stats.timer(self.S_STEP_SWAP):
+                    self._swap_image()
+
+            # done
+            self._stats.set_result(self.S_RES_NEW if res else self.S_RES_SAME)
+
+        except StageTimeout as error:
+
+            # note it in the stats
+            self._stats.set_result(self.S_RES_TIMEOUT)
+
+            # forget anything this cycle did, so the next one starts over
+            self._dict_cfg = dict_cfg_old
+
+            # don't leave this cycle's wallpaper behind
+            # NB: an apply that ran out of time may have set it already, so
+            # point the desktop back at the old one first (if there is one)
+            file_old = self._dict_cfg[self.S_KEY_FILE_OLD]
+            if self._new_file and self._new_file != file_old:
+                if error.stage != D.S_STAGE_APPLY:
+                    self._delete_new_image()
+                elif file_old:
+                    self._reset_image(file_old)
+                    self._delete_new_image()
+
+            # remember what happened
+            self._dict_cfg[self.S_KEY_TIMEOUT] = {
+                self.S_KEY_TIMEOUT_STAGE: error.stage,
+                self.S_KEY_TIMEOUT_TIME: datetime.now().isoformat(),
+            }
+            msg = self.S_ERR_TIMEOUT.format(error.stage)
+            self._logger.warning(msg)
+            print(msg)
+
+            # a slow network counts as a failed check
+            if error.stage in (D.S_STAGE_META, D.S_STAGE_DL):
+                self._record_failure(error)
+
+            # save and stop, like any other fatal error
+            self._save_config()
+            sys.exit(-1)
 
-        # set job time
-        my_job.enable()
-        my_job.minute.every(10) # type: ignore
+        finally:
 
-        # save job parameters
-        my_cron.write()
+            # one line per run, however it ended
+            self._logger.info(self._stats.get_line())
 
-        # show some text
-        print(self.S_MSG_DONE)
+        # the last run that timed out is no longer news
+        self._dict_cfg.pop(self.S_KEY_TIMEOUT, None)
 
     # --------------------------------------------------------------------------
-    # Disable cron job
+    # Stay resident and run cycles when they are due
     # --------------------------------------------------------------------------
-    def _disable(self):
-        """
-        Disable cron job
+    def _run_daemon(self):
         """
+        Stay resident and run cycles when they are due
 
-        # debug foo
-        if self._cmd_debug:
-            print("_disable")
-            return
+        The config, imports, and anything cached on this object are kept
+        between cycles, so a check costs only the work it actually does.
+        SIGTERM or SIGINT end the loop after the current cycle.
+        """
 
-        # show some text
-        print(self.S_MSG_CRON_DEL, end="", flush=True)
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import threading
+        import spaceoddity_http as H
 
-        # get current user's crontab
-        my_cron = CronTab(user=True)
+        # set up a clean way out
+        evt_stop = threading.Event()
 
-        # remove our job
-        for job in my_cron:
-            if job.comment == self.S_PRG_NAME:
-                my_cron.remove(job)
+        # NB: handler params are unused
+        def _on_signal(_signum, _frame):
+            evt_stop.set()
 
-        # save job parameters
-        my_cron.write()
+        signal.signal(signal.SIGTERM, _on_signal)
+        signal.signal(signal.SIGINT, _on_signal)
 
         # show some text
-        print(self.S_MSG_DONE)
+        print(self.S_MSG_DAEMON)
+
+        # loop until told to stop
+        while not evt_stop.is_set():
+
+            # only hit the server when the schedule says so
+            if S.is_due():
+
+                # keep a copy of the config to go back to if the cycle fails
+                dict_cfg_old = copy.deepcopy(self._dict_cfg)
+
+                try:
+                    self._run_cycle()
+                    self._save_config()
+                except SystemExit:
+                    # NB: the steps exit on fatal errors, which in daemon
+                    # mode only ends this cycle, but anything it changed
+                    # (ie. the new apod dict or the validators) would make
+                    # the next cycle think it has the image already
+                    dict_timeout = self._dict_cfg.get(self.S_KEY_TIMEOUT)
+                    self._dict_cfg = dict_cfg_old
+                    if dict_timeout:
+                        self._dict_cfg[self.S_KEY_TIMEOUT] = dict_timeout
+
+                # NB: the server would drop idle connections long before the
+                # next cycle anyway, but the pool keeps its SSL context and
+                # TLS sessions, so the next cycle's handshakes are cheap
+                H.get_pool().close()
+
+            # sleep until the next check (or a signal)
+            evt_stop.wait(self._get_daemon_wait())
 
     # --------------------------------------------------------------------------
-    # Get json from api.nasa.gov
+    # Download past APODs to the archive
     # --------------------------------------------------------------------------
-    def _get_apod_dict(self):
+    def _do_backfill(self):
         """
-        Description
+        Download past APODs to the archive
+
+        With two dates, fills that range. With one, fills from that date to
+        today. With none, fills every day missing since the last backfill
+        (or the last I_BACKFILL_DAYS days the first time). Only days that are
+        not on disk are asked for, in as few requests as possible.
         """
 
-        # debug_foo
-        if self._cmd_debug:
-            print("_get_apod_dict")
-            return True
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import sqlite3
+        import spaceoddity_backfill as BF
 
-        # get the nasa json
+        # get range from args
+        l_args = self._dict_args[self.S_ARG_BACKFILL_DEST]
+        today = S.get_apod_today()
         try:
+            if len(l_args) > 2:
+                raise ValueError(" ".join(l_args))
+            if l_args:
+                date_start = BF.parse_date(l_args[0])
+                date_end = today
+                if len(l_args) > 1:
+                    date_end = BF.parse_date(l_args[1])
+            else:
+                last_sync = self._dict_cfg.get(self.S_KEY_LAST_SYNC, "")
+                date_start = (
+                    BF.parse_date(last_sync)
+                    if last_sync
+                    else today - timedelta(days=self.I_BACKFILL_DAYS)
+                )
+                date_end = today
+        except ValueError as error:
+            print(self.S_ERR_BACKFILL_DATE.format(error))
+            sys.exit(-1)
 
-            # get json from url
-            response = request.urlopen(self.S_APOD_URL)
-            response_text = response.read()
+        # allow dates in either order
+        if date_start > date_end:
+            date_start, date_end = date_end, date_start
 
-        except OSError as error:
+        # index days saved before there was a db
+        self._index_archive_dir()
 
-            # prob no internet
+        # find the gaps
+        l_missing = BF.get_missing(
+            B.P_DIR_ARCHIVE, BF.get_dates(date_start, date_end)
+        )
+        if not l_missing:
+            print(self.S_MSG_BACKFILL_NONE)
+            if not l_args:
+                self._dict_cfg[self.S_KEY_LAST_SYNC] = date_end.isoformat()
+            return
+
+        # the server told us to wait
+        dict_state = S.load_state()
+        until = RL.get_pause(dict_state, RL.S_SUB_BACKFILL)
+        if until > time.time():
+            print(
+                self.S_MSG_BACKFILL_PAUSED.format(
+                    datetime.fromtimestamp(until).isoformat(timespec="minutes")
+                )
+            )
+            return
+
+        # leave enough requests for the daily check
+        count = BF.count_requests(l_missing[0], l_missing[-1])
+        reserve = self._dict_cfg.get(self.S_KEY_API_RESERVE, RL.I_RESERVE)
+        if not RL.can_spend(dict_state, count, reserve):
+            print(
+                self.S_MSG_BACKFILL_BUDGET.format(
+                    count, RL.get_remaining(dict_state)
+                )
+            )
+            return
+
+        # get metadata for the span of the gaps in as few calls as possible
+        try:
+            l_dicts = BF.fetch_range(
+                self._get_api_url(),
+                l_missing[0],
+                l_missing[-1],
+                fn_headers=self._save_rate,
+            )
+        except HTTPError as error:
+            self._check_rate(error, RL.S_SUB_BACKFILL)
+            print(self.S_ERR_GET.format(error))
+            sys.exit(-1)
+        except (OSError, ValueError) as error:
             print(self.S_ERR_GET.format(error))
             sys.exit(-1)
 
-        print(self.S_MSG_GET)
+        # only keep the ones we need
+        set_missing = {a_date.isoformat() for a_date in l_missing}
+        l_dicts = [
+            a_dict
+            for a_dict in l_dicts
+            if a_dict.get(self.S_KEY_APOD_DATE) in set_missing
+        ]
 
-        # ----------------------------------------------------------------------
+        # download them
+        print(self.S_MSG_BACKFILL_START.format(len(l_dicts)), flush=True)
+        try:
+            store = self._get_store()
+        except (sqlite3.Error, OSError) as error:
+            print(self.S_ERR_STORE.format(error))
+            sys.exit(-1)
+        l_ok, l_fail = BF.download_all(
+            l_dicts,
+            B.P_DIR_ARCHIVE,
+            store,
+            max_bytes=self._get_limits()[LM.S_KEY_MAX_BYTES],
+        )
+        for a_dict, path_img, sha256 in l_ok:
+            self._add_to_archive(a_dict, path_img, sha256)
+        for a_dict, error in l_fail:
+            print(
+                self.S_ERR_BACKFILL_DAY.format(
+                    a_dict.get(self.S_KEY_APOD_DATE), error
+                )
+            )
+        print(self.S_MSG_BACKFILL_DONE.format(len(l_ok), len(l_fail)))
+
+        # make room for them
+        self._evict()
+
+        # remember how far we got, so the next one starts at the first gap
+        if not l_args:
+            l_failed = sorted(
+                a_dict.get(self.S_KEY_APOD_DATE, "") for a_dict, _e in l_fail
+            )
+            self._dict_cfg[self.S_KEY_LAST_SYNC] = (
+                l_failed[0] if l_failed else date_end.isoformat()
+            )
 
-        # get the old and new apod dicts
-        apod_dict_old = self._dict_cfg[self.S_KEY_APOD]
-        apod_dict_new = json.loads(response_text)
+    # --------------------------------------------------------------------------
+    # Search the archive and print the results
+    # --------------------------------------------------------------------------
+    def _do_search(self):
+        """
+        Search the archive and print the results
 
-        # check if url is the same
-        if self._check_same_url(apod_dict_old, apod_dict_new):
-            print(self.S_MSG_SAME_URL)
-            return False
+        The query uses FTS5 syntax, so plain words, "quoted phrases", prefix*
+        and title:word all work.
+        """
 
-        # check if today's apod is an image (sometimes it's a video)
-        media_type = apod_dict_new[self.S_KEY_APOD_TYPE]
-        if media_type not in self.S_MEDIA_TYPES:
-            print(self.S_MSG_NOT_IMG)
-            return False
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import sqlite3
+        import spaceoddity_archive as A
 
-        # apply new dict to config
-        self._dict_cfg[self.S_KEY_APOD] = apod_dict_new
+        # run the query
+        query = self._dict_args[self.S_ARG_SEARCH_DEST]
+        try:
+            l_results = self._get_archive().search(query)
+        except sqlite3.Error as error:
+            print(self.S_ERR_ARCHIVE.format(error))
+            sys.exit(-1)
 
-        return True
+        # show results
+        if not l_results:
+            print(self.S_MSG_SEARCH_NONE)
+        for a_dict in l_results:
+            print(
+                self.S_MSG_SEARCH_ITEM.format(
+                    a_dict[A.S_KEY_DATE], a_dict[A.S_KEY_TITLE]
+                )
+            )
+            print(self.S_MSG_SEARCH_SNIPPET.format(a_dict[A.S_KEY_SNIPPET]))
 
     # --------------------------------------------------------------------------
-    # Get image from api.nasa.gov
+    # Print one day from the archive
     # --------------------------------------------------------------------------
-    def _get_apod_image(self):
+    def _do_show(self):
         """
-        Description
+        Print one day from the archive
         """
 
-        # debug_foo
-        if self._cmd_debug:
-            print("_get_apod_image")
-            return
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import sqlite3
+        import spaceoddity_archive as A
 
-        # get current apod dict
-        apod_dict = self._dict_cfg[self.S_KEY_APOD]
+        # get the day
+        str_date = self._dict_args[self.S_ARG_SHOW_DEST]
+        try:
+            a_dict = self._get_archive().get(str_date)
+        except sqlite3.Error as error:
+            print(self.S_ERR_ARCHIVE.format(error))
+            sys.exit(-1)
+
+        # not there
+        if not a_dict:
+            print(self.S_ERR_SHOW.format(str_date))
+            sys.exit(-1)
 
-        # get most appropriate URL
-        src_url = ""
-        if self.S_KEY_APOD_HDURL in apod_dict:
-            src_url = apod_dict[self.S_KEY_APOD_HDURL]
-        elif self.S_KEY_APOD_URL in apod_dict:
-            src_url = apod_dict[self.S_KEY_APOD_URL]
+        # show it
+        print(
+            self.S_MSG_SHOW.format(
+                a_dict.get(self.S_KEY_APOD_TITLE, ""),
+                a_dict.get(self.S_KEY_APOD_DATE, ""),
+                a_dict.get(self.S_KEY_APOD_HDURL)
+                or a_dict.get(self.S_KEY_APOD_URL, ""),
+                a_dict.get(A.S_KEY_PATH) or "",
+            )
+        )
+        print()
+        print(
+            textwrap.fill(
+                a_dict.get(self.S_KEY_APOD_EXP, ""), self.I_SHOW_WIDTH
+            )
+        )
 
-        # create a download path
-        now = datetime.now()
-        str_now = now.strftime(self.S_TIME_FMT)
-        file_ext = src_url.split(".")[-1]
+    # --------------------------------------------------------------------------
+    # Pin or unpin the picture for a date
+    # --------------------------------------------------------------------------
+    def _do_pin(self, str_date, pinned):
+        """
+        Pin or unpin the picture for a date
 
-        # get new pic name
-        pic_name = self.S_FILE_FMT.format(str_now, file_ext)
-        pic_path = B.P_DIR_CONF / pic_name
+        Args:
+            str_date: The date, like "2026-10-18"
+            pinned: True to pin, False to unpin
 
-        # try to download image
-        try:
+        A pinned picture is never evicted from the store.
+        """
 
-            # download the image
-            request.urlretrieve(src_url, pic_path)
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import sqlite3
+        import spaceoddity_archive as A
 
-            # store new file
-            self._new_file = str(pic_path)
+        # find the picture's hash and mark it
+        try:
+            a_dict = self._get_archive().get(str_date)
+            sha256 = a_dict.get(A.S_KEY_SHA256) if a_dict else None
+            found = bool(sha256) and self._get_store().set_pinned(
+                sha256, pinned
+            )
+        except (sqlite3.Error, OSError) as error:
+            print(self.S_ERR_STORE.format(error))
+            sys.exit(-1)
 
-        except OSError as error:
-            # this is a fatal error
-            print(self.S_ERR_DL.format(error))
+        # not there
+        if not found:
+            print(self.S_ERR_PIN.format(str_date))
             sys.exit(-1)
 
-        print(self.S_MSG_DL)
+        print((self.S_MSG_PIN if pinned else self.S_MSG_UNPIN).format(str_date))
 
     # --------------------------------------------------------------------------
-    # Do text overlay
+    # Get the api url, with the user's api key if they have one
     # --------------------------------------------------------------------------
-    def _do_text(self):
+    def _get_api_url(self):
         """
-        Description
+        Get the api url, with the user's api key if they have one
+
+        Returns:
+            The url to get the APOD json from
+
+        The built-in key is shared by everyone who uses the program, so it
+        runs out first. A key of your own (free from api.nasa.gov) in the
+        config has its own limit. The url itself can also be set in the
+        config, ie. to point at tests/mock_apod.py for testing.
         """
 
+        # use the config's url, if any
+        api_url = self._dict_cfg.get(self.S_KEY_API_URL, "")
+        if not api_url:
+            api_url = self.S_APOD_URL
+
+        # no key of our own
+        api_key = self._dict_cfg.get(self.S_KEY_API_KEY, "")
+        if not api_key:
+            return api_url
+
+        # swap it in
+        parts = parse.urlsplit(api_url)
+        dict_query = dict(parse.parse_qsl(parts.query))
+        dict_query[self.S_PARAM_API_KEY] = api_key
+        return parse.urlunsplit(
+            parts._replace(query=parse.urlencode(dict_query))
+        )
+
     # --------------------------------------------------------------------------
-    # Set the wallpaper
+    # Save the rate limit headers of an api response
     # --------------------------------------------------------------------------
-    def _set_image(self):
+    def _save_rate(self, headers):
         """
-        Description
+        Save the rate limit headers of an api response
+
+        Args:
+            headers: The headers of the response
+
+        The numbers go in the state file, so every run can see them.
         """
 
         # debug_foo
         if self._cmd_debug:
-            print("_set_image")
             return
 
+        # load, update, save
+        dict_state = S.load_state()
+        RL.update(dict_state, headers)
+        S.save_state(dict_state)
+
+    # --------------------------------------------------------------------------
+    # Pause a part of the program if an error was a 429
+    # --------------------------------------------------------------------------
+    def _check_rate(self, error, sub):
+        """
+        Pause a part of the program if an error was a 429
+
+        Args:
+            error: The HTTPError from an api request
+            sub: The part of the program that made the request, ie.
+            RL.S_SUB_POLL
+
+        Returns:
+            True if the error was a 429
+
+        Only the part that got the 429 is paused. A paused daily check also
+        holds off scheduled runs, a paused backfill does not stop the daily
+        check.
+        """
+
+        # not a rate limit
+        if error.code != RL.I_HTTP_TOO_MANY:
+            return False
+
+        # load, update, save
+        dict_state = S.load_state()
+        until = RL.pause(dict_state, sub, error.headers)
+        S.save_state(dict_state)
+
+        msg = self.S_ERR_RATE.format(
+            datetime.fromtimestamp(until).isoformat(timespec="minutes")
+        )
+        self._logger.warning(msg)
+        print(msg)
+        return True
+
+    # --------------------------------------------------------------------------
+    # Get the archive db, opening it on first use
+    # --------------------------------------------------------------------------
+    def _get_archive(self):
+        """
+        Get the archive db, opening it on first use
+
+        Returns:
+            The Archive object
+
+        The object is kept, so in daemon mode the db is opened only once.
+        """
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import spaceoddity_archive as A
+        from spaceoddity_archive import Archive
+
+        if self._archive is None:
+            self._archive = Archive(B.P_DIR_ARCHIVE / A.S_FILE_DB)
+        return self._archive
+
+    # --------------------------------------------------------------------------
+    # Get the image store, opening it on first use
+    # --------------------------------------------------------------------------
+    def _get_store(self):
+        """
+        Get the image store, opening it on first use
+
+        Returns:
+            The Store object
+
+        The object is kept, so in daemon mode the index is opened only once.
+        """
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        from spaceoddity_store import Store
+
+        if self._store is None:
+            self._store = Store(B.P_DIR_STORE)
+        return self._store
+
+    # --------------------------------------------------------------------------
+    # Get the caption compositor, making it on first use
+    # --------------------------------------------------------------------------
+    def _get_compositor(self):
+        """
+        Get the caption compositor, making it on first use
+
+        Returns:
+            The Compositor object
+        """
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        from spaceoddity_caption import Compositor
+
+        if self._compositor is None:
+            self._compositor = Compositor(B.P_DIR_CACHE, self._get_limits())
+        return self._compositor
+
+    # --------------------------------------------------------------------------
+    # Get the image limits
+    # --------------------------------------------------------------------------
+    def _get_limits(self):
+        """
+        Get the image limits
+
+        Returns:
+            The config's "limits" dict, with defaults for any missing keys
+            (see spaceoddity_limits)
+        """
+
+        return LM.get_limits(self._dict_cfg.get(self.S_KEY_LIMITS))
+
+    # --------------------------------------------------------------------------
+    # Get the monitors, finding them on first use in a cycle
+    # --------------------------------------------------------------------------
+    def _get_monitors(self):
+        """
+        Get the monitors, finding them on first use in a cycle
+
+        Returns:
+            The list of monitors, primary first, or an empty list if there
+            is no screen to ask (see spaceoddity_screen)
+
+        The list is kept for the rest of the cycle, so picking, rendering,
+        and setting the image all agree. The layout is also cached between
+        runs, so this only reads a few small files unless it changed.
+        """
+
+        if self._monitors is None:
+            self._monitors = SC.get_monitors(
+                B.P_DIR_CACHE / self.S_FILE_SCREEN
+            )
+        return self._monitors
+
+    # --------------------------------------------------------------------------
+    # Remove pictures from the store to stay under the retention limits
+    # --------------------------------------------------------------------------
+    def _evict(self):
+        """
+        Remove pictures from the store to stay under the retention limits
+
+        Called after each download, so each call only has to remove the
+        few pictures that the new one pushed over the limits. The current
+        wallpaper, the one it is replacing, and pinned pictures are kept.
+        Errors are printed but not fatal.
+        """
+
+        # debug_foo
+        if self._cmd_debug:
+            print("_evict")
+            return
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import sqlite3
+
+        # never remove what is (or is about to be) on screen
+        l_keep = [
+            a_file
+            for a_file in (
+                self._new_file,
+                self._dict_cfg.get(self.S_KEY_FILE_OLD, ""),
+            )
+            if a_file
+        ]
+
+        try:
+            l_evicted = self._get_store().evict(
+                self._dict_cfg.get(self.S_KEY_RETENTION), l_keep
+            )
+            for sha256 in l_evicted:
+                self._get_archive().clear_path(sha256)
+        except (sqlite3.Error, OSError) as error:
+            print(self.S_ERR_STORE.format(error))
+            return
+
+        if l_evicted:
+            print(self.S_MSG_EVICT.format(len(l_evicted)))
+
+    # --------------------------------------------------------------------------
+    # Add one day to the archive db
+    # --------------------------------------------------------------------------
+    def _add_to_archive(self, a_dict, path_img=None, sha256=None):
+        """
+        Add one day to the archive db
+
+        Args:
+            a_dict: The APOD dict
+            path_img: The path to the archived image, if any (default: None)
+            sha256: The hash of the image, if known (default: None)
+
+        Errors are printed but not fatal, the archive is not needed to set
+        the wallpaper.
+        """
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import sqlite3
+
+        try:
+            self._get_archive().add(a_dict, path_img, sha256)
+        except (sqlite3.Error, OSError) as error:
+            print(self.S_ERR_ARCHIVE.format(error))
+
+    # --------------------------------------------------------------------------
+    # Add days saved as json files before there was a db
+    # --------------------------------------------------------------------------
+    def _index_archive_dir(self):
+        """
+        Add days saved as json files before there was a db
+
+        Any json file in the archive dir whose date is not in the db is
+        added, along with its image if it has one.
+        """
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import sqlite3
+        import spaceoddity_backfill as BF
+
+        # nothing to do
+        if not B.P_DIR_ARCHIVE.exists():
+            return
+
+        # find json files not in the db
+        try:
+            set_dates = self._get_archive().get_dates()
+        except sqlite3.Error as error:
+            print(self.S_ERR_ARCHIVE.format(error))
+            return
+
+        for path_json in B.P_DIR_ARCHIVE.glob(BF.S_FILE_JSON.format("*")):
+            if path_json.stem in set_dates:
+                continue
+
+            # load it
+            try:
+                a_dict = json.loads(path_json.read_text(encoding="UTF-8"))
+            except (OSError, ValueError):
+                continue
+
+            # find its image
+            path_img = BF.find_image_path(a_dict, B.P_DIR_ARCHIVE)
+
+            self._add_to_archive(a_dict, path_img)
+
+    # --------------------------------------------------------------------------
+    # Get the number of seconds to sleep before the next check
+    # --------------------------------------------------------------------------
+    def _get_daemon_wait(self):
+        """
+        Get the number of seconds to sleep before the next check
+
+        Returns:
+            The number of seconds to sleep
+
+        The sleep is capped so that a suspend/resume or a clock change is
+        noticed within a reasonable time. A failed check waits for the
+        failure backoff, and any other failed cycle (which does not move the
+        schedule) is retried after a fixed delay.
+        """
+
+        # get next check from the scheduler (and the failure backoff)
+        next_check = S.get_next_check(S.load_state())
+        wait = next_check - time.time()
+
+        # last cycle failed or did not update the schedule
+        if wait <= 0:
+            return self.F_DAEMON_RETRY
+
+        return min(max(wait, self.F_DAEMON_MIN), self.F_DAEMON_MAX)
+
+    # --------------------------------------------------------------------------
+    # Boilerplate to use at the start of main
+    # --------------------------------------------------------------------------
+    def _setup(self):
+        """
+        Boilerplate to use at the start of main
+
+        Perform some mundane stuff like setting properties.
+        If you implement this function. make sure to call super() LAST!!!
+        """
+
+        # get a mutually exclusive group
+        group = self._parser.add_mutually_exclusive_group()
+
+        # add debug option
+        group.add_argument(
+            self.S_ARG_ENABLE_OPTION,
+            action=self.S_ARG_ENABLE_ACTION,
+            dest=self.S_ARG_ENABLE_DEST,
+            help=self.S_ARG_ENABLE_HELP,
+        )
+
+        # add debug option
+        group.add_argument(
+            self.S_ARG_DISABLE_OPTION,
+            action=self.S_ARG_DISABLE_ACTION,
+            dest=self.S_ARG_DISABLE_DEST,
+            help=self.S_ARG_DISABLE_HELP,
+        )
+
+        # add daemon option
+        group.add_argument(
+            self.S_ARG_DAEMON_OPTION,
+            action=self.S_ARG_DAEMON_ACTION,
+            dest=self.S_ARG_DAEMON_DEST,
+            help=self.S_ARG_DAEMON_HELP,
+        )
+
+        # add backfill option
+        group.add_argument(
+            self.S_ARG_BACKFILL_OPTION,
+            dest=self.S_ARG_BACKFILL_DEST,
+            nargs=self.S_ARG_BACKFILL_NARGS,
+            metavar=self.S_ARG_BACKFILL_METAVAR,
+            help=self.S_ARG_BACKFILL_HELP,
+        )
+
+        # add search option
+        group.add_argument(
+            self.S_ARG_SEARCH_OPTION,
+            dest=self.S_ARG_SEARCH_DEST,
+            metavar=self.S_ARG_SEARCH_METAVAR,
+            help=self.S_ARG_SEARCH_HELP,
+        )
+
+        # add show option
+        group.add_argument(
+            self.S_ARG_SHOW_OPTION,
+            dest=self.S_ARG_SHOW_DEST,
+            metavar=self.S_ARG_SHOW_METAVAR,
+            help=self.S_ARG_SHOW_HELP,
+        )
+
+        # add pin option
+        group.add_argument(
+            self.S_ARG_PIN_OPTION,
+            dest=self.S_ARG_PIN_DEST,
+            metavar=self.S_ARG_PIN_METAVAR,
+            help=self.S_ARG_PIN_HELP,
+        )
+
+        # add unpin option
+        group.add_argument(
+            self.S_ARG_UNPIN_OPTION,
+            dest=self.S_ARG_UNPIN_DEST,
+            metavar=self.S_ARG_UNPIN_METAVAR,
+            help=self.S_ARG_UNPIN_HELP,
+        )
+
+        # add profile option
+        self._parser.add_argument(
+            self.S_ARG_PROF_OPTION,
+            action=self.S_ARG_PROF_ACTION,
+            dest=self.S_ARG_PROF_DEST,
+            help=self.S_ARG_PROF_HELP,
+        )
+
+        # add scheduled option
+        self._parser.add_argument(
+            self.S_ARG_SCHED_OPTION,
+            action=self.S_ARG_SCHED_ACTION,
+            dest=self.S_ARG_SCHED_DEST,
+            help=self.S_ARG_SCHED_HELP,
+        )
+
+        # do setup
+        super()._setup()
+
+    # --------------------------------------------------------------------------
+    # Take the lock, then load config data from a file
+    # --------------------------------------------------------------------------
+    def _load_config(self):
+        """
+        Take the lock, then load config data from a file
+
+        Only one run at a time may change the config (or the archive), so
+        the lock is taken before the config is read. Otherwise a run that
+        started while another was active could load the old config and later
+        save it over the new one. Runs that only read (search and show) do
+        not need the lock, and so never save the config (see _save_config).
+        """
+
+        # only one run at a time
+        # NB: the os drops the lock when we exit, however we exit
+        b_read = (
+            self._dict_args.get(self.S_ARG_SEARCH_DEST) is not None
+            or self._dict_args.get(self.S_ARG_SHOW_DEST) is not None
+        )
+        if not b_read and not self._lock.acquire():
+            print(self.S_MSG_LOCKED)
+            sys.exit(0)
+
+        # do load
+        super()._load_config()
+
+    # --------------------------------------------------------------------------
+    # Save config data to a file, if we have the lock
+    # --------------------------------------------------------------------------
+    def _save_config(self):
+        """
+        Save config data to a file, if we have the lock
+
+        A run that did not take the lock (search and show) must not write
+        the config, since a locked run may be changing it at the same time.
+        Any change such a run made is dropped.
+        """
+
+        # NB: only the owner of the lock writes
+        if not self._lock.is_held():
+            return
+
+        # do save
+        super()._save_config()
+
+    # --------------------------------------------------------------------------
+    # Enable cron job
+    # --------------------------------------------------------------------------
+    def _enable(self):
+        """
+        Enable cron job
+        """
+
+        # debug foo
+        if self._cmd_debug:
+            print("_enable")
+            return
+
+        # show some text
+        print(self.S_MSG_CRON_ADD, end="", flush=True)
+
+        # */10 * * * * env DISPLAY=:0
+        # DBUS_SESSION_BUS_ADDRESS=unix:path=/run/user/1000/bus
+        # /home/dana/.local/share/spaceoddity/.venv-spaceoddity/bin/python
+        # /home/dana/.local/share/spaceoddity/src/spaceoddity.py --scheduled
+        # # SpaceOddity
+
+        # ----------------------------------------------------------------------
+        # get cron command
+
+        # set the job command
+        uid = os.getuid()
+        cron_cmd = self.S_CMD_CRON.format(
+            uid,
+            sys.executable,
+            Path(__file__).resolve(),
+            self.S_ARG_SCHED_OPTION,
+        )
+
+        # ----------------------------------------------------------------------
+        # create cron object
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        from crontab import CronTab
+
+        # get current user's crontab
+        my_cron = CronTab(user=True)
+
+        # find 'every' job
+        my_job = None
+        for job in my_cron:
+
+            # find our job
+            if job.comment == self.S_PRG_NAME:
+                my_job = job
+                break
+
+        # create new job if necessary
+        if not my_job:
+            my_job = my_cron.new(command=cron_cmd, comment=self.S_PRG_NAME)
+
+        # update old jobs to current cmd
+        my_job.set_command(cron_cmd)
+
+        # set job time
+        my_job.enable()
+        my_job.minute.every(10) # type: ignore
+
+        # save job parameters
+        my_cron.write()
+
+        # show some text
+        print(self.S_MSG_DONE)
+
+    # --------------------------------------------------------------------------
+    # Disable cron job
+    # --------------------------------------------------------------------------
+    def _disable(self):
+        """
+        Disable cron job
+        """
+
+        # debug foo
+        if self._cmd_debug:
+            print("_disable")
+            return
+
+        # show some text
+        print(self.S_MSG_CRON_DEL, end="", flush=True)
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        from crontab import CronTab
+
+        # get current user's crontab
+        my_cron = CronTab(user=True)
+
+        # remove our job
+        for job in my_cron:
+            if job.comment == self.S_PRG_NAME:
+                my_cron.remove(job)
+
+        # save job parameters
+        my_cron.write()
+
+        # show some text
+        print(self.S_MSG_DONE)
+
+    # --------------------------------------------------------------------------
+    # Get json from api.nasa.gov
+    # --------------------------------------------------------------------------
+    def _get_apod_dict(self):
+        """
+        Get json from api.nasa.gov
+
+        Returns:
+            True if there is a new image to download, False if not, or None if
+            the server reported that nothing has changed (304)
+
+        The request is sent with the ETag/Last-Modified values from the last
+        response, so an unchanged APOD costs one small round trip and skips
+        parsing the json entirely.
+        """
+
+        # debug_foo
+        if self._cmd_debug:
+            print("_get_apod_dict")
+            return True
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import spaceoddity_http as H
+
+        # add validators from the last response
+        dict_hdrs = {}
+        etag = self._dict_cfg.get(self.S_KEY_ETAG, "")
+        if etag:
+            dict_hdrs[self.S_HDR_IF_NONE_MATCH] = etag
+        last_mod = self._dict_cfg.get(self.S_KEY_LAST_MOD, "")
+        if last_mod:
+            dict_hdrs[self.S_HDR_IF_MOD_SINCE] = last_mod
+
+        # get the nasa json
         try:
-            F.run(self.S_CMD_LIGHT.format(self._new_file))
-        except F.CNRunError as error:
-            print(self.S_ERR_SET.format(error))
+
+            # get json from url
+            # NB: the connection goes back to the pool for the image
+            with self._deadline.stage(D.S_STAGE_META) as timeout:
+                with H.urlopen(
+                    self._get_api_url(), dict_hdrs, timeout
+                ) as response:
+                    response_text = response.read()
+            self._stats.add_bytes(self.S_STEP_DICT, len(response_text))
+
+        except HTTPError as error:
+
+            # not modified is not an error
+            if error.code == self.I_HTTP_NOT_MOD:
+                self._save_rate(error.headers)
+                print(self.S_MSG_NOT_MOD)
+                return None
+
+            # too many requests, wait as long as the server says
+            if self._check_rate(error, RL.S_SUB_POLL):
+                sys.exit(-1)
+
+            # some other server error
+            print(self.S_ERR_GET.format(error))
+            self._record_failure(error)
+            sys.exit(-1)
+
+        except OSError as error:
+
+            # prob no internet
+            print(self.S_ERR_GET.format(error))
+            self._record_failure(error)
             sys.exit(-1)
 
+        print(self.S_MSG_GET)
+
+        # remember how many requests we have left
+        self._save_rate(response.headers)
+
+        # remember validators for the next request
+        self._dict_cfg[self.S_KEY_ETAG] = response.headers.get(
+            self.S_HDR_ETAG, ""
+        )
+        self._dict_cfg[self.S_KEY_LAST_MOD] = response.headers.get(
+            self.S_HDR_LAST_MOD, ""
+        )
+
+        # ----------------------------------------------------------------------
+
+        # get the old and new apod dicts
+        apod_dict_old = self._dict_cfg[self.S_KEY_APOD]
+        apod_dict_new = json.loads(response_text)
+
+        # remember the date, even if it is not an image
+        self._apod_date = apod_dict_new.get(self.S_KEY_APOD_DATE)
+
+        # check if url is the same
+        if self._check_same_url(apod_dict_old, apod_dict_new):
+            print(self.S_MSG_SAME_URL)
+            return False
+
+        # keep every new day in the archive, even if it is not an image
+        self._add_to_archive(apod_dict_new)
+
+        # check if today's apod is an image (sometimes it's a video)
+        media_type = apod_dict_new[self.S_KEY_APOD_TYPE]
+        if media_type not in self.S_MEDIA_TYPES:
+            print(self.S_MSG_NOT_IMG)
+            return False
+
+        # apply new dict to config
+        self._dict_cfg[self.S_KEY_APOD] = apod_dict_new
+
+        return True
+
+    # --------------------------------------------------------------------------
+    # Update the schedule for the next check
+    # --------------------------------------------------------------------------
+    def _update_sched(self):
+        """
+        Update the schedule for the next check
+
+        Uses the date of the APOD we just got (if any) to find when the next
+        one is expected, or backs off if we are past that time and it has not
+        shown up yet. Scheduled runs use this to skip the network entirely.
+        This is only called once the day is done (the wallpaper is set, or
+        the server sent 304), so a failed download or apply is retried.
+        """
+
+        # debug_foo
+        if self._cmd_debug:
+            print("_update_sched")
+            return
+
+        # load, update, save
+        # NB: we heard from the server, so the network is fine
+        dict_state = S.load_state()
+        S.update(dict_state, self._apod_date)
+        S.record_success(dict_state)
+        S.save_state(dict_state)
+
+    # --------------------------------------------------------------------------
+    # Note a failed check so scheduled runs back off
+    # --------------------------------------------------------------------------
+    def _record_failure(self, error):
+        """
+        Note a failed check so scheduled runs back off
+
+        Args:
+            error: The exception that made the check fail
+
+        Scheduled runs (and the daemon) wait longer after each failure in a
+        row, and stop trying for a while once the circuit opens, so a dead
+        network does not mean a timeout and a log entry every few minutes.
+        """
+
+        # debug_foo
+        if self._cmd_debug:
+            print("_record_failure")
+            return
+
+        # load, update, save
+        dict_state = S.load_state()
+        if S.record_failure(dict_state, type(error).__name__):
+            self._logger.warning(self.S_ERR_CIRCUIT.format(S.I_FAIL_OPEN))
+        S.save_state(dict_state)
+
+    # --------------------------------------------------------------------------
+    # Get image from api.nasa.gov
+    # --------------------------------------------------------------------------
+    def _get_apod_image(self):
+        """
+        Description
+        """
+
+        # debug_foo
+        if self._cmd_debug:
+            print("_get_apod_image")
+            return
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import sqlite3
+        import spaceoddity_store as ST
+
+        # get current apod dict
+        apod_dict = self._dict_cfg[self.S_KEY_APOD]
+
+        # try to get image
         try:
-            F.run(self.S_CMD_DARK.format(self._new_file))
-        except F.CNRunError as error:
-            print(self.S_ERR_SET.format(error))
+
+            # get the image into the store (a no-op if we already have it)
+            store = self._get_store()
+            store.clean_tmp()
+            with self._deadline.stage(D.S_STAGE_DL) as timeout:
+                src_url = self._pick_image_url(apod_dict, timeout)
+
+                # show the small image first if the large one is needed
+                url_sd = apod_dict.get(self.S_KEY_APOD_URL, "")
+                if (
+                    self._dict_cfg.get(self.S_KEY_PROGRESSIVE)
+                    and url_sd
+                    and src_url != url_sd
+                ):
+                    self._url_swap = src_url
+                    src_url = url_sd
+                    print(self.S_MSG_SD_FIRST, flush=True)
+
+                path_obj, sha256, size = store.fetch(
+                    src_url,
+                    timeout=timeout,
+                    max_bytes=self._get_limits()[LM.S_KEY_MAX_BYTES],
+                )
+            self._stats.add_bytes(self.S_STEP_IMAGE, size)
+
+            # don't show an image that is too big to decode
+            self._check_image(path_obj)
+            self._dict_cfg[self.S_KEY_BASE] = sha256
+
+            # the wallpaper is a link to the object
+            self._link_wallpaper(path_obj, ST.get_ext(src_url))
+
+        except (OSError, sqlite3.Error) as error:
+            # this is a fatal error
+            print(self.S_ERR_DL.format(error))
+            self._record_failure(error)
             sys.exit(-1)
 
+        # keep it in the archive too, which costs no extra space
+        self._link_to_archive(apod_dict, path_obj, sha256, src_url)
+
+        print(self.S_MSG_DL)
+
+        # make room for it
+        self._evict()
+
+    # --------------------------------------------------------------------------
+    # Replace the small image on screen with the large one
+    # --------------------------------------------------------------------------
+    def _swap_image(self):
+        """
+        Replace the small image on screen with the large one
+
+        Called after the small image has been set, in progressive mode. The
+        large image is downloaded with whatever time is left in the run,
+        checked, given the same text overlay, and set in one step, since the
+        desktop only ever sees a complete file under a new name. If anything
+        goes wrong before the switch, the small image stays up, which is
+        still a good result, so this is not an error for the run.
+        """
+
+        # debug_foo
+        if self._cmd_debug:
+            print("_swap_image")
+            return
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import sqlite3
+        import spaceoddity_store as ST
+
+        apod_dict = self._dict_cfg[self.S_KEY_APOD]
+        file_sd = self._new_file
+        sha_sd = self._dict_cfg[self.S_KEY_BASE]
+        shown_sd = self._dict_cfg[self.S_KEY_SHOWN]
+
+        try:
+
+            # get the large image
+            store = self._get_store()
+            with self._deadline.stage(D.S_STAGE_DL) as timeout:
+                path_obj, sha256, size = store.fetch(
+                    self._url_swap,
+                    timeout=timeout,
+                    max_bytes=self._get_limits()[LM.S_KEY_MAX_BYTES],
+                )
+            self._stats.add_bytes(self.S_STEP_SWAP, size)
+
+            # make sure it is an image, and not too big, before we show it
+            if not self._check_image(path_obj):
+                raise OSError(self.S_ERR_NOT_IMG)
+
+            # link it and give it the overlay
+            self._link_wallpaper(path_obj, ST.get_ext(self._url_swap))
+            self._dict_cfg[self.S_KEY_BASE] = sha256
+            with self._deadline.stage(D.S_STAGE_COMP):
+                self._do_text()
+
+        except (OSError, sqlite3.Error, StageTimeout) as error:
+
+            # keep the small image
+            if self._new_file != file_sd:
+                Path(self._new_file).unlink(missing_ok=True)
+                self._new_file = file_sd
+            self._dict_cfg[self.S_KEY_BASE] = sha_sd
+            self._dict_cfg[self.S_KEY_SHOWN] = shown_sd
+            print(self.S_ERR_SWAP.format(error))
+            return
+
+        # show it, then drop the small one
+        self._set_image()
+        Path(file_sd).unlink(missing_ok=True)
+        self._dict_cfg[self.S_KEY_FILE_OLD] = self._new_file
+
+        # the archive gets the large one
+        self._link_to_archive(
+            apod_dict, path_obj, sha256, self._url_swap, True
+        )
+
+        print(self.S_MSG_SWAP)
+
+        # make room for it
+        self._evict()
+
+    # --------------------------------------------------------------------------
+    # Check the size of an image from its header
+    # --------------------------------------------------------------------------
+    def _check_image(self, path_obj):
+        """
+        Check the size of an image from its header
+
+        Args:
+            path_obj: The path of the image
+
+        Returns:
+            The (width, height) of the image, or None if the header can't
+            be read (ie. it is not an image, or not a type we can read)
+
+        Raises:
+            LM.LimitError: If the image is over max_pixels
+            OSError: If the file can not be read
+
+        Only the first few KB are read, nothing is decoded, so an image that
+        is too big is turned down before it can use any memory.
+        """
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import spaceoddity_http as H
+
+        with open(path_obj, "rb") as a_file:
+            img_size = IS.get_size(a_file.read(H.I_PROBE_SIZE))
+        if img_size:
+            LM.check_pixels(img_size, self._get_limits())
+        return img_size
+
+    # --------------------------------------------------------------------------
+    # Make a new wallpaper file that links to an image in the store
+    # --------------------------------------------------------------------------
+    def _link_wallpaper(self, path_obj, file_ext, sha256=None):
+        """
+        Make a new wallpaper file that links to an image in the store
+
+        Args:
+            path_obj: The path of the image in the store, or of a file made
+            from it
+            file_ext: The extension of the image, without a dot
+            sha256: The hash of the image in the store, if path_obj is a file
+            made from it (default: None)
+
+        The name changes every time so the desktop sees a new picture.
+        """
+
+        # create a wallpaper path
+        now = datetime.now()
+        str_now = now.strftime(self.S_TIME_FMT)
+
+        # get new pic name
+        pic_name = self.S_FILE_FMT.format(str_now, file_ext)
+        pic_path = B.P_DIR_CONF / pic_name
+
+        # NB: the plain, captioned, small, and large images of a run can all
+        # land in the same second
+        stem = pic_path.stem
+        count = 0
+        while str(pic_path) == self._new_file or pic_path.exists():
+            count += 1
+            pic_path = pic_path.with_stem(f"{stem}_{count}")
+
+        # the wallpaper is a link to the object
+        self._get_store().link(path_obj, pic_path, sha256)
+
+        # store new file
+        self._new_file = str(pic_path)
+
+    # --------------------------------------------------------------------------
+    # Get the smallest image url that still looks good on the screen
+    # --------------------------------------------------------------------------
+    def _pick_image_url(self, apod_dict, timeout):
+        """
+        Get the smallest image url that still looks good on the screen
+
+        Args:
+            apod_dict: The APOD dict
+            timeout: The socket timeout for the probes
+
+        Returns:
+            The url to download
+
+        The hd url is often many times bigger than the screen needs. Both
+        urls are probed for the first few KB, which is enough to read the
+        image size from the file header, and the smallest image that covers
+        the screen in the configured scale mode is used. If that can't be
+        worked out (no screen, a probe fails, or neither image is big
+        enough), the hd url is used, as before, unless it is over the pixel
+        limit, then the small one is used.
+        """
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import spaceoddity_http as H
+
+        # get the choices
+        url_sd = apod_dict.get(self.S_KEY_APOD_URL, "")
+        url_hd = apod_dict.get(self.S_KEY_APOD_HDURL, "")
+
+        # only one choice
+        if not url_sd or not url_hd or url_sd == url_hd:
+            return url_hd or url_sd
+
+        # need a screen to compare to
+        l_monitors = self._get_monitors()
+        if not l_monitors:
+            return url_hd
+
+        # probe both and sort smallest first
+        l_sizes = []
+        l_too_big = []
+        for url in (url_sd, url_hd):
+            try:
+                data = H.probe(url, timeout=timeout)
+            except OSError:
+                continue
+            self._stats.add_bytes(self.S_STEP_IMAGE, len(data))
+            # NB: a header that says 0 wide (or high) is as good as none
+            img_size = IS.get_size(data)
+            if not img_size or not all(img_size):
+                continue
+
+            # never pick one that is too big to show
+            try:
+                LM.check_pixels(img_size, self._get_limits())
+            except LM.LimitError:
+                l_too_big.append(url)
+                continue
+            l_sizes.append((img_size[0] * img_size[1], img_size, url))
+        l_sizes.sort()
+
+        # use the first one that is big enough for every monitor
+        mode = self._dict_cfg.get(self.S_KEY_SCALE, SC.S_MODE_FILL)
+        for _area, img_size, url in l_sizes:
+            if all(
+                SC.covers(img_size, mon[2:], mode) for mon in l_monitors
+            ):
+                scr_size = max(
+                    (mon[2:] for mon in l_monitors),
+                    key=lambda size: size[0] * size[1],
+                )
+                print(self.S_MSG_PICK.format(*img_size, *scr_size))
+                return url
+
+        return url_sd if url_hd in l_too_big else url_hd
+
+    # --------------------------------------------------------------------------
+    # Add the current image to the archive dir
+    # --------------------------------------------------------------------------
+    def _link_to_archive(
+        self, a_dict, path_obj, sha256, src_url, replace=False
+    ):
+        """
+        Add the current image to the archive dir
+
+        Args:
+            a_dict: The APOD dict
+            path_obj: The path of the image in the store
+            sha256: The hash of the image
+            src_url: The url the image was downloaded from, which gives the
+            file its extension
+            replace: True to replace an image that is already in the
+            archive for this day (default: False)
+
+        The archive file is a link to the same object as the wallpaper.
+        Errors are printed but not fatal, the archive is not needed to set
+        the wallpaper.
+        """
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import spaceoddity_backfill as BF
+
+        try:
+            path_img = BF.get_image_path(a_dict, B.P_DIR_ARCHIVE, src_url)
+            path_old = BF.find_image_path(a_dict, B.P_DIR_ARCHIVE)
+            if replace or not path_old:
+
+                # NB: the other url may have been another format
+                if path_old and path_old != path_img:
+                    path_old.unlink()
+                self._get_store().link(path_obj, path_img)
+            else:
+                path_img = path_old
+            BF.save_json(a_dict, B.P_DIR_ARCHIVE)
+        except OSError as error:
+            print(self.S_ERR_ARCHIVE.format(error))
+            return
+
+        self._add_to_archive(a_dict, path_img, sha256)
+
+    # --------------------------------------------------------------------------
+    # Do text overlay
+    # --------------------------------------------------------------------------
+    def _do_text(self):
+        """
+        Scale the wallpaper to the screen and put the caption on it
+
+        The image is rendered at the size of each monitor in the configured
+        scale mode (see spaceoddity_render), so the desktop never has to
+        scale a large image itself, and the caption is drawn as set in the
+        config's "caption" dict (see spaceoddity_caption). The result is a
+        new file in the cache, and the wallpaper becomes a new link to it, so
+        the image in the store (and the archive) is never changed. With no
+        screen to ask and no caption, the wallpaper is the plain image.
+
+        What is on screen is remembered as a key made from the image, the
+        text, the settings, and the monitors. If the key has not changed,
+        there is nothing to do, and Pillow is not even imported. If the
+        finished image is still in the cache, it is used as-is. Errors are
+        printed but not fatal, the plain image is still a good wallpaper.
+        """
+
+        # debug_foo
+        if self._cmd_debug:
+            print("_do_text")
+            return
+
+        # NB: deferred import, only needed here
+        # pylint: disable=import-outside-toplevel
+        import sqlite3
+        import spaceoddity_caption as CP
+
+        # need to know which image is under the wallpaper
+        sha256 = self._dict_cfg.get(self.S_KEY_BASE, "")
+        if not sha256 or not self._new_file:
+            return
+
+        # find what the wallpaper should be
+        dict_cap = CP.get_settings(self._dict_cfg.get(self.S_KEY_CAPTION))
+        try:
+            text = CP.get_text(self._dict_cfg[self.S_KEY_APOD], dict_cap)
+        except ValueError as error:
+            print(self.S_ERR_TEXT.format(error))
+            return
+        l_monitors = self._get_monitors()
+        mode = self._dict_cfg.get(self.S_KEY_SCALE, SC.S_MODE_FILL)
+        key = sha256
+        if text or l_monitors:
+            key = CP.get_key(sha256, text, dict_cap, l_monitors, mode)
+
+        # it already is
+        if (
+            key == self._dict_cfg.get(self.S_KEY_SHOWN)
+            and Path(self._new_file).exists()
+        ):
+            return
+
+        # a file this run made, which the new one replaces
+        file_old = self._dict_cfg[self.S_KEY_FILE_OLD]
+        file_raw = self._new_file if self._new_file != file_old else ""
+
+        # the new image is already what we want
+        if key == sha256 and file_raw:
+            self._dict_cfg[self.S_KEY_SHOWN] = key
+            return
+
+        try:
+
+            # get the finished image
+            store = self._get_store()
+            path_obj = store.get_path(sha256)
+            file_ext = store.get_ext(sha256)
+            if key != sha256:
+                compositor = self._get_compositor()
+                path_out = compositor.compose(
+                    path_obj, key, file_ext, text, dict_cap, l_monitors, mode
+                )
+                file_ext = path_out.suffix[1:]
+
+                # drop finished images that are not used any more
+                compositor.clean([path_out])
+            else:
+                path_out = path_obj
+
+            # link it
+            self._link_wallpaper(path_out, file_ext, sha256)
+
+        except (OSError, ValueError, sqlite3.Error) as error:
+
+            # keep the plain image
+            print(self.S_ERR_TEXT.format(error))
+            return
+
+        # done with the plain file
+        if file_raw:
+            Path(file_raw).unlink(missing_ok=True)
+        self._dict_cfg[self.S_KEY_SHOWN] = key
+
+        if key != sha256:
+            print(self.S_MSG_TEXT)
+
+    # --------------------------------------------------------------------------
+    # Set the wallpaper
+    # --------------------------------------------------------------------------
+    def _set_image(self):
+        """
+        Description
+        """
+
+        # debug_foo
+        if self._cmd_debug:
+            print("_set_image")
+            return
+
+        # NB: a wedged dbus session can hang gsettings, the stage alarm
+        # kills it
+        with self._deadline.stage(D.S_STAGE_APPLY):
+
+            try:
+                F.run(self.S_CMD_LIGHT.format(self._new_file))
+            except F.CNRunError as error:
+                print(self.S_ERR_SET.format(error))
+                sys.exit(-1)
+
+            try:
+                F.run(self.S_CMD_DARK.format(self._new_file))
+            except F.CNRunError as error:
+                print(self.S_ERR_SET.format(error))
+                sys.exit(-1)
+
+            # NB: a wallpaper rendered for more than one monitor is laid out
+            # like the monitors, so it must span them
+            if len(self._get_monitors()) > 1 and self._dict_cfg.get(
+                self.S_KEY_SHOWN
+            ) != self._dict_cfg.get(self.S_KEY_BASE):
+                try:
+                    F.run(self.S_CMD_SPAN)
+                except F.CNRunError as error:
+                    print(self.S_ERR_SET.format(error))
+                    sys.exit(-1)
+
         print(self.S_MSG_SET)
 
+    # --------------------------------------------------------------------------
+    # Point the desktop back at the old image
+    # --------------------------------------------------------------------------
+    def _reset_image(self, file_old):
+        """
+        Point the desktop back at the old image
+
+        Args:
+            file_old: The path of the image to go back to
+
+        Used when setting the new image ran out of time, which may have been
+        after one of the settings was changed. This gets a fresh apply budget,
+        and if it fails too, there is nothing more to do.
+        """
+
+        # debug_foo
+        if self._cmd_debug:
+            print("_reset_image")
+            return
+
+        # NB: the cycle's deadline has already run out
+        deadline = Deadline(self._dict_cfg.get(self.S_KEY_DEADLINE))
+        try:
+            with deadline.stage(D.S_STAGE_APPLY):
+                F.run(self.S_CMD_LIGHT.format(file_old))
+                F.run(self.S_CMD_DARK.format(file_old))
+        except (F.CNRunError, StageTimeout) as error:
+            print(self.S_ERR_SET.format(error))
+
+    # --------------------------------------------------------------------------
+    # Delete the image made by a cycle that did not finish
+    # --------------------------------------------------------------------------
+    def _delete_new_image(self):
+        """
+        Delete the image made by a cycle that did not finish
+
+        The file is only a link to (or a copy of) an image in the store or
+        the cache, so nothing else is lost.
+        """
+
+        # debug_foo
+        if self._cmd_debug:
+            print("_delete_new_image")
+            return
+
+        try:
+            Path(self._new_file).unlink(missing_ok=True)
+        except OSError as error:
+            print(self.S_ERR_DEL.format(error))
+
     # --------------------------------------------------------------------------
     # Delete old image
     # --------------------------------------------------------------------------
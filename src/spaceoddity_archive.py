@@ -0,0 +1,334 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_archive.py                                |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+A local database of every APOD we have seen
+
+Each day's metadata (date, title, explanation, urls, media type) is kept in a
+SQLite table keyed by date, along with the path and hash of the local image
+if there is one. An FTS5 index over the title and explanation makes text
+searches instant and offline.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import hashlib
+import json
+import sqlite3
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# name of the db file in the archive dir
+S_FILE_DB = "archive.db"
+
+# apod dict keys
+S_KEY_DATE = "date"
+S_KEY_TITLE = "title"
+S_KEY_EXP = "explanation"
+S_KEY_URL = "url"
+S_KEY_HDURL = "hdurl"
+S_KEY_TYPE = "media_type"
+
+# extra keys in the dicts we return
+S_KEY_PATH = "path"
+S_KEY_SHA256 = "sha256"
+S_KEY_SNIPPET = "snippet"
+
+# size of reads when hashing a file
+I_HASH_CHUNK = 1024 * 1024
+
+# default number of search results
+I_SEARCH_LIMIT = 20
+
+# schema
+# NB: the fts table uses the main table as its content, and the triggers
+# keep the two in sync
+L_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS apod (
+        date TEXT PRIMARY KEY,
+        title TEXT,
+        explanation TEXT,
+        url TEXT,
+        hdurl TEXT,
+        media_type TEXT,
+        path TEXT,
+        sha256 TEXT,
+        json TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS apod_sha256 ON apod (sha256)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS apod_fts USING fts5 (
+        title, explanation, content='apod', content_rowid='rowid'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS apod_ai AFTER INSERT ON apod BEGIN
+        INSERT INTO apod_fts (rowid, title, explanation)
+        VALUES (new.rowid, new.title, new.explanation);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS apod_ad AFTER DELETE ON apod BEGIN
+        INSERT INTO apod_fts (apod_fts, rowid, title, explanation)
+        VALUES ('delete', old.rowid, old.title, old.explanation);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS apod_au AFTER UPDATE ON apod BEGIN
+        INSERT INTO apod_fts (apod_fts, rowid, title, explanation)
+        VALUES ('delete', old.rowid, old.title, old.explanation);
+        INSERT INTO apod_fts (rowid, title, explanation)
+        VALUES (new.rowid, new.title, new.explanation);
+    END
+    """,
+]
+
+# statements
+S_SQL_UPSERT = """
+    INSERT INTO apod (
+        date, title, explanation, url, hdurl, media_type, path, sha256, json
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (date) DO UPDATE SET
+        title = excluded.title,
+        explanation = excluded.explanation,
+        url = excluded.url,
+        hdurl = excluded.hdurl,
+        media_type = excluded.media_type,
+        path = COALESCE(excluded.path, apod.path),
+        sha256 = COALESCE(excluded.sha256, apod.sha256),
+        json = excluded.json
+"""
+S_SQL_GET = "SELECT json, path, sha256 FROM apod WHERE date = ?"
+S_SQL_DATES = "SELECT date FROM apod"
+S_SQL_CLEAR = "UPDATE apod SET path = NULL WHERE sha256 = ?"
+S_SQL_SEARCH = """
+    SELECT apod.date, apod.title,
+        snippet(apod_fts, 1, '[', ']', '...', 12)
+    FROM apod_fts JOIN apod ON apod.rowid = apod_fts.rowid
+    WHERE apod_fts MATCH ?
+    ORDER BY bm25(apod_fts), apod.date DESC
+    LIMIT ?
+"""
+
+# ------------------------------------------------------------------------------
+# Classes
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# A local database of every APOD we have seen
+# ------------------------------------------------------------------------------
+class Archive:
+    """
+    A local database of every APOD we have seen
+
+    Methods:
+        add(a_dict, path, sha256): Add or update one day
+        get(str_date): Get one day
+        get_dates(): Get the dates of all days in the archive
+        clear_path(sha256): Forget the local file of an image
+        search(query, limit): Search titles and explanations
+        close(): Close the db
+
+    The db file is created on first use. Errors from sqlite are raised as
+    sqlite3.Error.
+    """
+
+    # --------------------------------------------------------------------------
+    # Instance methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the new object
+    # --------------------------------------------------------------------------
+    def __init__(self, path):
+        """
+        Initialize the new object
+
+        Args:
+            path: The path to the db file
+
+        Initializes a new instance of the class, setting the default values
+        of its properties, and any other code that needs to run to create a
+        new object.
+        """
+
+        # make sure dir exists
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # open db and make tables
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            for stmt in L_SCHEMA:
+                self._conn.execute(stmt)
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Add or update one day
+    # --------------------------------------------------------------------------
+    def add(self, a_dict, path=None, sha256=None):
+        """
+        Add or update one day
+
+        Args:
+            a_dict: The APOD dict from the server
+            path: The path to the local image, if any (default: None)
+            sha256: The hash of the local image, if any (default: None). If
+            path is given without a hash, the file is hashed.
+
+        A day that is already in the archive is updated. A path or hash of
+        None keeps the old value.
+        """
+
+        # hash file if we need to
+        if path and not sha256:
+            sha256 = hash_file(path)
+
+        with self._conn:
+            self._conn.execute(
+                S_SQL_UPSERT,
+                (
+                    a_dict.get(S_KEY_DATE),
+                    a_dict.get(S_KEY_TITLE, ""),
+                    a_dict.get(S_KEY_EXP, ""),
+                    a_dict.get(S_KEY_URL, ""),
+                    a_dict.get(S_KEY_HDURL, ""),
+                    a_dict.get(S_KEY_TYPE, ""),
+                    str(path) if path else None,
+                    sha256,
+                    json.dumps(a_dict),
+                ),
+            )
+
+    # --------------------------------------------------------------------------
+    # Get one day
+    # --------------------------------------------------------------------------
+    def get(self, str_date):
+        """
+        Get one day
+
+        Args:
+            str_date: The date, like "2026-10-18"
+
+        Returns:
+            The APOD dict with S_KEY_PATH and S_KEY_SHA256 added, or None if
+            the day is not in the archive
+        """
+
+        row = self._conn.execute(S_SQL_GET, (str_date,)).fetchone()
+        if not row:
+            return None
+
+        a_dict = json.loads(row[0])
+        a_dict[S_KEY_PATH] = row[1]
+        a_dict[S_KEY_SHA256] = row[2]
+        return a_dict
+
+    # --------------------------------------------------------------------------
+    # Get the dates of all days in the archive
+    # --------------------------------------------------------------------------
+    def get_dates(self):
+        """
+        Get the dates of all days in the archive
+
+        Returns:
+            A set of date strings
+        """
+
+        return {row[0] for row in self._conn.execute(S_SQL_DATES)}
+
+    # --------------------------------------------------------------------------
+    # Forget the local file of an image
+    # --------------------------------------------------------------------------
+    def clear_path(self, sha256):
+        """
+        Forget the local file of an image
+
+        Args:
+            sha256: The hash of the image
+
+        Used when an image is evicted from the store. The metadata and the
+        hash are kept.
+        """
+
+        with self._conn:
+            self._conn.execute(S_SQL_CLEAR, (sha256,))
+
+    # --------------------------------------------------------------------------
+    # Search titles and explanations
+    # --------------------------------------------------------------------------
+    def search(self, query, limit=I_SEARCH_LIMIT):
+        """
+        Search titles and explanations
+
+        Args:
+            query: An FTS5 query, ie. "crab nebula" or "title:moon"
+            limit: The most results to return (default: I_SEARCH_LIMIT)
+
+        Returns:
+            A list of dicts with the date, title, and a snippet of the match,
+            best match first
+
+        Raises:
+            sqlite3.OperationalError: If the query is not valid FTS5 syntax
+        """
+
+        return [
+            {S_KEY_DATE: row[0], S_KEY_TITLE: row[1], S_KEY_SNIPPET: row[2]}
+            for row in self._conn.execute(S_SQL_SEARCH, (query, limit))
+        ]
+
+    # --------------------------------------------------------------------------
+    # Close the db
+    # --------------------------------------------------------------------------
+    def close(self):
+        """
+        Close the db
+        """
+
+        self._conn.close()
+
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Get the SHA-256 of a file
+# ------------------------------------------------------------------------------
+def hash_file(path):
+    """
+    Get the SHA-256 of a file
+
+    Args:
+        path: The path to the file
+
+    Returns:
+        The hex digest
+    """
+
+    hasher = hashlib.sha256()
+    with open(path, "rb") as a_file:
+        for chunk in iter(lambda: a_file.read(I_HASH_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# -)
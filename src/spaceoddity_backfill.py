@@ -0,0 +1,427 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_backfill.py                               |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Fill a local archive with past APODs
+
+The APOD api can return a whole range of days in one request (start_date and
+end_date), so the metadata for months of pictures costs a handful of calls.
+The images are then downloaded by a small thread pool into the image store.
+Each day in the archive gets a json file with its metadata, and a link to its
+image in the store if it was an image, so a day that is already on disk is
+never fetched again.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import json
+import sqlite3
+from urllib import parse
+
+# local imports
+import spaceoddity_http as H
+import spaceoddity_sched as S
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# format of dates in the api and in file names
+S_DATE_FMT = "%Y-%m-%d"
+
+# first APOD ever
+S_DATE_FIRST = "1995-06-16"
+
+# api params
+S_PARAM_START = "start_date"
+S_PARAM_END = "end_date"
+
+# apod dict keys
+S_KEY_DATE = "date"
+S_KEY_HDURL = "hdurl"
+S_KEY_URL = "url"
+S_KEY_TYPE = "media_type"
+
+# acceptable types
+L_MEDIA_TYPES = ["image"]
+
+# most days to ask for in one request
+I_RANGE_DAYS = 366
+
+# number of downloads at once
+I_WORKERS = 4
+
+# NB: format params are date and ext
+S_FILE_IMG = "{}.{}"
+# NB: format param is date
+S_FILE_JSON = "{}.json"
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Parse a date string
+# ------------------------------------------------------------------------------
+def parse_date(str_date):
+    """
+    Parse a date string
+
+    Args:
+        str_date: A date like "2026-10-18"
+
+    Returns:
+        A date object
+
+    Raises:
+        ValueError: If the string is not a valid date, or is outside the range
+        of APOD dates
+    """
+
+    # parse it
+    a_date = datetime.strptime(str_date, S_DATE_FMT).date()
+
+    # check range
+    first = datetime.strptime(S_DATE_FIRST, S_DATE_FMT).date()
+    if a_date < first or a_date > S.get_apod_today():
+        raise ValueError(str_date)
+
+    return a_date
+
+
+# ------------------------------------------------------------------------------
+# Get all the dates between two dates
+# ------------------------------------------------------------------------------
+def get_dates(date_start, date_end):
+    """
+    Get all the dates between two dates
+
+    Args:
+        date_start: The first date
+        date_end: The last date (included)
+
+    Returns:
+        A list of date objects
+    """
+
+    days = (date_end - date_start).days
+    return [date_start + timedelta(days=i) for i in range(days + 1)]
+
+
+# ------------------------------------------------------------------------------
+# Get the dates that are not in the archive yet
+# ------------------------------------------------------------------------------
+def get_missing(dir_archive, l_dates):
+    """
+    Get the dates that are not in the archive yet
+
+    Args:
+        dir_archive: The archive dir
+        l_dates: The dates to check
+
+    Returns:
+        The dates from l_dates that have no json file in the archive
+    """
+
+    return [
+        a_date
+        for a_date in l_dates
+        if not (dir_archive / S_FILE_JSON.format(a_date.isoformat())).exists()
+    ]
+
+
+# ------------------------------------------------------------------------------
+# Get the number of api requests needed for a range of dates
+# ------------------------------------------------------------------------------
+def count_requests(date_start, date_end):
+    """
+    Get the number of api requests needed for a range of dates
+
+    Args:
+        date_start: The first date
+        date_end: The last date (included)
+
+    Returns:
+        The number of requests fetch_range will make
+    """
+
+    days = (date_end - date_start).days + 1
+    return max(0, -(-days // I_RANGE_DAYS))
+
+
+# ------------------------------------------------------------------------------
+# Get the metadata for a range of dates
+# ------------------------------------------------------------------------------
+def fetch_range(
+    url_api, date_start, date_end, timeout=H.F_TIMEOUT, fn_headers=None
+):
+    """
+    Get the metadata for a range of dates
+
+    Args:
+        url_api: The api url, including the api key
+        date_start: The first date
+        date_end: The last date (included)
+        timeout: The socket timeout for each request (default: H.F_TIMEOUT)
+        fn_headers: A function to call with the headers of each response,
+        ie. to track the rate limit (default: None)
+
+    Returns:
+        A list of APOD dicts, in date order
+
+    Raises:
+        OSError: If a request fails
+        ValueError: If the server sends bad json
+
+    Long ranges are split into requests of at most I_RANGE_DAYS days.
+    """
+
+    l_dicts = []
+
+    # do one chunk at a time
+    chunk_start = date_start
+    while chunk_start <= date_end:
+        chunk_end = min(
+            chunk_start + timedelta(days=I_RANGE_DAYS - 1), date_end
+        )
+
+        # build url
+        str_params = parse.urlencode(
+            {
+                S_PARAM_START: chunk_start.isoformat(),
+                S_PARAM_END: chunk_end.isoformat(),
+            }
+        )
+        url = f"{url_api}&{str_params}"
+
+        # get the list
+        with H.urlopen(url, timeout=timeout) as response:
+            l_chunk = json.loads(response.read())
+        if fn_headers:
+            fn_headers(response.headers)
+        l_dicts.extend(l_chunk)
+
+        # next chunk
+        chunk_start = chunk_end + timedelta(days=1)
+
+    return l_dicts
+
+
+# ------------------------------------------------------------------------------
+# Save a list of APOD dicts (and their images) to the archive
+# ------------------------------------------------------------------------------
+def download_all(
+    l_dicts,
+    dir_archive,
+    store,
+    workers=I_WORKERS,
+    timeout=H.F_TIMEOUT,
+    max_bytes=0,
+):
+    """
+    Save a list of APOD dicts (and their images) to the archive
+
+    Args:
+        l_dicts: The APOD dicts to save
+        dir_archive: The archive dir
+        store: The Store to keep the images in
+        workers: The number of downloads at once (default: I_WORKERS)
+        timeout: The socket timeout for each download (default: H.F_TIMEOUT)
+        max_bytes: The largest image to accept, in bytes, or 0 for any size
+        (default: 0)
+
+    Returns:
+        A tuple of (list of (dict, image path, hash) saved, list of (dict,
+        error) that failed). The image path and hash are None for days that
+        are not images.
+
+    A day's json file is written only after its image has arrived, so a day
+    that fails will be tried again next time.
+    """
+
+    # make sure dir exists
+    dir_archive.mkdir(parents=True, exist_ok=True)
+
+    # run the pool
+    l_ok = []
+    l_fail = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        l_futures = [
+            (
+                a_dict,
+                pool.submit(
+                    save_day, a_dict, dir_archive, store, timeout, max_bytes
+                ),
+            )
+            for a_dict in l_dicts
+        ]
+
+        # collect results
+        for a_dict, future in l_futures:
+            try:
+                l_ok.append((a_dict, *future.result()))
+            except (OSError, sqlite3.Error) as error:
+                l_fail.append((a_dict, error))
+
+    return (l_ok, l_fail)
+
+
+# ------------------------------------------------------------------------------
+# Save one APOD dict (and its image) to the archive
+# ------------------------------------------------------------------------------
+def save_day(a_dict, dir_archive, store, timeout=H.F_TIMEOUT, max_bytes=0):
+    """
+    Save one APOD dict (and its image) to the archive
+
+    Args:
+        a_dict: The APOD dict to save
+        dir_archive: The archive dir
+        store: The Store to keep the image in
+        timeout: The socket timeout (default: H.F_TIMEOUT)
+        max_bytes: The largest image to accept, in bytes, or 0 for any size
+        (default: 0)
+
+    Returns:
+        A tuple of (path to the image, hash of the image). Both are None if
+        the day is not an image. The hash is None if the image was already
+        in the archive before there was a store.
+
+    Raises:
+        OSError: If the download fails or is too large
+        sqlite3.Error: If the store index fails
+    """
+
+    path_img = None
+    sha256 = None
+
+    # get image if it is one
+    # NB: a normal run may already have saved it, from either url
+    src_url = get_image_url(a_dict)
+    if src_url:
+        path_img = find_image_path(a_dict, dir_archive)
+        if not path_img:
+            path_img = get_image_path(a_dict, dir_archive, src_url)
+            path_obj, sha256, _size = store.fetch(
+                src_url, timeout=timeout, max_bytes=max_bytes
+            )
+            store.link(path_obj, path_img)
+
+    # write json last, it marks the day as done
+    save_json(a_dict, dir_archive)
+
+    return (path_img, sha256)
+
+
+# ------------------------------------------------------------------------------
+# Write the json file of one day
+# ------------------------------------------------------------------------------
+def save_json(a_dict, dir_archive):
+    """
+    Write the json file of one day
+
+    Args:
+        a_dict: The APOD dict to save
+        dir_archive: The archive dir
+
+    Raises:
+        OSError: If the file can not be written
+    """
+
+    path_json = dir_archive / S_FILE_JSON.format(a_dict[S_KEY_DATE])
+    path_json.write_text(json.dumps(a_dict, indent=4), encoding="UTF-8")
+
+
+# ------------------------------------------------------------------------------
+# Get the path of a day's image in the archive
+# ------------------------------------------------------------------------------
+def get_image_path(a_dict, dir_archive, src_url=None):
+    """
+    Get the path of a day's image in the archive
+
+    Args:
+        a_dict: The APOD dict
+        dir_archive: The archive dir
+        src_url: The url the image was downloaded from (default: None, uses
+        get_image_url)
+
+    Returns:
+        The path where the image is (or would be) saved, or None if the day
+        is not an image
+
+    The extension comes from the url, so pass the one that was actually
+    downloaded, since the url and hdurl may not be the same format.
+    """
+
+    # not an image
+    if not get_image_url(a_dict):
+        return None
+    if src_url is None:
+        src_url = get_image_url(a_dict)
+
+    file_ext = src_url.split(".")[-1]
+    return dir_archive / S_FILE_IMG.format(a_dict[S_KEY_DATE], file_ext)
+
+
+# ------------------------------------------------------------------------------
+# Find a day's image in the archive
+# ------------------------------------------------------------------------------
+def find_image_path(a_dict, dir_archive):
+    """
+    Find a day's image in the archive
+
+    Args:
+        a_dict: The APOD dict
+        dir_archive: The archive dir
+
+    Returns:
+        The path of the image, whichever of the day's urls it came from, or
+        None if it is not in the archive (or the day is not an image)
+    """
+
+    # not an image
+    if not get_image_url(a_dict):
+        return None
+
+    # try the hd url first, it is the one we usually get
+    for key in (S_KEY_HDURL, S_KEY_URL):
+        if a_dict.get(key):
+            path_img = get_image_path(a_dict, dir_archive, a_dict[key])
+            if path_img.exists():
+                return path_img
+
+    return None
+
+
+# ------------------------------------------------------------------------------
+# Get the best image url from an APOD dict
+# ------------------------------------------------------------------------------
+def get_image_url(a_dict):
+    """
+    Get the best image url from an APOD dict
+
+    Args:
+        a_dict: The APOD dict
+
+    Returns:
+        The hd url if there is one, else the url, or "" if it is not an image
+    """
+
+    # not an image
+    if a_dict.get(S_KEY_TYPE) not in L_MEDIA_TYPES:
+        return ""
+
+    return a_dict.get(S_KEY_HDURL) or a_dict.get(S_KEY_URL, "")
+
+
+# -)
@@ -22,7 +22,10 @@ directory).
 
 # system imports
 import argparse
+import copy
+import json
 import logging
+import os
 from pathlib import Path
 import sys
 
@@ -44,6 +47,15 @@ P_DIR_CONF = P_DIR_PRJ / "conf"
 # NB: if not using, set to None
 P_CFG_DEF = P_DIR_CONF / "spaceoddity.json"
 
+# dir of past APODs
+P_DIR_ARCHIVE = P_DIR_PRJ / "archive"
+
+# dir of downloaded images, by hash
+P_DIR_STORE = P_DIR_PRJ / "store"
+
+# dir of captions and finished wallpapers
+P_DIR_CACHE = P_DIR_PRJ / "cache"
+
 # path to default log file
 # NB: if not using, set to None
 P_LOG_DEF = P_DIR_PRJ / "log/spaceoddity.log"
@@ -199,6 +211,9 @@ class SpaceoddityBase:
         self._path_cfg_def = P_CFG_DEF
         self._dict_cfg = {}
 
+        # copy of cfg as last loaded/saved, to see if it changed
+        self._dict_cfg_clean = None
+
         # log stuff
         self._logger = logging.getLogger(__name__)
         logging.basicConfig(
@@ -371,6 +386,7 @@ class SpaceoddityBase:
                         )
 
                         # if we get here, we have loaded the highest file
+                        self._mark_config_clean()
                         return
                     except OSError as e:  # from load_dicts
                         F.printd(self.S_ERR_ERR, str(e))
@@ -394,6 +410,9 @@ class SpaceoddityBase:
             except OSError as e:  # from load_dicts
                 F.printd(self.S_ERR_ERR, str(e))
 
+        # remember what we loaded
+        self._mark_config_clean()
+
     # --------------------------------------------------------------------------
     # Save config data to a file
     # --------------------------------------------------------------------------
@@ -405,8 +424,16 @@ class SpaceoddityBase:
         written to save a dict to a json file, but it can be used for other
         formats as well. It uses the values of _dict_cfg, _path_cfg_def, and
         _path_cfg_arg to save the config data.
+
+        Nothing is written if the config has not changed since it was loaded
+        (or last saved). Each file is written atomically, so a crash can never
+        leave a half-written config behind.
         """
 
+        # nothing changed, nothing to do
+        if not self._is_config_dirty():
+            return
+
         # paths of config files
         l_paths = [self._path_cfg_arg, self._path_cfg_def]
 
@@ -417,11 +444,16 @@ class SpaceoddityBase:
             # order of saving (highest to lowest)
             for a_path in l_paths:
 
+                # skip unused path
+                if not a_path:
+                    continue
+
                 # set whole file to dict
                 try:
-                    F.save_dict_into_paths(self._dict_cfg, a_path)
+                    self._save_dict_atomic(a_path)
 
                     # if we get here, we have saved the file
+                    self._mark_config_clean()
                     return
                 except OSError as e:  # from save_dict
                     F.printd(self.S_ERR_ERR, str(e))
@@ -431,10 +463,78 @@ class SpaceoddityBase:
         else:
 
             try:
-                F.save_dict_into_paths(self._dict_cfg, l_paths)
+                for a_path in l_paths:
+                    if a_path:
+                        self._save_dict_atomic(a_path)
+                self._mark_config_clean()
             except OSError as e:  # from save_dict
                 F.printd(self.S_ERR_ERR, str(e))
 
+    # --------------------------------------------------------------------------
+    # Remember the current config as the saved state
+    # --------------------------------------------------------------------------
+    def _mark_config_clean(self):
+        """
+        Remember the current config as the saved state
+
+        Takes a deep copy of _dict_cfg, which _is_config_dirty compares
+        against.
+        """
+
+        self._dict_cfg_clean = copy.deepcopy(self._dict_cfg)
+
+    # --------------------------------------------------------------------------
+    # Check if the config has changed since it was loaded or saved
+    # --------------------------------------------------------------------------
+    def _is_config_dirty(self):
+        """
+        Check if the config has changed since it was loaded or saved
+
+        Returns:
+            True if _dict_cfg is different from the saved state
+        """
+
+        return self._dict_cfg != self._dict_cfg_clean
+
+    # --------------------------------------------------------------------------
+    # Write the config dict to a file atomically
+    # --------------------------------------------------------------------------
+    def _save_dict_atomic(self, a_path):
+        """
+        Write the config dict to a file atomically
+
+        Args:
+            a_path: The path to write to
+
+        Raises:
+            OSError: If the file could not be written
+
+        The dict is written to a temp file in the same dir, synced to disk,
+        and renamed over the old file. The dir is then synced so the rename
+        itself survives a power cut.
+        """
+
+        # make sure dir exists
+        a_path = Path(a_path)
+        a_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # write to temp file
+        path_tmp = a_path.with_name(a_path.name + ".tmp")
+        with open(path_tmp, "w", encoding="UTF-8") as a_file:
+            json.dump(self._dict_cfg, a_file, indent=4)
+            a_file.flush()
+            os.fsync(a_file.fileno())
+
+        # move into place
+        os.replace(path_tmp, a_path)
+
+        # sync the dir entry
+        fd_dir = os.open(a_path.parent, os.O_RDONLY)
+        try:
+            os.fsync(fd_dir)
+        finally:
+            os.close(fd_dir)
+
     # --------------------------------------------------------------------------
     # Handle the --uninstall cmd line op
     # --------------------------------------------------------------------------
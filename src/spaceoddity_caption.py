@@ -0,0 +1,719 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_caption.py                                |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Draw a caption over the wallpaper
+
+The caption is some text from the APOD dict (the title, by default), wrapped
+and drawn in a rounded, see-through box at one of nine positions on the
+image. The settings are a dict, see D_CAPTION. If the monitors are known, the
+image is first scaled to them (see spaceoddity_render), and the caption goes
+on the primary monitor.
+
+Drawing text is slow compared to pasting an image, so the caption box is
+drawn once into an RGBA layer and kept on disk, named after a hash of the
+text and every setting that changes how it looks. The finished image is kept
+too, named after a hash of the image, the layer, where it goes, and the
+monitors it was scaled to. So a new image with the same caption only pastes
+the cached layer, and a run where nothing changed can use the finished image
+without opening Pillow at all.
+
+With limits (see spaceoddity_limits), the drawing is done in a child process
+with limited memory, so a huge or broken image can only take down the child.
+
+NB: Pillow is only imported when something has to be drawn, so this module is
+cheap to import.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import hashlib
+import json
+import os
+from pathlib import Path
+import textwrap
+import time
+
+# local imports
+import spaceoddity_limits as LM
+import spaceoddity_render as R
+import spaceoddity_screen as SC
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# settings keys
+S_KEY_SHOW = "show"
+S_KEY_TEXT = "text"
+S_KEY_WRAP = "wrap"
+S_KEY_FONT = "font"
+S_KEY_FONT_SIZE = "font_size"
+S_KEY_FONT_COLOR = "font_color"
+S_KEY_BOX_COLOR = "box_color"
+S_KEY_RADIUS = "radius"
+S_KEY_PAD_EXT = "pad_ext"
+S_KEY_PAD_INT = "pad_int"
+S_KEY_POSITION = "position"
+
+# positions
+# NB: left to right, then top to bottom
+I_POS_TOP_LEFT = 0
+I_POS_TOP_CENTER = 1
+I_POS_TOP_RIGHT = 2
+I_POS_MID_LEFT = 3
+I_POS_MID_CENTER = 4
+I_POS_MID_RIGHT = 5
+I_POS_BOTTOM_LEFT = 6
+I_POS_BOTTOM_CENTER = 7
+I_POS_BOTTOM_RIGHT = 8
+
+# default settings
+# NB: text is a format string for the APOD dict, ie. "{title} ({date})".
+# font is the path to a .ttf/.otf file, or "" for Pillow's own font. colors
+# are [r, g, b, alpha]. pad_ext is between the image and the box, pad_int is
+# between the box and the text.
+D_CAPTION = {
+    S_KEY_SHOW: False,
+    S_KEY_TEXT: "{title}",
+    S_KEY_WRAP: 20,
+    S_KEY_FONT: "",
+    S_KEY_FONT_SIZE: 14,
+    S_KEY_FONT_COLOR: [0, 0, 0, 255],
+    S_KEY_BOX_COLOR: [255, 255, 255, 128],
+    S_KEY_RADIUS: 20,
+    S_KEY_PAD_EXT: 10,
+    S_KEY_PAD_INT: 10,
+    S_KEY_POSITION: I_POS_TOP_CENTER,
+}
+
+# settings that change how the layer looks
+L_KEYS_LAYER = [
+    S_KEY_WRAP,
+    S_KEY_FONT,
+    S_KEY_FONT_SIZE,
+    S_KEY_FONT_COLOR,
+    S_KEY_BOX_COLOR,
+    S_KEY_RADIUS,
+    S_KEY_PAD_INT,
+]
+
+# settings that change where the layer goes
+L_KEYS_PLACE = [S_KEY_POSITION, S_KEY_PAD_EXT]
+
+# layout of the cache dir
+S_DIR_LAYERS = "layers"
+S_DIR_OUTPUT = "output"
+
+# NB: format params are key and ext
+S_FILE_CACHE = "{}.{}"
+
+# file types
+S_EXT_LAYER = "png"
+S_EXT_JPEG = "jpg"
+S_EXT_PNG = "png"
+L_EXT_JPEG = ["jpg", "jpeg"]
+
+# how to save a jpeg
+I_JPEG_QUALITY = 95
+
+# suffix of a file that is not in place yet
+S_EXT_TMP = ".tmp"
+
+# how long a cached file is kept after it was last used, in seconds
+F_MAX_AGE = 7 * 24 * 60 * 60
+
+# ------------------------------------------------------------------------------
+# Classes
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Draws captions, and keeps what it drew
+# ------------------------------------------------------------------------------
+class Compositor:
+    """
+    Draws captions, and keeps what it drew
+
+    Methods:
+        get_path(key, ext): Get the path of a finished image
+        compose(path_base, key, ext, text, dict_caption, l_monitors, mode):
+        Get a finished image, making it if needed
+        draw(path_base, key, ext, text, dict_caption, l_monitors, mode):
+        Make a finished image in this process
+        clean(l_keep, max_age): Remove files that have not been used lately
+    """
+
+    # --------------------------------------------------------------------------
+    # Instance methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the new object
+    # --------------------------------------------------------------------------
+    def __init__(self, dir_cache, dict_limits=None):
+        """
+        Initialize the new object
+
+        Args:
+            dir_cache: The dir to keep layers and finished images in
+            dict_limits: The limits (see spaceoddity_limits), or None to
+            draw in this process with no limits (default: None)
+
+        Raises:
+            OSError if the dirs can not be made
+
+        Initializes a new instance of the class, setting the default values
+        of its properties, and any other code that needs to run to create a
+        new object.
+        """
+
+        # set props
+        self._dir_cache = Path(dir_cache)
+        self._dict_limits = dict_limits
+        self._dir_layers = Path(dir_cache) / S_DIR_LAYERS
+        self._dir_output = Path(dir_cache) / S_DIR_OUTPUT
+
+        # make sure dirs exist
+        self._dir_layers.mkdir(parents=True, exist_ok=True)
+        self._dir_output.mkdir(parents=True, exist_ok=True)
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Get the path of a finished image
+    # --------------------------------------------------------------------------
+    def get_path(self, key, ext):
+        """
+        Get the path of a finished image
+
+        Args:
+            key: The image's key, from get_key
+            ext: The extension of the image under the caption
+
+        Returns:
+            The path where the finished image is (or would be) kept
+
+        A jpeg stays a jpeg, anything else is saved as a png.
+        """
+
+        ext = S_EXT_JPEG if ext.lower() in L_EXT_JPEG else S_EXT_PNG
+        return self._dir_output / S_FILE_CACHE.format(key, ext)
+
+    # --------------------------------------------------------------------------
+    # Get a finished image, making it if needed
+    # --------------------------------------------------------------------------
+    def compose(
+        self,
+        path_base,
+        key,
+        ext,
+        text,
+        dict_caption=None,
+        l_monitors=None,
+        mode=SC.S_MODE_FILL,
+    ):
+        """
+        Get a finished image, making it if needed
+
+        Args:
+            path_base: The path of the image to draw on
+            key: The finished image's key, from get_key
+            ext: The extension of the image to draw on
+            text: The caption, from get_text, or "" for none
+            dict_caption: The caption settings (default: None, uses
+            D_CAPTION)
+            l_monitors: The monitors to scale the image to, or None to keep
+            its size (default: None)
+            mode: The scale mode, SC.S_MODE_FILL or SC.S_MODE_FIT (default:
+            SC.S_MODE_FILL)
+
+        Returns:
+            The path of the finished image
+
+        Raises:
+            LM.LimitError if the image is over a limit
+            OSError if the image can not be read or the result can not be
+            saved (Pillow raises OSError for images it can't read)
+
+        If the finished image is already in the cache, it is returned as-is,
+        without opening Pillow. If not, it is drawn, in a child process with
+        limited memory if this object has limits. The image on disk is never
+        changed.
+        """
+
+        # already made
+        path_out = self.get_path(key, ext)
+        if path_out.exists():
+            _touch(path_out)
+            return path_out
+
+        # draw it here
+        if self._dict_limits is None:
+            return self.draw(
+                path_base, key, ext, text, dict_caption, l_monitors, mode
+            )
+
+        # draw it in a child
+        l_args = [
+            str(self._dir_cache),
+            str(path_base),
+            key,
+            ext,
+            text,
+            dict_caption,
+            l_monitors,
+            mode,
+        ]
+        return Path(LM.run(LM.S_FUNC_COMPOSE, l_args, self._dict_limits))
+
+    # --------------------------------------------------------------------------
+    # Make a finished image in this process
+    # --------------------------------------------------------------------------
+    def draw(
+        self,
+        path_base,
+        key,
+        ext,
+        text,
+        dict_caption=None,
+        l_monitors=None,
+        mode=SC.S_MODE_FILL,
+    ):
+        """
+        Make a finished image in this process
+
+        Args:
+            path_base: The path of the image to draw on
+            key: The finished image's key, from get_key
+            ext: The extension of the image to draw on
+            text: The caption, from get_text, or "" for none
+            dict_caption: The caption settings (default: None, uses
+            D_CAPTION)
+            l_monitors: The monitors to scale the image to, or None to keep
+            its size (default: None)
+            mode: The scale mode, SC.S_MODE_FILL or SC.S_MODE_FIT (default:
+            SC.S_MODE_FILL)
+
+        Returns:
+            The path of the finished image
+
+        Raises:
+            LM.LimitError if the image is over a limit
+            OSError if the image can not be read or the result can not be
+            saved (Pillow raises OSError for images it can't read)
+
+        This always draws, even if the finished image is in the cache. The
+        limits are checked, but the memory is not limited, that is up to
+        the process this runs in.
+        """
+
+        # get the image, the right way up, and only as big as we need it
+        img = R.open_image(path_base, l_monitors, mode, self._dict_limits)
+
+        # scale it to the screen
+        # NB: the caption goes on the primary monitor, which is first
+        area = (0, 0) + img.size
+        if l_monitors:
+            img = R.render(img, l_monitors, mode)
+            area = R.get_layout(l_monitors)[1][0]
+
+        # put the layer on it
+        if text:
+            dict_cap = get_settings(dict_caption)
+            layer = self._get_layer(text, dict_cap)
+            pos = get_pos(
+                area[2:],
+                layer.size,
+                dict_cap[S_KEY_POSITION],
+                dict_cap[S_KEY_PAD_EXT],
+            )
+            img.paste(layer, (area[0] + pos[0], area[1] + pos[1]), mask=layer)
+
+        # save it next to its final name, then move it into place
+        path_out = self.get_path(key, ext)
+        path_tmp = path_out.with_name(path_out.name + S_EXT_TMP)
+        if path_out.suffix[1:] == S_EXT_JPEG:
+            img.save(path_tmp, "JPEG", quality=I_JPEG_QUALITY)
+        else:
+            img.save(path_tmp, "PNG")
+        os.replace(path_tmp, path_out)
+
+        return path_out
+
+    # --------------------------------------------------------------------------
+    # Remove files that have not been used lately
+    # --------------------------------------------------------------------------
+    def clean(self, l_keep=None, max_age=F_MAX_AGE):
+        """
+        Remove files that have not been used lately
+
+        Args:
+            l_keep: Paths that must not be removed, ie. the finished image on
+            screen (default: None)
+            max_age: The time in seconds since a file was last used after
+            which it is removed (default: F_MAX_AGE)
+
+        A finished image that is the wallpaper is a hard link, so removing it
+        from the cache does not remove the wallpaper.
+        """
+
+        set_keep = {Path(a_path) for a_path in l_keep or []}
+        now = time.time()
+        for a_dir in (self._dir_layers, self._dir_output):
+            for a_path in a_dir.iterdir():
+                if a_path in set_keep:
+                    continue
+                try:
+                    if now - a_path.stat().st_mtime > max_age:
+                        a_path.unlink()
+                except OSError:
+                    pass
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Get the caption layer, drawing it if it is not cached
+    # --------------------------------------------------------------------------
+    def _get_layer(self, text, dict_cap):
+        """
+        Get the caption layer, drawing it if it is not cached
+
+        Args:
+            text: The caption
+            dict_cap: The full caption settings
+
+        Returns:
+            The layer, as an RGBA image the size of the box
+        """
+
+        # NB: deferred import, only needed when we draw
+        # pylint: disable=import-outside-toplevel
+        from PIL import Image
+
+        # use the cached layer if there is one
+        path_layer = self._dir_layers / S_FILE_CACHE.format(
+            get_layer_key(text, dict_cap), S_EXT_LAYER
+        )
+        try:
+            with Image.open(path_layer) as img_layer:
+                layer = img_layer.convert("RGBA")
+            _touch(path_layer)
+            return layer
+        except OSError:
+            pass
+
+        # draw it and keep it
+        layer = _draw_layer(text, dict_cap)
+        path_tmp = path_layer.with_name(path_layer.name + S_EXT_TMP)
+        layer.save(path_tmp, "PNG")
+        os.replace(path_tmp, path_layer)
+
+        return layer
+
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Combine the default caption settings with the user's
+# ------------------------------------------------------------------------------
+def get_settings(dict_caption=None):
+    """
+    Combine the default caption settings with the user's
+
+    Args:
+        dict_caption: The user's settings (default: None)
+
+    Returns:
+        A dict with every key in D_CAPTION
+    """
+
+    dict_cap = dict(D_CAPTION)
+    if dict_caption:
+        dict_cap.update(dict_caption)
+    return dict_cap
+
+
+# ------------------------------------------------------------------------------
+# Get the caption for an APOD
+# ------------------------------------------------------------------------------
+def get_text(apod_dict, dict_caption=None):
+    """
+    Get the caption for an APOD
+
+    Args:
+        apod_dict: The APOD dict
+        dict_caption: The caption settings (default: None, uses D_CAPTION)
+
+    Returns:
+        The caption, or "" if captions are off or there is nothing to show
+
+    Raises:
+        ValueError if the text setting is not a valid format string
+
+    Keys the APOD dict does not have (ie. "copyright" on a public domain
+    image) are left blank.
+    """
+
+    dict_cap = get_settings(dict_caption)
+    if not dict_cap[S_KEY_SHOW]:
+        return ""
+    try:
+        text = dict_cap[S_KEY_TEXT].format_map(_Blank(apod_dict))
+    except (IndexError, AttributeError) as error:
+        raise ValueError(error) from error
+    return text.strip()
+
+
+# ------------------------------------------------------------------------------
+# Get the key of a caption layer
+# ------------------------------------------------------------------------------
+def get_layer_key(text, dict_caption=None):
+    """
+    Get the key of a caption layer
+
+    Args:
+        text: The caption
+        dict_caption: The caption settings (default: None, uses D_CAPTION)
+
+    Returns:
+        A hash of the text and every setting that changes how the layer
+        looks
+    """
+
+    dict_cap = get_settings(dict_caption)
+    return _hash([text] + [dict_cap[key] for key in L_KEYS_LAYER])
+
+
+# ------------------------------------------------------------------------------
+# Get the key of a finished image
+# ------------------------------------------------------------------------------
+def get_key(
+    sha256, text, dict_caption=None, l_monitors=None, mode=SC.S_MODE_FILL
+):
+    """
+    Get the key of a finished image
+
+    Args:
+        sha256: The hash of the image under the caption
+        text: The caption, or "" for none
+        dict_caption: The caption settings (default: None, uses D_CAPTION)
+        l_monitors: The monitors the image is scaled to, or None (default:
+        None)
+        mode: The scale mode (default: SC.S_MODE_FILL)
+
+    Returns:
+        A hash of the image, the layer, where the layer goes, and the
+        monitors and mode
+
+    This needs no Pillow and no disk, so it can be used to see if the
+    wallpaper is already what it should be.
+    """
+
+    dict_cap = get_settings(dict_caption)
+    return _hash(
+        [sha256, get_layer_key(text, dict_cap) if text else ""]
+        + [dict_cap[key] for key in L_KEYS_PLACE]
+        + [[list(mon) for mon in l_monitors or []], mode]
+    )
+
+
+# ------------------------------------------------------------------------------
+# Get where the layer goes on the image
+# ------------------------------------------------------------------------------
+def get_pos(img_size, box_size, position, pad_ext):
+    """
+    Get where the layer goes on the image
+
+    Args:
+        img_size: The (width, height) of the image
+        box_size: The (width, height) of the layer
+        position: One of the I_POS_ constants
+        pad_ext: The space between the edge of the image and the box
+
+    Returns:
+        The (x, y) of the top left corner of the layer
+    """
+
+    img_w, img_h = img_size
+    box_w, box_h = box_size
+
+    # left, center, right
+    col = position % 3
+    if col == 0:
+        pos_x = pad_ext
+    elif col == 1:
+        pos_x = max(pad_ext, (img_w - box_w) // 2)
+    else:
+        pos_x = img_w - pad_ext - box_w
+
+    # top, middle, bottom
+    row = position // 3
+    if row == 0:
+        pos_y = pad_ext
+    elif row == 1:
+        pos_y = max(pad_ext, (img_h - box_h) // 2)
+    else:
+        pos_y = img_h - pad_ext - box_h
+
+    return (pos_x, pos_y)
+
+
+# ------------------------------------------------------------------------------
+# Private classes
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# A dict that formats missing keys as ""
+# ------------------------------------------------------------------------------
+class _Blank(dict):
+    """
+    A dict that formats missing keys as ""
+    """
+
+    # --------------------------------------------------------------------------
+    # Called by format_map for a missing key
+    # --------------------------------------------------------------------------
+    def __missing__(self, key):
+        """
+        Called by format_map for a missing key
+
+        Args:
+            key: The missing key
+
+        Returns:
+            ""
+        """
+
+        return ""
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Hash a list of json-able values
+# ------------------------------------------------------------------------------
+def _hash(l_values):
+    """
+    Hash a list of json-able values
+
+    Args:
+        l_values: The values
+
+    Returns:
+        The sha256 of the values, as hex
+    """
+
+    data = json.dumps(l_values, separators=(",", ":")).encode("UTF-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+# ------------------------------------------------------------------------------
+# Mark a cached file as used
+# ------------------------------------------------------------------------------
+def _touch(a_path):
+    """
+    Mark a cached file as used
+
+    Args:
+        a_path: The path of the file
+
+    Sets the mtime, which clean uses as the time of last use.
+    """
+
+    try:
+        os.utime(a_path)
+    except OSError:
+        pass
+
+
+# ------------------------------------------------------------------------------
+# Draw a caption layer
+# ------------------------------------------------------------------------------
+def _draw_layer(text, dict_cap):
+    """
+    Draw a caption layer
+
+    Args:
+        text: The caption
+        dict_cap: The full caption settings
+
+    Returns:
+        The layer, as an RGBA image the size of the box
+    """
+
+    # NB: deferred import, only needed when we draw
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image, ImageDraw, ImageFont
+
+    # get the font
+    size = dict_cap[S_KEY_FONT_SIZE]
+    font = None
+    if dict_cap[S_KEY_FONT]:
+        try:
+            font = ImageFont.truetype(dict_cap[S_KEY_FONT], size)
+        except OSError:
+            pass
+    if not font:
+        font = ImageFont.load_default(size)
+
+    # wrap each paragraph on its own
+    lines = []
+    for para in text.splitlines():
+        lines.extend(textwrap.wrap(para, dict_cap[S_KEY_WRAP]) or [""])
+
+    # get the size of the text
+    # NB: every line is as tall as the font, so lines without descenders
+    # are spaced the same as lines with them
+    ascent, descent = font.getmetrics()
+    line_h = ascent + descent
+    text_w = max(int(font.getlength(line)) for line in lines)
+
+    # get the size of the box
+    pad_int = dict_cap[S_KEY_PAD_INT]
+    box_w = text_w + (pad_int * 2)
+    box_h = line_h * len(lines) + (pad_int * 2)
+
+    # draw the box
+    layer = Image.new("RGBA", (box_w, box_h), color=(0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    draw.rounded_rectangle(
+        [(0, 0), (box_w - 1, box_h - 1)],
+        radius=dict_cap[S_KEY_RADIUS],
+        fill=tuple(dict_cap[S_KEY_BOX_COLOR]),
+    )
+
+    # draw the text
+    pos_y = pad_int
+    for line in lines:
+        draw.text(
+            (pad_int, pos_y),
+            line,
+            font=font,
+            fill=tuple(dict_cap[S_KEY_FONT_COLOR]),
+        )
+        pos_y += line_h
+
+    return layer
+
+
+# -)
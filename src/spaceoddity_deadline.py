@@ -0,0 +1,211 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_deadline.py                               |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Time limits for a run and for each of its stages
+
+A run is split into stages (get the json, download the image, composite it,
+apply it). Each stage has its own budget, and the whole run has an overall
+deadline. A stage gets whichever is smaller: its own budget or the time left
+in the run. If it runs over, a StageTimeout is raised from inside it (using
+SIGALRM), so even a call that never returns on its own, like a wedged socket
+or subprocess, is interrupted.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+from contextlib import contextmanager
+import signal
+import threading
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# stage names
+S_STAGE_META = "metadata"
+S_STAGE_DL = "download"
+S_STAGE_COMP = "composite"
+S_STAGE_APPLY = "apply"
+
+# key for the overall deadline in the budget dict
+S_KEY_TOTAL = "total"
+
+# default budgets, in seconds
+D_BUDGETS = {
+    S_KEY_TOTAL: 300,
+    S_STAGE_META: 30,
+    S_STAGE_DL: 180,
+    S_STAGE_COMP: 60,
+    S_STAGE_APPLY: 15,
+}
+
+# ------------------------------------------------------------------------------
+# Classes
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Raised when a stage runs out of time
+# ------------------------------------------------------------------------------
+class StageTimeout(Exception):
+    """
+    Raised when a stage runs out of time
+
+    The name of the stage is in the stage property. This is not an OSError on
+    purpose, so that it is not swallowed by the handlers for network errors.
+    """
+
+    # --------------------------------------------------------------------------
+    # Initialize the new object
+    # --------------------------------------------------------------------------
+    def __init__(self, stage):
+        """
+        Initialize the new object
+
+        Args:
+            stage: The name of the stage that timed out
+        """
+
+        super().__init__(stage)
+        self.stage = stage
+
+
+# ------------------------------------------------------------------------------
+# Time limits for a run and for each of its stages
+# ------------------------------------------------------------------------------
+class Deadline:
+    """
+    Time limits for a run and for each of its stages
+
+    Methods:
+        get_remaining(): Get the time left before the overall deadline
+        get_timeout(stage): Get the time a stage may take
+        stage(name): Context manager that limits the time of a stage
+
+    Create one of these at the start of a run, then wrap each stage in a
+    "with deadline.stage(name) as timeout:" block. The timeout it yields can
+    be passed on to anything that takes one (ie. sockets), and the block is
+    interrupted with a StageTimeout if it runs over.
+    """
+
+    # --------------------------------------------------------------------------
+    # Instance methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the new object
+    # --------------------------------------------------------------------------
+    def __init__(self, dict_budgets=None):
+        """
+        Initialize the new object
+
+        Args:
+            dict_budgets: The budgets to use, in seconds, keyed by stage name
+            and S_KEY_TOTAL (default: None, uses D_BUDGETS). Missing keys use
+            the defaults.
+
+        Initializes a new instance of the class, setting the default values
+        of its properties, and any other code that needs to run to create a
+        new object.
+        """
+
+        # combine defaults and passed budgets
+        self._dict_budgets = dict(D_BUDGETS)
+        if dict_budgets:
+            self._dict_budgets.update(dict_budgets)
+
+        # start the clock
+        self._end = time.monotonic() + self._dict_budgets[S_KEY_TOTAL]
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Get the time left before the overall deadline
+    # --------------------------------------------------------------------------
+    def get_remaining(self):
+        """
+        Get the time left before the overall deadline
+
+        Returns:
+            The number of seconds left (may be negative)
+        """
+
+        return self._end - time.monotonic()
+
+    # --------------------------------------------------------------------------
+    # Get the time a stage may take
+    # --------------------------------------------------------------------------
+    def get_timeout(self, stage):
+        """
+        Get the time a stage may take
+
+        Args:
+            stage: The name of the stage
+
+        Returns:
+            The smaller of the stage's budget and the time left in the run
+        """
+
+        budget = self._dict_budgets.get(stage, self._dict_budgets[S_KEY_TOTAL])
+        return min(budget, self.get_remaining())
+
+    # --------------------------------------------------------------------------
+    # Context manager that limits the time of a stage
+    # --------------------------------------------------------------------------
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager that limits the time of a stage
+
+        Args:
+            name: The name of the stage
+
+        Yields:
+            The number of seconds the stage may take
+
+        Raises:
+            StageTimeout: If there is no time left, or the block runs over
+
+        The alarm only works in the main thread. In any other thread the
+        timeout is still yielded, but it is up to the block to honor it.
+        """
+
+        # get time for this stage
+        timeout = self.get_timeout(name)
+        if timeout <= 0:
+            raise StageTimeout(name)
+
+        # can't use signals off the main thread
+        if threading.current_thread() is not threading.main_thread():
+            yield timeout
+            return
+
+        # NB: handler params are unused
+        def _on_alarm(_signum, _frame):
+            raise StageTimeout(name)
+
+        # set the alarm
+        old_handler = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+        # run the block, and always clear the alarm
+        try:
+            yield timeout
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old_handler)
+
+
+# -)
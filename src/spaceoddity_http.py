@@ -0,0 +1,1111 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_http.py                                   |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Network helpers for SpaceOddity
+
+This module contains the code that moves bytes from the server to the disk.
+Images are streamed in chunks to a ".part" file next to the final file, which
+is resumed with an HTTP Range request if a previous download was interrupted,
+and only renamed into place when the whole file has arrived. The ETag (or
+Last-Modified) of the first response is kept next to the part file, and sent
+as If-Range when resuming, so a file that changed on the server in the
+meantime is sent whole instead of being spliced onto the old part.
+
+All requests go through one pool of keep-alive connections, keyed by host,
+so the json, the probes, and the image (or a whole backfill) share a few TLS
+connections instead of opening one each. The pool lives as long as the
+process, so in daemon mode its SSL context and TLS sessions carry over from
+one cycle to the next, and a new connection can resume a session instead of
+doing a full handshake.
+
+Like urllib, the pool honors the http_proxy, https_proxy, and no_proxy
+environment variables. An https url goes through a CONNECT tunnel, with TLS
+to the real host inside it, and a plain http url is asked of the proxy.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import base64
+import http.client
+import os
+from pathlib import Path
+import re
+import ssl
+import threading
+from urllib import parse, request
+from urllib.error import HTTPError
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# default socket timeout, in seconds
+F_TIMEOUT = 30.0
+
+# size of each read from the socket
+I_CHUNK_SIZE = 64 * 1024
+
+# extension of partial files
+S_EXT_PART = ".part"
+
+# extension of the file that says which version a partial file is from
+S_EXT_VALID = ".valid"
+
+# http headers
+S_HDR_RANGE = "Range"
+S_HDR_IF_RANGE = "If-Range"
+S_HDR_CONT_LEN = "Content-Length"
+S_HDR_CONT_RANGE = "Content-Range"
+S_HDR_ETAG = "ETag"
+S_HDR_LAST_MOD = "Last-Modified"
+
+# a weak etag, which If-Range can not use
+S_ETAG_WEAK = "W/"
+
+# NB: format param is the first byte to get
+S_RANGE_FROM = "bytes={}-"
+# NB: format params are the first and last bytes to get
+S_RANGE_SPAN = "bytes={}-{}"
+
+# bytes to get when probing the start of a file
+I_PROBE_SIZE = 64 * 1024
+
+# parse "bytes 100-199/200" or "bytes */200"
+R_CONT_RANGE = r"bytes\s+(?:(\d+)-\d+|\*)/(\d+|\*)"
+
+# http status codes
+I_HTTP_OK = 200
+I_HTTP_PARTIAL = 206
+I_HTTP_MULTI = 300
+I_HTTP_BAD_RANGE = 416
+L_HTTP_REDIRECT = [301, 302, 303, 307, 308]
+
+# most redirects to follow
+I_MAX_REDIRECTS = 5
+
+# most idle connections to keep per host
+I_MAX_IDLE = 4
+
+# header for redirects
+S_HDR_LOCATION = "Location"
+
+# header for a proxy that wants a password
+S_HDR_PROXY_AUTH = "Proxy-Authorization"
+# NB: format param is base64 of "user:password"
+S_PROXY_AUTH = "Basic {}"
+
+# url schemes
+S_SCHEME_HTTP = "http"
+S_SCHEME_HTTPS = "https"
+
+# default ports
+I_PORT_HTTP = 80
+I_PORT_HTTPS = 443
+
+# keys in the pool stats
+S_KEY_CONNECTS = "connects"
+S_KEY_REUSES = "reuses"
+S_KEY_RESUMED = "tls_resumed"
+
+# error messages
+# NB: format params are bytes received and bytes expected
+S_ERR_SHORT = "Download incomplete: got {} of {} bytes"
+# NB: format params are offset asked for and offset received
+S_ERR_RANGE = "Server resumed at byte {} instead of {}"
+# NB: format param is url
+S_ERR_REDIRECTS = "Too many redirects: {}"
+# NB: format params are size and limit
+S_ERR_TOO_BIG = "Download is too large: {} bytes (limit {})"
+
+# errors that mean a kept-alive connection was closed by the server
+T_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+# the pool used by all the functions here
+# NB: made on first use, see get_pool
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+# ------------------------------------------------------------------------------
+# Classes
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Raised when a download does not produce the whole file
+# ------------------------------------------------------------------------------
+class DownloadError(OSError):
+    """
+    Raised when a download does not produce the whole file
+
+    This is a subclass of OSError so that callers who already handle network
+    errors will handle this as well. The partial file is left on disk so the
+    next attempt can resume it, unless the file is too large to want.
+    """
+
+
+# ------------------------------------------------------------------------------
+# A pool of keep-alive connections, keyed by host
+# ------------------------------------------------------------------------------
+class Pool:
+    """
+    A pool of keep-alive connections, keyed by host
+
+    Methods:
+        request(url, headers, timeout): Send a GET request
+        get_stats(): Get the number of new and reused connections
+        close(): Close all idle connections
+
+    A connection is taken from the pool for each request and given back
+    when its response is closed, if the whole body was read and the server
+    did not ask to close it. The pool may be used from several threads at
+    once, each connection is only used by one at a time.
+    """
+
+    # --------------------------------------------------------------------------
+    # Instance methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the new object
+    # --------------------------------------------------------------------------
+    def __init__(self):
+        """
+        Initialize the new object
+
+        Initializes a new instance of the class, setting the default values
+        of its properties, and any other code that needs to run to create a
+        new object.
+        """
+
+        # set props
+        self._lock = threading.Lock()
+        self._dict_idle = {}
+        self._dict_sessions = {}
+        self._context = None
+        self._dict_proxies = None
+        self._dict_stats = {
+            S_KEY_CONNECTS: 0,
+            S_KEY_REUSES: 0,
+            S_KEY_RESUMED: 0,
+        }
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Send a GET request
+    # --------------------------------------------------------------------------
+    def request(self, url, headers=None, timeout=F_TIMEOUT):
+        """
+        Send a GET request
+
+        Args:
+            url: The url to get
+            headers: A dict of extra request headers (default: None)
+            timeout: The socket timeout, in seconds (default: F_TIMEOUT)
+
+        Returns:
+            A Response, which should be closed (or used in a with block) so
+            its connection can go back to the pool
+
+        Raises:
+            HTTPError: If the server sends an error or a 304
+            OSError: If the server could not be reached
+
+        Redirects are followed. Like urllib, a status of 300 or more that is
+        not a redirect is raised as an HTTPError, so code written for
+        urlopen works the same.
+        """
+
+        for _i in range(I_MAX_REDIRECTS + 1):
+            key, path = _split_url(url)
+            response = self._send(key, path, headers or {}, timeout)
+
+            # follow redirects
+            location = response.headers.get(S_HDR_LOCATION)
+            if response.status in L_HTTP_REDIRECT and location:
+                response.read()
+                response.close()
+                url = parse.urljoin(url, location)
+                continue
+
+            # errors
+            # NB: read the (small) body so the connection can be reused
+            if response.status >= I_HTTP_MULTI:
+                response.read()
+                response.close()
+                raise HTTPError(
+                    url,
+                    response.status,
+                    response.reason,
+                    response.headers,
+                    None,
+                )
+
+            return response
+
+        raise OSError(S_ERR_REDIRECTS.format(url))
+
+    # --------------------------------------------------------------------------
+    # Get the number of new and reused connections
+    # --------------------------------------------------------------------------
+    def get_stats(self):
+        """
+        Get the number of new and reused connections
+
+        Returns:
+            A dict with the counts for S_KEY_CONNECTS, S_KEY_REUSES, and
+            S_KEY_RESUMED (new TLS connections that resumed a session)
+        """
+
+        with self._lock:
+            return dict(self._dict_stats)
+
+    # --------------------------------------------------------------------------
+    # Close all idle connections
+    # --------------------------------------------------------------------------
+    def close(self):
+        """
+        Close all idle connections
+
+        The SSL context and TLS sessions are kept, so the pool can still be
+        used, and new connections can still resume their sessions.
+        """
+
+        with self._lock:
+            l_conns = [c for l_idle in self._dict_idle.values() for c in l_idle]
+            self._dict_idle = {}
+        for conn in l_conns:
+            conn.close()
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Send a request on a pooled connection
+    # --------------------------------------------------------------------------
+    def _send(self, key, path, dict_hdrs, timeout):
+        """
+        Send a request on a pooled connection
+
+        Args:
+            key: The (scheme, host, port) of the url
+            path: The path and query of the url
+            dict_hdrs: The request headers
+            timeout: The socket timeout
+
+        Returns:
+            The Response
+
+        A kept-alive connection may have been closed by the server while it
+        sat in the pool, in which case the request is sent once more on a
+        new connection.
+        """
+
+        # NB: a plain http proxy wants the whole url, and may want a password
+        proxy = self._get_proxy(key)
+        if proxy and key[0] != S_SCHEME_HTTPS:
+            path = parse.urlunsplit((key[0], _get_netloc(key), path, "", ""))
+            dict_hdrs = {**_get_proxy_hdrs(proxy), **dict_hdrs}
+
+        while True:
+            conn, reused = self._get_conn(key, timeout)
+            try:
+                conn.request("GET", path, headers=dict_hdrs)
+                response = conn.getresponse()
+            except T_STALE_ERRORS:
+                conn.close()
+                if reused:
+                    continue
+                raise
+            except OSError:
+                conn.close()
+                raise
+
+            # count tls sessions that were resumed
+            if getattr(conn, "resumed", False):
+                conn.resumed = False
+                with self._lock:
+                    self._dict_stats[S_KEY_RESUMED] += 1
+
+            return Response(self, key, conn, response)
+
+    # --------------------------------------------------------------------------
+    # Get an idle connection, or make a new one
+    # --------------------------------------------------------------------------
+    def _get_conn(self, key, timeout):
+        """
+        Get an idle connection, or make a new one
+
+        Args:
+            key: The (scheme, host, port) to connect to
+            timeout: The socket timeout
+
+        Returns:
+            A tuple of (connection, True if it was reused)
+        """
+
+        # try the pool first
+        with self._lock:
+            l_idle = self._dict_idle.get(key, [])
+            if l_idle:
+                conn = l_idle.pop()
+                self._dict_stats[S_KEY_REUSES] += 1
+                conn.timeout = timeout
+                if conn.sock:
+                    conn.sock.settimeout(timeout)
+                return (conn, True)
+            self._dict_stats[S_KEY_CONNECTS] += 1
+
+        # connect to the proxy instead, if there is one
+        scheme, host, port = key
+        proxy = self._get_proxy(key)
+        if proxy:
+            conn_host, conn_port = proxy.hostname, proxy.port or I_PORT_HTTP
+        else:
+            conn_host, conn_port = host, port
+
+        # make a new one
+        # NB: https through a proxy is a CONNECT tunnel to the real host, and
+        # TLS is done with the real host inside it
+        if scheme == S_SCHEME_HTTPS:
+            conn = _HTTPSConnection(
+                conn_host,
+                conn_port,
+                timeout=timeout,
+                context=self._get_context(),
+            )
+            if proxy:
+                conn.set_tunnel(
+                    host, port or I_PORT_HTTPS, _get_proxy_hdrs(proxy)
+                )
+            with self._lock:
+                conn.session = self._dict_sessions.get(key)
+        else:
+            conn = http.client.HTTPConnection(
+                conn_host, conn_port, timeout=timeout
+            )
+        return (conn, False)
+
+    # --------------------------------------------------------------------------
+    # Get the proxy to use for a host, if any
+    # --------------------------------------------------------------------------
+    def _get_proxy(self, key):
+        """
+        Get the proxy to use for a host, if any
+
+        Args:
+            key: The (scheme, host, port) of the url
+
+        Returns:
+            The proxy url, split (see urllib.parse.urlsplit), or None to
+            connect directly
+
+        The proxies are read from the environment (ie. https_proxy) once for
+        the life of the pool, the same way urllib reads them. A host in
+        no_proxy is always reached directly.
+        """
+
+        scheme, host, _port = key
+        with self._lock:
+            if self._dict_proxies is None:
+                self._dict_proxies = request.getproxies()
+            str_proxy = self._dict_proxies.get(scheme)
+
+        # no proxy, or not for this host
+        if not str_proxy or request.proxy_bypass(host):
+            return None
+
+        # NB: a proxy is often given as just "host:port"
+        if "://" not in str_proxy:
+            str_proxy = f"{S_SCHEME_HTTP}://{str_proxy}"
+        return parse.urlsplit(str_proxy)
+
+    # --------------------------------------------------------------------------
+    # Give a connection back to the pool
+    # --------------------------------------------------------------------------
+    def _release(self, key, conn, reusable):
+        """
+        Give a connection back to the pool
+
+        Args:
+            key: The (scheme, host, port) of the connection
+            conn: The connection
+            reusable: True if the last response on it was read to the end
+            and the server did not ask to close it
+        """
+
+        # remember the tls session for the next connection to this host
+        # NB: with TLS 1.3 the session ticket arrives after the handshake,
+        # so now is a better time to get it than right after connecting
+        session = getattr(conn.sock, "session", None)
+        with self._lock:
+            if session:
+                self._dict_sessions[key] = session
+
+            # keep it if we can
+            l_idle = self._dict_idle.setdefault(key, [])
+            if reusable and conn.sock and len(l_idle) < I_MAX_IDLE:
+                l_idle.append(conn)
+                return
+
+        conn.close()
+
+    # --------------------------------------------------------------------------
+    # Get the SSL context, making it on first use
+    # --------------------------------------------------------------------------
+    def _get_context(self):
+        """
+        Get the SSL context, making it on first use
+
+        Returns:
+            The SSL context
+
+        Loading the system CA certs is the slow part of making a context,
+        so it is only done once for the life of the pool.
+        """
+
+        with self._lock:
+            if self._context is None:
+                self._context = ssl.create_default_context()
+            return self._context
+
+
+# ------------------------------------------------------------------------------
+# A response from the pool
+# ------------------------------------------------------------------------------
+class Response:
+    """
+    A response from the pool
+
+    Properties:
+        status: The http status code
+        reason: The http reason phrase
+        headers: The response headers
+        url: The url that was asked for, after redirects
+
+    Methods:
+        read(size): Read the body
+        close(): Close the response and give its connection back
+
+    This has the parts of the urlopen response that we use, and can be used
+    in a with block the same way.
+    """
+
+    # --------------------------------------------------------------------------
+    # Instance methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the new object
+    # --------------------------------------------------------------------------
+    def __init__(self, pool, key, conn, response):
+        """
+        Initialize the new object
+
+        Args:
+            pool: The Pool the connection came from
+            key: The (scheme, host, port) of the connection
+            conn: The connection
+            response: The http.client response
+
+        Initializes a new instance of the class, setting the default values
+        of its properties, and any other code that needs to run to create a
+        new object.
+        """
+
+        # set props
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._response = response
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    # --------------------------------------------------------------------------
+    # Enter a with block
+    # --------------------------------------------------------------------------
+    def __enter__(self):
+        """
+        Enter a with block
+
+        Returns:
+            This object
+        """
+
+        return self
+
+    # --------------------------------------------------------------------------
+    # Leave a with block
+    # --------------------------------------------------------------------------
+    def __exit__(self, *args):
+        """
+        Leave a with block
+
+        Args:
+            args: The exception info, which is not used
+        """
+
+        self.close()
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Read the body
+    # --------------------------------------------------------------------------
+    def read(self, size=-1):
+        """
+        Read the body
+
+        Args:
+            size: The most bytes to read, or -1 for all (default: -1)
+
+        Returns:
+            The bytes read, or b"" at the end of the body
+        """
+
+        if self._response is None:
+            return b""
+        return self._response.read(None if size < 0 else size)
+
+    # --------------------------------------------------------------------------
+    # Close the response and give its connection back
+    # --------------------------------------------------------------------------
+    def close(self):
+        """
+        Close the response and give its connection back
+
+        A body that was not read to the end leaves the connection in an
+        unknown state, so it is closed instead of going back to the pool.
+        """
+
+        # already closed
+        if self._response is None:
+            return
+
+        reusable = self._response.isclosed() and not self._response.will_close
+        if not reusable:
+            self._response.close()
+
+        # pylint: disable=protected-access
+        self._pool._release(self._key, self._conn, reusable)
+        self._response = None
+
+
+# ------------------------------------------------------------------------------
+# An https connection that can resume a TLS session
+# ------------------------------------------------------------------------------
+class _HTTPSConnection(http.client.HTTPSConnection):
+    """
+    An https connection that can resume a TLS session
+
+    Set the session property to a session from an earlier connection to the
+    same host before connecting, and the handshake will try to resume it.
+    The resumed property is True after a handshake that did.
+    """
+
+    # --------------------------------------------------------------------------
+    # Instance methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the new object
+    # --------------------------------------------------------------------------
+    def __init__(self, host, port=None, timeout=F_TIMEOUT, context=None):
+        """
+        Initialize the new object
+
+        Args:
+            host: The host to connect to
+            port: The port to connect to (default: None, uses 443)
+            timeout: The socket timeout (default: F_TIMEOUT)
+            context: The SSL context (default: None)
+
+        Initializes a new instance of the class, setting the default values
+        of its properties, and any other code that needs to run to create a
+        new object.
+        """
+
+        # do super init
+        super().__init__(host, port, timeout=timeout, context=context)
+
+        # set props
+        self.session = None
+        self.resumed = False
+        self._ssl_context = context
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Connect, resuming the TLS session if we have one
+    # --------------------------------------------------------------------------
+    def connect(self):
+        """
+        Connect, resuming the TLS session if we have one
+        """
+
+        # NB: connect the plain socket (and the proxy tunnel, if any), then
+        # wrap it ourselves, since the super class has no way to pass a
+        # session
+        http.client.HTTPConnection.connect(self)
+        server_hostname = self._tunnel_host or self.host
+        self.sock = self._ssl_context.wrap_socket(
+            self.sock, server_hostname=server_hostname, session=self.session
+        )
+        self.resumed = self.sock.session_reused
+
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Get the pool that all requests share
+# ------------------------------------------------------------------------------
+def get_pool():
+    """
+    Get the pool that all requests share
+
+    Returns:
+        The Pool, made on first use
+    """
+
+    # pylint: disable=global-statement
+    global _POOL
+
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = Pool()
+        return _POOL
+
+
+# ------------------------------------------------------------------------------
+# Send a GET request through the shared pool
+# ------------------------------------------------------------------------------
+def urlopen(url, headers=None, timeout=F_TIMEOUT):
+    """
+    Send a GET request through the shared pool
+
+    Args:
+        url: The url to get
+        headers: A dict of extra request headers (default: None)
+        timeout: The socket timeout, in seconds (default: F_TIMEOUT)
+
+    Returns:
+        A Response, to be used in a with block
+
+    Raises:
+        HTTPError: If the server sends an error or a 304
+        OSError: If the server could not be reached
+    """
+
+    return get_pool().request(url, headers, timeout)
+
+
+# ------------------------------------------------------------------------------
+# Get the path of the partial file for a destination
+# ------------------------------------------------------------------------------
+def get_part_path(path_dst):
+    """
+    Get the path of the partial file for a destination
+
+    Args:
+        path_dst: The final path of the download
+
+    Returns:
+        The path used while the download is in progress
+    """
+
+    path_dst = Path(path_dst)
+    return path_dst.with_name(path_dst.name + S_EXT_PART)
+
+
+# ------------------------------------------------------------------------------
+# Download a url to a file, resuming a partial download if possible
+# ------------------------------------------------------------------------------
+def download(
+    url, path_dst, path_part=None, timeout=F_TIMEOUT, hasher=None, max_bytes=0
+):
+    """
+    Download a url to a file, resuming a partial download if possible
+
+    Args:
+        url: The url to download
+        path_dst: The path to the final file
+        path_part: The path to the partial file (default: path_dst + ".part")
+        timeout: The socket timeout, in seconds (default: F_TIMEOUT)
+        hasher: A hashlib object to feed every byte of the file to, ie.
+        hashlib.sha256() (default: None)
+        max_bytes: The largest file to accept, in bytes, or 0 for any size
+        (default: 0)
+
+    Returns:
+        The total size of the file, in bytes
+
+    Raises:
+        OSError: If the server could not be reached, the download was cut
+        short, or the file is larger than max_bytes
+
+    The data is written to path_part as it arrives. If path_part already
+    exists, a Range request asks the server for the rest of the file, with
+    If-Range set to the ETag (or Last-Modified) of the response that started
+    it. If the file has changed, the server sends all of it, and we start
+    over. A part file with no validator is never resumed. The final size is
+    checked against Content-Length/Content-Range, then the partial file is
+    synced and renamed to path_dst in one atomic step, so path_dst is either
+    missing or complete, never truncated.
+
+    If a hasher is passed, it sees the whole file, including any part that
+    was downloaded by an earlier attempt, so there is no need to read the
+    file again to hash it.
+
+    A file larger than max_bytes is refused as soon as the headers say how
+    big it is, or, if they don't, as soon as that many bytes have arrived.
+    The partial file is removed, since there is no point in resuming it.
+    """
+
+    # get paths
+    path_dst = Path(path_dst)
+    if path_part is None:
+        path_part = get_part_path(path_dst)
+    path_part = Path(path_part)
+    path_valid = path_part.with_name(path_part.name + S_EXT_VALID)
+
+    # see how much we already have
+    # NB: without a validator, we can't know the rest is from the same file
+    str_valid = _load_valid(path_valid) if path_part.exists() else ""
+    size_have = path_part.stat().st_size if str_valid else 0
+
+    # ask for the rest, if it is still the same file
+    dict_hdrs = {}
+    if size_have:
+        dict_hdrs[S_HDR_RANGE] = S_RANGE_FROM.format(size_have)
+        dict_hdrs[S_HDR_IF_RANGE] = str_valid
+    try:
+        response = urlopen(url, dict_hdrs, timeout)
+    except HTTPError as error:
+
+        # range past the end, the part file may already be complete
+        if error.code == I_HTTP_BAD_RANGE and size_have:
+            _start, total = _parse_cont_range(error.headers)
+            if total == size_have:
+                _hash_file(path_part, hasher)
+                _publish(path_part, path_dst)
+                path_valid.unlink(missing_ok=True)
+                return total
+
+            # part file is junk, start over next time
+            path_part.unlink(missing_ok=True)
+            path_valid.unlink(missing_ok=True)
+        raise
+
+    with response:
+
+        # figure out where the server is starting and how much it will send
+        if response.status == I_HTTP_PARTIAL:
+            start, total = _parse_cont_range(response.headers)
+            if start != size_have:
+                raise DownloadError(S_ERR_RANGE.format(start, size_have))
+            mode = "ab"
+
+            # hash what we already have
+            _hash_file(path_part, hasher)
+        else:
+
+            # file changed, server ignored the range, or we did not send one
+            start = 0
+            total = None
+            mode = "wb"
+
+            # remember which file this is, so we can resume it
+            _save_valid(path_valid, response.headers)
+
+        # get expected size if we did not get it from Content-Range
+        if total is None:
+            cont_len = response.headers.get(S_HDR_CONT_LEN)
+            if cont_len is not None:
+                total = start + int(cont_len)
+
+        # too big, don't even start
+        if max_bytes and total is not None and total > max_bytes:
+            path_part.unlink(missing_ok=True)
+            path_valid.unlink(missing_ok=True)
+            raise DownloadError(S_ERR_TOO_BIG.format(total, max_bytes))
+
+        # stream the body to the part file
+        size_got = start
+        with open(path_part, mode) as a_file:
+            while True:
+                chunk = response.read(I_CHUNK_SIZE)
+                if not chunk:
+                    break
+                a_file.write(chunk)
+                size_got += len(chunk)
+
+                # the server did not say, or lied
+                if max_bytes and size_got > max_bytes:
+                    a_file.close()
+                    path_part.unlink(missing_ok=True)
+                    path_valid.unlink(missing_ok=True)
+                    raise DownloadError(
+                        S_ERR_TOO_BIG.format(size_got, max_bytes)
+                    )
+                if hasher:
+                    hasher.update(chunk)
+
+            # make sure the bytes are on disk before the rename
+            a_file.flush()
+            os.fsync(a_file.fileno())
+
+    # check size
+    if total is not None and size_got != total:
+        raise DownloadError(S_ERR_SHORT.format(size_got, total))
+
+    # move into place
+    _publish(path_part, path_dst)
+    path_valid.unlink(missing_ok=True)
+
+    return size_got
+
+
+# ------------------------------------------------------------------------------
+# Get the first bytes of a url
+# ------------------------------------------------------------------------------
+def probe(url, size=I_PROBE_SIZE, timeout=F_TIMEOUT):
+    """
+    Get the first bytes of a url
+
+    Args:
+        url: The url to probe
+        size: The number of bytes to get (default: I_PROBE_SIZE)
+        timeout: The socket timeout, in seconds (default: F_TIMEOUT)
+
+    Returns:
+        Up to size bytes from the start of the file
+
+    Raises:
+        OSError: If the server could not be reached
+
+    A Range request asks for just the bytes we want. A server that ignores
+    it sends the whole file, so we only read what we asked for and close
+    (which costs us that connection, but not the rest of the file).
+    """
+
+    dict_hdrs = {S_HDR_RANGE: S_RANGE_SPAN.format(0, size - 1)}
+    with urlopen(url, dict_hdrs, timeout) as response:
+        return response.read(size)
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Parse the Content-Range header
+# ------------------------------------------------------------------------------
+def _parse_cont_range(headers):
+    """
+    Parse the Content-Range header
+
+    Args:
+        headers: The headers of a response
+
+    Returns:
+        A tuple of (first byte, total size), either of which may be None
+    """
+
+    # default result
+    start = None
+    total = None
+
+    # find header and parse it
+    value = headers.get(S_HDR_CONT_RANGE, "") if headers else ""
+    res = re.match(R_CONT_RANGE, value)
+    if res:
+        if res.group(1) is not None:
+            start = int(res.group(1))
+        if res.group(2) != "*":
+            total = int(res.group(2))
+
+    return (start, total)
+
+
+# ------------------------------------------------------------------------------
+# Split a url into a pool key and a path
+# ------------------------------------------------------------------------------
+def _split_url(url):
+    """
+    Split a url into a pool key and a path
+
+    Args:
+        url: The url
+
+    Returns:
+        A tuple of ((scheme, host, port), path with query)
+    """
+
+    parts = parse.urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    key = (parts.scheme, parts.hostname, parts.port)
+    return (key, path)
+
+
+# ------------------------------------------------------------------------------
+# Get the host and port part of a url from a pool key
+# ------------------------------------------------------------------------------
+def _get_netloc(key):
+    """
+    Get the host and port part of a url from a pool key
+
+    Args:
+        key: The (scheme, host, port) of the url
+
+    Returns:
+        The host, with the port if there is one, ie. "example.com:8080"
+    """
+
+    _scheme, host, port = key
+    if ":" in host:
+        host = f"[{host}]"
+    return f"{host}:{port}" if port else host
+
+
+# ------------------------------------------------------------------------------
+# Get the headers a proxy needs
+# ------------------------------------------------------------------------------
+def _get_proxy_hdrs(proxy):
+    """
+    Get the headers a proxy needs
+
+    Args:
+        proxy: The proxy url, split
+
+    Returns:
+        A dict with the Proxy-Authorization header if the proxy url has a
+        user name, or an empty dict
+    """
+
+    # no password
+    if not proxy.username:
+        return {}
+
+    # NB: the user and password may be %-encoded in the url
+    str_user = parse.unquote(proxy.username)
+    str_pass = parse.unquote(proxy.password or "")
+    b64 = base64.b64encode(f"{str_user}:{str_pass}".encode()).decode()
+    return {S_HDR_PROXY_AUTH: S_PROXY_AUTH.format(b64)}
+
+
+# ------------------------------------------------------------------------------
+# Save the validator of a response
+# ------------------------------------------------------------------------------
+def _save_valid(path_valid, headers):
+    """
+    Save the validator of a response
+
+    Args:
+        path_valid: The file to save it to
+        headers: The headers of the response
+
+    The ETag is used if it is a strong one, otherwise the Last-Modified. If
+    the server sent neither, the file is removed, so the download will not be
+    resumed.
+    """
+
+    # get the validator
+    str_valid = headers.get(S_HDR_ETAG, "")
+    if not str_valid or str_valid.startswith(S_ETAG_WEAK):
+        str_valid = headers.get(S_HDR_LAST_MOD, "")
+
+    # save it (or forget the old one)
+    if str_valid:
+        path_valid.write_text(str_valid, encoding="UTF-8")
+    else:
+        path_valid.unlink(missing_ok=True)
+
+
+# ------------------------------------------------------------------------------
+# Load the validator of a partial file
+# ------------------------------------------------------------------------------
+def _load_valid(path_valid):
+    """
+    Load the validator of a partial file
+
+    Args:
+        path_valid: The file it was saved to
+
+    Returns:
+        The ETag or Last-Modified, or "" if there is none
+    """
+
+    try:
+        return path_valid.read_text(encoding="UTF-8").strip()
+    except OSError:
+        return ""
+
+
+# ------------------------------------------------------------------------------
+# Feed the contents of a file to a hasher
+# ------------------------------------------------------------------------------
+def _hash_file(path, hasher):
+    """
+    Feed the contents of a file to a hasher
+
+    Args:
+        path: The file to read
+        hasher: The hashlib object, or None to do nothing
+    """
+
+    # nothing to do
+    if not hasher:
+        return
+
+    with open(path, "rb") as a_file:
+        for chunk in iter(lambda: a_file.read(I_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+
+
+# ------------------------------------------------------------------------------
+# Move a finished part file to its final path
+# ------------------------------------------------------------------------------
+def _publish(path_part, path_dst):
+    """
+    Move a finished part file to its final path
+
+    Args:
+        path_part: The completed partial file
+        path_dst: The final path
+
+    The rename is atomic as long as both paths are on the same file system,
+    which they are since the part file lives next to the destination.
+    """
+
+    os.replace(path_part, path_dst)
+
+
+# -)
@@ -0,0 +1,170 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_imgsize.py                                |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Get the size of an image from the first bytes of its file
+
+JPEG, PNG, and GIF files all say how big they are near the start of the
+file, so the size of a remote image can be found from a small Range request
+instead of downloading (and decoding) the whole thing. This only reads the
+headers, it does not need Pillow.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import struct
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# file signatures
+B_SIG_JPEG = b"\xff\xd8"
+B_SIG_PNG = b"\x89PNG\r\n\x1a\n"
+L_SIG_GIF = [b"GIF87a", b"GIF89a"]
+
+# png: width and height follow the signature, the IHDR length, and its type
+I_PNG_IHDR = 16
+
+# gif: width and height follow the signature
+I_GIF_SIZE = 6
+
+# jpeg markers that have no length field
+L_JPEG_STANDALONE = [0x01] + list(range(0xD0, 0xDA))
+
+# jpeg start-of-frame markers, which hold the size
+# NB: 0xC4 (DHT), 0xC8 (JPG), and 0xCC (DAC) are not frames
+L_JPEG_SOF = [
+    m for m in range(0xC0, 0xD0) if m not in (0xC4, 0xC8, 0xCC)
+]
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Get the size of an image from the first bytes of its file
+# ------------------------------------------------------------------------------
+def get_size(data):
+    """
+    Get the size of an image from the first bytes of its file
+
+    Args:
+        data: The start of the file, as bytes
+
+    Returns:
+        A tuple of (width, height), or None if the format is not known or the
+        size is not in the bytes we have
+    """
+
+    try:
+        if data.startswith(B_SIG_PNG):
+            return _get_size_png(data)
+        if data[: len(L_SIG_GIF[0])] in L_SIG_GIF:
+            return _get_size_gif(data)
+        if data.startswith(B_SIG_JPEG):
+            return _get_size_jpeg(data)
+    except struct.error:
+
+        # ran off the end of the data
+        pass
+
+    return None
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Get the size of a png
+# ------------------------------------------------------------------------------
+def _get_size_png(data):
+    """
+    Get the size of a png
+
+    Args:
+        data: The start of the file
+
+    Returns:
+        A tuple of (width, height)
+    """
+
+    return struct.unpack_from(">II", data, I_PNG_IHDR)
+
+
+# ------------------------------------------------------------------------------
+# Get the size of a gif
+# ------------------------------------------------------------------------------
+def _get_size_gif(data):
+    """
+    Get the size of a gif
+
+    Args:
+        data: The start of the file
+
+    Returns:
+        A tuple of (width, height)
+    """
+
+    return struct.unpack_from("<HH", data, I_GIF_SIZE)
+
+
+# ------------------------------------------------------------------------------
+# Get the size of a jpeg
+# ------------------------------------------------------------------------------
+def _get_size_jpeg(data):
+    """
+    Get the size of a jpeg
+
+    Args:
+        data: The start of the file
+
+    Returns:
+        A tuple of (width, height), or None if no frame header was found
+
+    Walks the marker segments after the signature until it finds a
+    start-of-frame. EXIF data (and its thumbnail) comes first, so the frame
+    header may be some way into the file.
+    """
+
+    pos = len(B_SIG_JPEG)
+    while pos < len(data):
+
+        # find the next marker, skipping fill bytes
+        if data[pos] != 0xFF:
+            return None
+        while pos < len(data) and data[pos] == 0xFF:
+            pos += 1
+        if pos >= len(data):
+            return None
+        marker = data[pos]
+        pos += 1
+
+        # no length, nothing to skip
+        if marker in L_JPEG_STANDALONE:
+            continue
+
+        # frame header: length, precision, height, width
+        if marker in L_JPEG_SOF:
+            height, width = struct.unpack_from(">HH", data, pos + 3)
+            return (width, height)
+
+        # skip this segment
+        (length,) = struct.unpack_from(">H", data, pos)
+        pos += length
+
+    return None
+
+
+# -)
@@ -0,0 +1,295 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_limits.py                                 |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Keep large or broken images from using up the memory
+
+Most APOD images are a few MB, but now and then there is a huge panorama,
+and a corrupt (or hostile) file can claim to be any size at all. On a small
+machine, decoding one of those can push the whole desktop into swap. So:
+
+    max_bytes:    a download bigger than this is refused, as soon as the
+                  server says how big it is, or as soon as it gets there
+                  (see spaceoddity_http.download)
+    max_pixels:   an image bigger than this is refused, as soon as its
+                  header says how big it is, before anything decodes it
+    strip_pixels: an image bigger than this is never decoded whole; it is
+                  scaled down while it is decoded (see spaceoddity_render)
+    max_mem:      the decode runs in a child process that can not use more
+                  memory (address space) than this, so a bad image fails
+                  fast, and only the child goes down
+
+A limit of 0 means no limit. The settings are a dict, see D_LIMITS.
+
+This file is also the child process: run it with a job (as json) on stdin,
+and it prints the result (as json) on stdout.
+
+NB: this module must stay pure python (stdlib only) and cheap to import, the
+child only loads Pillow after its memory limit is set.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import json
+from pathlib import Path
+import subprocess
+import sys
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# settings keys
+S_KEY_MAX_BYTES = "max_bytes"
+S_KEY_MAX_PIXELS = "max_pixels"
+S_KEY_STRIP_PIXELS = "strip_pixels"
+S_KEY_MAX_MEM = "max_mem"
+
+# default settings
+# NB: 64 MB download, 250 MP image (ie. 20000 x 12500), decode anything over
+# 50 MP (ie. 8000 x 6250) in strips, 1 GB address space for the child
+D_LIMITS = {
+    S_KEY_MAX_BYTES: 64 * 1024 * 1024,
+    S_KEY_MAX_PIXELS: 250_000_000,
+    S_KEY_STRIP_PIXELS: 50_000_000,
+    S_KEY_MAX_MEM: 1024 * 1024 * 1024,
+}
+
+# job keys
+S_JOB_FUNC = "func"
+S_JOB_ARGS = "args"
+S_JOB_LIMITS = "limits"
+S_JOB_RESULT = "result"
+
+# jobs the child can do
+S_FUNC_COMPOSE = "compose"
+
+# exit codes of a child that hit a limit
+I_EXIT_MEM = 3
+I_EXIT_LIMIT = 4
+
+# errors
+# NB: format params are size and limit
+S_ERR_PIXELS = "Image is too large: {} pixels (limit {})"
+# NB: format param is limit, in MB
+S_ERR_MEM = "Ran out of memory drawing the image (limit {} MB)"
+# NB: format param is the child's last words or exit code
+S_ERR_CHILD = "Could not draw the image: {}"
+
+# ------------------------------------------------------------------------------
+# Classes
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Raised when an image is over a limit
+# ------------------------------------------------------------------------------
+class LimitError(OSError):
+    """
+    Raised when an image is over a limit
+
+    This is a subclass of OSError so that callers who already handle a
+    failed download or an unreadable image will handle this as well.
+    """
+
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Combine the default limits with the user's
+# ------------------------------------------------------------------------------
+def get_limits(dict_limits=None):
+    """
+    Combine the default limits with the user's
+
+    Args:
+        dict_limits: The user's limits (default: None)
+
+    Returns:
+        A dict with every key in D_LIMITS
+    """
+
+    dict_all = dict(D_LIMITS)
+    if dict_limits:
+        dict_all.update(dict_limits)
+    return dict_all
+
+
+# ------------------------------------------------------------------------------
+# Make sure an image is not too big
+# ------------------------------------------------------------------------------
+def check_pixels(img_size, dict_limits=None):
+    """
+    Make sure an image is not too big
+
+    Args:
+        img_size: The (width, height) of the image
+        dict_limits: The limits (default: None, uses D_LIMITS)
+
+    Raises:
+        LimitError if the image is over max_pixels
+    """
+
+    limit = get_limits(dict_limits)[S_KEY_MAX_PIXELS]
+    pixels = img_size[0] * img_size[1]
+    if limit and pixels > limit:
+        raise LimitError(S_ERR_PIXELS.format(pixels, limit))
+
+
+# ------------------------------------------------------------------------------
+# Check if an image is too big to decode whole
+# ------------------------------------------------------------------------------
+def use_strips(img_size, dict_limits=None):
+    """
+    Check if an image is too big to decode whole
+
+    Args:
+        img_size: The (width, height) of the image
+        dict_limits: The limits (default: None, uses D_LIMITS)
+
+    Returns:
+        True if the image is over strip_pixels
+    """
+
+    limit = get_limits(dict_limits)[S_KEY_STRIP_PIXELS]
+    return bool(limit) and img_size[0] * img_size[1] > limit
+
+
+# ------------------------------------------------------------------------------
+# Do a job in a child process with limited memory
+# ------------------------------------------------------------------------------
+def run(func, l_args, dict_limits=None):
+    """
+    Do a job in a child process with limited memory
+
+    Args:
+        func: The job to do, ie. S_FUNC_COMPOSE
+        l_args: The job's args, which must be json types
+        dict_limits: The limits (default: None, uses D_LIMITS)
+
+    Returns:
+        The job's result
+
+    Raises:
+        LimitError if the child ran out of memory or the image is over a
+        limit
+        OSError if the child failed in any other way
+
+    If the parent is interrupted (ie. by a deadline), the child is killed.
+    """
+
+    dict_limits = get_limits(dict_limits)
+    dict_job = {
+        S_JOB_FUNC: func,
+        S_JOB_ARGS: l_args,
+        S_JOB_LIMITS: dict_limits,
+    }
+
+    # NB: this file is the child
+    cp = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve())],
+        input=json.dumps(dict_job),
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+    # out of memory
+    if cp.returncode == I_EXIT_MEM:
+        mem = dict_limits[S_KEY_MAX_MEM] // (1024 * 1024)
+        raise LimitError(S_ERR_MEM.format(mem))
+
+    # image over a limit, or any other failure
+    last = cp.stderr.strip().split("\n")[-1]
+    if cp.returncode == I_EXIT_LIMIT:
+        raise LimitError(last)
+    if cp.returncode:
+        raise OSError(S_ERR_CHILD.format(last or cp.returncode))
+
+    return json.loads(cp.stdout)[S_JOB_RESULT]
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Do the job we were given, as the child process
+# ------------------------------------------------------------------------------
+def _main():
+    """
+    Do the job we were given, as the child process
+
+    Reads the job from stdin, sets the memory limit, does the job, and
+    prints the result to stdout. Exits with I_EXIT_MEM if it ran out of
+    memory, I_EXIT_LIMIT if the image is over a limit, or 1 if the job
+    failed, with the error on stderr.
+    """
+
+    # NB: deferred import, only the child needs it
+    # pylint: disable=import-outside-toplevel
+    import resource
+
+    # get the job
+    dict_job = json.load(sys.stdin)
+    dict_limits = get_limits(dict_job[S_JOB_LIMITS])
+
+    # limit our memory before we load anything big
+    max_mem = dict_limits[S_KEY_MAX_MEM]
+    if max_mem:
+        _soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            max_mem = min(max_mem, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (max_mem, hard))
+
+    try:
+
+        # NB: deferred import, after the limit is set
+        # pylint: disable=import-outside-toplevel
+        import spaceoddity_caption as CP
+        from PIL import Image
+
+        # we check the size ourselves, against our own limits
+        Image.MAX_IMAGE_PIXELS = None
+
+        # do the job
+        if dict_job[S_JOB_FUNC] == S_FUNC_COMPOSE:
+            dir_cache, *l_args = dict_job[S_JOB_ARGS]
+            compositor = CP.Compositor(dir_cache, dict_limits)
+            result = str(compositor.draw(*l_args))
+        else:
+            raise ValueError(dict_job[S_JOB_FUNC])
+
+    except MemoryError:
+        sys.exit(I_EXIT_MEM)
+    except LimitError as error:
+        print(error, file=sys.stderr)
+        sys.exit(I_EXIT_LIMIT)
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        print(error, file=sys.stderr)
+        sys.exit(1)
+
+    print(json.dumps({S_JOB_RESULT: result}))
+
+
+# ------------------------------------------------------------------------------
+# Code to run when called from command line
+# ------------------------------------------------------------------------------
+if __name__ == "__main__":
+
+    # Code to run when called from command line
+    _main()
+
+# -)
@@ -0,0 +1,314 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_lock.py                                   |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+A lock file that keeps two runs from overlapping
+
+The lock is an fcntl (flock) lock on a small file that also holds the pid and
+start time of the owner. The OS drops the lock when the owner exits, however
+it exits, so a crash never leaves the program locked out. If the file is
+locked but the pid in it is gone (or now belongs to a newer process), the lock
+is stale and is replaced.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import fcntl
+import os
+from pathlib import Path
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# where to find when a process started
+# NB: format param is pid
+P_PROC_STAT = "/proc/{}/stat"
+P_STAT = Path("/proc/stat")
+S_BTIME = "btime "
+
+# boot time is in whole seconds, so allow for some rounding
+F_START_SLOP = 2.0
+
+# ------------------------------------------------------------------------------
+# Classes
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# A lock file that keeps two runs from overlapping
+# ------------------------------------------------------------------------------
+class RunLock:
+    """
+    A lock file that keeps two runs from overlapping
+
+    Methods:
+        acquire(): Try to take the lock without waiting
+        release(): Give up the lock
+        is_held(): Check if we have the lock
+        get_owner(): Get the pid and start time of the current owner
+
+    Create one of these with the path to the lock file, then call acquire. If
+    it returns False, another run is active and this one should stop. Keep the
+    object alive for as long as the lock is needed.
+    """
+
+    # --------------------------------------------------------------------------
+    # Class constants
+    # --------------------------------------------------------------------------
+
+    # NB: format params are pid and start time
+    S_LOCK_FMT = "{} {}\n"
+
+    # --------------------------------------------------------------------------
+    # Instance methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the new object
+    # --------------------------------------------------------------------------
+    def __init__(self, path):
+        """
+        Initialize the new object
+
+        Args:
+            path: The path to the lock file
+
+        Initializes a new instance of the class, setting the default values
+        of its properties, and any other code that needs to run to create a
+        new object.
+        """
+
+        # set props
+        self._path = Path(path)
+        self._fd = None
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Try to take the lock without waiting
+    # --------------------------------------------------------------------------
+    def acquire(self):
+        """
+        Try to take the lock without waiting
+
+        Returns:
+            True if we have the lock, False if another live process has it
+
+        If the file is locked but the process in it no longer exists (ie. the
+        lock was inherited by a stray child), or its pid now belongs to a
+        process that started after the lock was taken, the file is removed
+        and a fresh one is locked instead.
+        """
+
+        # already have it
+        if self._fd is not None:
+            return True
+
+        # first try
+        if self._try_lock():
+            return True
+
+        # see if the owner is still alive
+        # NB: a pid of 0 means the owner has the lock but has not written
+        # its pid yet, which is not stale
+        pid, start = self.get_owner()
+        if not pid or not _is_stale(pid, start):
+            return False
+
+        # stale, replace the file and try again
+        # NB: the old owner keeps its lock on the old (now unlinked) file
+        self._path.unlink(missing_ok=True)
+        return self._try_lock()
+
+    # --------------------------------------------------------------------------
+    # Give up the lock
+    # --------------------------------------------------------------------------
+    def release(self):
+        """
+        Give up the lock
+
+        The file is left in place, it is harmless once unlocked.
+        """
+
+        # nothing to do
+        if self._fd is None:
+            return
+
+        # unlock and close
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    # --------------------------------------------------------------------------
+    # Check if we have the lock
+    # --------------------------------------------------------------------------
+    def is_held(self):
+        """
+        Check if we have the lock
+
+        Returns:
+            True if acquire succeeded and release has not been called since
+        """
+
+        return self._fd is not None
+
+    # --------------------------------------------------------------------------
+    # Get the pid and start time of the current owner
+    # --------------------------------------------------------------------------
+    def get_owner(self):
+        """
+        Get the pid and start time of the current owner
+
+        Returns:
+            A tuple of (pid, start time), either of which is 0 if unknown
+        """
+
+        # read the file
+        try:
+            text = self._path.read_text(encoding="UTF-8")
+            str_pid, str_start = text.split()
+            return (int(str_pid), float(str_start))
+        except (OSError, ValueError):
+            return (0, 0)
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Open the file and try to lock it
+    # --------------------------------------------------------------------------
+    def _try_lock(self):
+        """
+        Open the file and try to lock it
+
+        Returns:
+            True if we got the lock, False otherwise
+        """
+
+        # open (or make) the file
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        # try to lock it
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        # make sure nobody replaced the file while we were locking it
+        try:
+            same = os.stat(self._path).st_ino == os.fstat(fd).st_ino
+        except OSError:
+            same = False
+        if not same:
+            os.close(fd)
+            return False
+
+        # we own it now, say who we are
+        os.ftruncate(fd, 0)
+        os.write(fd, self.S_LOCK_FMT.format(os.getpid(), time.time()).encode())
+        self._fd = fd
+
+        return True
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Check if the owner of a lock is gone
+# ------------------------------------------------------------------------------
+def _is_stale(pid, start):
+    """
+    Check if the owner of a lock is gone
+
+    Args:
+        pid: The pid in the lock file
+        start: The time the lock was taken, from the lock file
+
+    Returns:
+        True if the process is gone, or the pid has been reused by a process
+        that started after the lock was taken
+    """
+
+    # gone
+    if not _pid_alive(pid):
+        return True
+
+    # NB: the owner started before it took the lock, so a process with this
+    # pid that started later is someone else
+    proc_start = _get_proc_start(pid)
+    return bool(start and proc_start and proc_start > start + F_START_SLOP)
+
+
+# ------------------------------------------------------------------------------
+# Get the time a process started
+# ------------------------------------------------------------------------------
+def _get_proc_start(pid):
+    """
+    Get the time a process started
+
+    Args:
+        pid: The process id to check
+
+    Returns:
+        The start time as a timestamp, or 0 if unknown
+    """
+
+    try:
+        # NB: starttime is the 22nd field, in clock ticks since boot, and the
+        # name (2nd field) is in parens and may hold spaces
+        text = Path(P_PROC_STAT.format(pid)).read_text(encoding="UTF-8")
+        ticks = int(text.rsplit(")", 1)[1].split()[19])
+        for line in P_STAT.read_text(encoding="UTF-8").splitlines():
+            if line.startswith(S_BTIME):
+                boot = int(line.split()[1])
+                return boot + ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        pass
+
+    return 0
+
+
+# ------------------------------------------------------------------------------
+# Check if a process exists
+# ------------------------------------------------------------------------------
+def _pid_alive(pid):
+    """
+    Check if a process exists
+
+    Args:
+        pid: The process id to check
+
+    Returns:
+        True if the process exists, False if not
+    """
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # exists, but belongs to someone else
+        return True
+    return True
+
+
+# -)
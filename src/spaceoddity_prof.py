@@ -0,0 +1,282 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_prof.py                                   |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Measure where a run spends its time
+
+RunStats collects a monotonic timer and a byte count for each step of a run,
+plus the peak RSS of the process, and turns them into one json line for the
+log. Profiler wraps cProfile and tracemalloc for the --profile option and
+writes their reports to text files.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import resource
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# keys in the stats line
+S_KEY_STEPS = "steps"
+S_KEY_SECS = "secs"
+S_KEY_BYTES = "bytes"
+S_KEY_TOTAL = "total_secs"
+S_KEY_RSS = "peak_rss_kb"
+S_KEY_RESULT = "result"
+
+# prefix of the stats line, so it is easy to grep
+S_LINE_PREFIX = "stats "
+
+# report file names
+# NB: format param is the time of the run
+S_FILE_CPROFILE = "profile_{}_cprofile.txt"
+S_FILE_TRACEMALLOC = "profile_{}_tracemalloc.txt"
+S_TIME_FMT = "%Y%m%d%H%M%S"
+
+# how many lines of each report to write
+I_REPORT_LINES = 40
+
+# ------------------------------------------------------------------------------
+# Classes
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Collect timings and byte counts for a run
+# ------------------------------------------------------------------------------
+class RunStats:
+    """
+    Collect timings and byte counts for a run
+
+    Methods:
+        timer(name): Context manager that times a step
+        add_bytes(name, count): Add to the byte count of a step
+        set_result(result): Set a short word for how the run ended
+        get_line(): Get the stats as one line for the log
+
+    Create one of these at the start of a run, wrap each step in
+    "with stats.timer(name):", and log get_line() at the end.
+    """
+
+    # --------------------------------------------------------------------------
+    # Instance methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the new object
+    # --------------------------------------------------------------------------
+    def __init__(self):
+        """
+        Initialize the new object
+
+        Initializes a new instance of the class, setting the default values
+        of its properties, and any other code that needs to run to create a
+        new object.
+        """
+
+        # set props
+        self._start = time.monotonic()
+        self._dict_steps = {}
+        self._result = ""
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Context manager that times a step
+    # --------------------------------------------------------------------------
+    @contextmanager
+    def timer(self, name):
+        """
+        Context manager that times a step
+
+        Args:
+            name: The name of the step
+
+        The time is recorded even if the step raises (or exits).
+        """
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            dict_step = self._dict_steps.setdefault(name, {})
+            dict_step[S_KEY_SECS] = round(
+                dict_step.get(S_KEY_SECS, 0) + time.monotonic() - start, 4
+            )
+
+    # --------------------------------------------------------------------------
+    # Add to the byte count of a step
+    # --------------------------------------------------------------------------
+    def add_bytes(self, name, count):
+        """
+        Add to the byte count of a step
+
+        Args:
+            name: The name of the step
+            count: The number of bytes to add
+        """
+
+        dict_step = self._dict_steps.setdefault(name, {})
+        dict_step[S_KEY_BYTES] = dict_step.get(S_KEY_BYTES, 0) + count
+
+    # --------------------------------------------------------------------------
+    # Set a short word for how the run ended
+    # --------------------------------------------------------------------------
+    def set_result(self, result):
+        """
+        Set a short word for how the run ended
+
+        Args:
+            result: The result, ie. "new", "same", "timeout"
+        """
+
+        self._result = result
+
+    # --------------------------------------------------------------------------
+    # Get the stats as one line for the log
+    # --------------------------------------------------------------------------
+    def get_line(self):
+        """
+        Get the stats as one line for the log
+
+        Returns:
+            A string starting with S_LINE_PREFIX followed by a json object
+        """
+
+        # NB: ru_maxrss is in KB on linux
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        dict_line = {
+            S_KEY_RESULT: self._result,
+            S_KEY_TOTAL: round(time.monotonic() - self._start, 4),
+            S_KEY_RSS: peak_rss,
+            S_KEY_STEPS: self._dict_steps,
+        }
+
+        return S_LINE_PREFIX + json.dumps(dict_line, sort_keys=True)
+
+
+# ------------------------------------------------------------------------------
+# Run cProfile and tracemalloc and write their reports
+# ------------------------------------------------------------------------------
+class Profiler:
+    """
+    Run cProfile and tracemalloc and write their reports
+
+    Methods:
+        start(): Start profiling
+        stop(dir_out): Stop profiling and write the reports
+
+    The profiling modules are only imported when start is called, so a normal
+    run does not pay for them.
+    """
+
+    # --------------------------------------------------------------------------
+    # Instance methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the new object
+    # --------------------------------------------------------------------------
+    def __init__(self):
+        """
+        Initialize the new object
+
+        Initializes a new instance of the class, setting the default values
+        of its properties, and any other code that needs to run to create a
+        new object.
+        """
+
+        # set props
+        self._profile = None
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Start profiling
+    # --------------------------------------------------------------------------
+    def start(self):
+        """
+        Start profiling
+        """
+
+        # NB: deferred imports, only needed with --profile
+        # pylint: disable=import-outside-toplevel
+        import cProfile
+        import tracemalloc
+
+        tracemalloc.start()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    # --------------------------------------------------------------------------
+    # Stop profiling and write the reports
+    # --------------------------------------------------------------------------
+    def stop(self, dir_out):
+        """
+        Stop profiling and write the reports
+
+        Args:
+            dir_out: The dir to write the reports to
+
+        Returns:
+            A list of the paths that were written
+        """
+
+        # NB: deferred imports, only needed with --profile
+        # pylint: disable=import-outside-toplevel
+        import io
+        import pstats
+        import tracemalloc
+
+        # not started
+        if self._profile is None:
+            return []
+
+        # stop both
+        self._profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # make file names
+        dir_out.mkdir(parents=True, exist_ok=True)
+        str_now = datetime.now().strftime(S_TIME_FMT)
+        path_prof = dir_out / S_FILE_CPROFILE.format(str_now)
+        path_mem = dir_out / S_FILE_TRACEMALLOC.format(str_now)
+
+        # write cProfile report
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(I_REPORT_LINES)
+        path_prof.write_text(stream.getvalue(), encoding="UTF-8")
+
+        # write tracemalloc report
+        l_lines = [f"peak traced: {peak} bytes", ""]
+        for stat in snapshot.statistics("lineno")[:I_REPORT_LINES]:
+            l_lines.append(str(stat))
+        path_mem.write_text("\n".join(l_lines) + "\n", encoding="UTF-8")
+
+        self._profile = None
+        return [path_prof, path_mem]
+
+
+# -)
@@ -0,0 +1,226 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_ratelimit.py                              |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Keep track of how many api requests we have left
+
+api.nasa.gov limits each api key to a number of requests per hour, and says
+how many are left in the X-RateLimit-Remaining header of each response. We
+keep the last numbers we saw in the state file, so every run (and every
+host's run, if they share a key) can see them. Work that can wait, like a
+backfill, only spends requests if that leaves a reserve for the daily check.
+A 429 (too many requests) pauses only the part of the program that got it.
+
+NB: this module must stay pure python (stdlib only) and cheap to import, since
+the scheduler loads it before everything else on every scheduled run.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# http headers
+S_HDR_LIMIT = "X-RateLimit-Limit"
+S_HDR_REMAINING = "X-RateLimit-Remaining"
+S_HDR_RETRY = "Retry-After"
+
+# http status for too many requests
+I_HTTP_TOO_MANY = 429
+
+# the api counts requests over a rolling hour
+F_WINDOW = 60 * 60
+
+# requests to keep for the daily check
+I_RESERVE = 5
+
+# parts of the program that spend requests
+S_SUB_POLL = "poll"
+S_SUB_BACKFILL = "backfill"
+
+# state dict keys
+S_KEY_RATE = "ratelimit"
+S_KEY_LIMIT = "limit"
+S_KEY_REMAINING = "remaining"
+S_KEY_TIME = "time"
+S_KEY_PAUSED = "paused"
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Save the rate limit headers of a response
+# ------------------------------------------------------------------------------
+def update(dict_state, headers, now=None):
+    """
+    Save the rate limit headers of a response
+
+    Args:
+        dict_state: The state dict to update
+        headers: The headers of an api response
+        now: The current time as a timestamp (default: time.time())
+
+    Responses without the headers (ie. from a server other than the api)
+    are ignored.
+    """
+
+    # get current time
+    if now is None:
+        now = time.time()
+
+    # get headers
+    try:
+        limit = int(headers.get(S_HDR_LIMIT))
+        remaining = int(headers.get(S_HDR_REMAINING))
+    except (TypeError, ValueError):
+        return
+
+    # save them
+    dict_rate = dict_state.setdefault(S_KEY_RATE, {})
+    dict_rate[S_KEY_LIMIT] = limit
+    dict_rate[S_KEY_REMAINING] = remaining
+    dict_rate[S_KEY_TIME] = now
+
+
+# ------------------------------------------------------------------------------
+# Get the number of requests we have left
+# ------------------------------------------------------------------------------
+def get_remaining(dict_state, now=None):
+    """
+    Get the number of requests we have left
+
+    Args:
+        dict_state: The state dict
+        now: The current time as a timestamp (default: time.time())
+
+    Returns:
+        The number of requests left, or None if we don't know
+
+    Numbers older than the api's window are stale, the requests they
+    counted have aged out, so we assume the whole limit is back.
+    """
+
+    # get current time
+    if now is None:
+        now = time.time()
+
+    # never seen the headers
+    dict_rate = dict_state.get(S_KEY_RATE, {})
+    if S_KEY_REMAINING not in dict_rate:
+        return None
+
+    # stale
+    if now - dict_rate.get(S_KEY_TIME, 0) > F_WINDOW:
+        return dict_rate.get(S_KEY_LIMIT)
+
+    return dict_rate[S_KEY_REMAINING]
+
+
+# ------------------------------------------------------------------------------
+# Check if work that can wait may spend some requests
+# ------------------------------------------------------------------------------
+def can_spend(dict_state, count, reserve=I_RESERVE, now=None):
+    """
+    Check if work that can wait may spend some requests
+
+    Args:
+        dict_state: The state dict
+        count: The number of requests the work needs
+        reserve: The number of requests to keep for the daily check
+        (default: I_RESERVE)
+        now: The current time as a timestamp (default: time.time())
+
+    Returns:
+        True if we don't know the budget, or if spending count requests
+        would still leave the reserve
+    """
+
+    remaining = get_remaining(dict_state, now)
+    if remaining is None:
+        return True
+    return remaining - count >= reserve
+
+
+# ------------------------------------------------------------------------------
+# Pause a part of the program after a 429
+# ------------------------------------------------------------------------------
+def pause(dict_state, sub, headers=None, now=None):
+    """
+    Pause a part of the program after a 429
+
+    Args:
+        dict_state: The state dict to update
+        sub: The part of the program that got the 429, ie. S_SUB_POLL
+        headers: The headers of the 429 response (default: None)
+        now: The current time as a timestamp (default: time.time())
+
+    Returns:
+        The timestamp when the pause ends
+
+    The pause lasts as long as the Retry-After header says, in seconds or as
+    a date, or for the api's whole window if there is no header. The budget
+    is also set to 0, so other work that can wait holds off too.
+    """
+
+    # get current time
+    if now is None:
+        now = time.time()
+
+    # NB: deferred import, only needed after a 429
+    # pylint: disable=import-outside-toplevel
+    from email.utils import parsedate_to_datetime
+
+    # get the end of the pause
+    until = now + F_WINDOW
+    value = headers.get(S_HDR_RETRY) if headers else None
+    if value:
+        try:
+            until = now + int(value)
+        except ValueError:
+            try:
+                until = parsedate_to_datetime(value).timestamp()
+            except (TypeError, ValueError):
+                pass
+
+    # save it
+    dict_rate = dict_state.setdefault(S_KEY_RATE, {})
+    dict_rate.setdefault(S_KEY_PAUSED, {})[sub] = until
+    dict_rate[S_KEY_REMAINING] = 0
+    dict_rate[S_KEY_TIME] = now
+
+    return until
+
+
+# ------------------------------------------------------------------------------
+# Get the end of a part of the program's pause
+# ------------------------------------------------------------------------------
+def get_pause(dict_state, sub):
+    """
+    Get the end of a part of the program's pause
+
+    Args:
+        dict_state: The state dict
+        sub: The part of the program, ie. S_SUB_POLL
+
+    Returns:
+        The timestamp when the pause ends, or 0 if it is not paused
+    """
+
+    dict_paused = dict_state.get(S_KEY_RATE, {}).get(S_KEY_PAUSED, {})
+    return dict_paused.get(sub, 0)
+
+
+# -)
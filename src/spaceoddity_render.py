@@ -0,0 +1,565 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_render.py                                 |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Scale an image to the screen
+
+The wallpaper is rendered once, at the exact size of each monitor, in the
+configured scale mode (fill or fit). The desktop then shows it pixel for
+pixel, instead of decoding and scaling a much larger image every time it
+draws the background (at login, on monitor wake, etc).
+
+With more than one monitor, each monitor's part is put on one canvas that is
+laid out like the monitors, and the desktop is told to span it across them.
+
+Monitors are (x, y, width, height) tuples, as from spaceoddity_screen.
+
+APOD's HD images can be 6000 to 10000 pixels on a side, and a full decode of
+one takes hundreds of MB before it is scaled down to a screen a fraction of
+its size. So open_image gets close to the size we need as cheaply as it can:
+a JPEG is decoded at 1/2, 1/4 or 1/8 scale (the decoder skips the detail it
+would throw away), and anything still much too big is box-reduced by a whole
+number. Both stop between the size we need and twice that, so the final
+LANCZOS resample still has the pixels to do a good job.
+
+An image too big to decode whole (see spaceoddity_limits) is scaled down
+while it is decoded instead: a JPEG by the decoder, a PNG a strip at a time.
+
+NB: Pillow is only imported when something has to be drawn, so this module is
+cheap to import.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import io
+import math
+import struct
+import zlib
+
+# local imports
+import spaceoddity_imgsize as IS
+import spaceoddity_limits as LM
+import spaceoddity_screen as SC
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# color of the bars in fit mode
+T_COLOR_BG = (0, 0, 0)
+
+# how much bigger than needed the image can be before the final resample
+F_OVERSAMPLE = 2.0
+
+# exif orientations that swap width and height
+I_EXIF_ORIENTATION = 0x0112
+L_ORIENT_SWAP = [5, 6, 7, 8]
+
+# the format Pillow gives png files
+S_FMT_PNG = "PNG"
+
+# png chunks
+B_PNG_IHDR = b"IHDR"
+B_PNG_IDAT = b"IDAT"
+B_PNG_IEND = b"IEND"
+
+# png chunks a strip needs to decode the same as the whole image
+L_PNG_COPY = [b"PLTE", b"tRNS"]
+
+# png color types we can read in strips (at 8 bits), and their bytes per pixel
+D_PNG_BPP = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# how much png data to decode at once, and how much of the file to read
+I_STRIP_BYTES = 16 * 1024 * 1024
+I_READ_SIZE = 1024 * 1024
+
+# errors
+S_ERR_PNG_SHORT = "PNG data ends early"
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Move a monitor layout so its top left corner is at 0, 0
+# ------------------------------------------------------------------------------
+def get_layout(l_monitors):
+    """
+    Move a monitor layout so its top left corner is at 0, 0
+
+    Args:
+        l_monitors: The list of monitors
+
+    Returns:
+        A tuple of (the size of the canvas, the list of moved monitors)
+    """
+
+    min_x = min(mon[0] for mon in l_monitors)
+    min_y = min(mon[1] for mon in l_monitors)
+    l_moved = [(x - min_x, y - min_y, w, h) for x, y, w, h in l_monitors]
+    size = (
+        max(x + w for x, _y, w, _h in l_moved),
+        max(y + h for _x, y, _w, h in l_moved),
+    )
+    return (size, l_moved)
+
+
+# ------------------------------------------------------------------------------
+# Open an image, no bigger than it needs to be for a monitor layout
+# ------------------------------------------------------------------------------
+def open_image(path, l_monitors=None, mode=SC.S_MODE_FILL, dict_limits=None):
+    """
+    Open an image, no bigger than it needs to be for a monitor layout
+
+    Args:
+        path: The path to the image
+        l_monitors: The list of monitors, or None to keep the full size
+        (default: None)
+        mode: The scale mode, SC.S_MODE_FILL or SC.S_MODE_FIT (default:
+        SC.S_MODE_FILL)
+        dict_limits: The limits (see spaceoddity_limits), or None for none
+        (default: None)
+
+    Returns:
+        The image, in RGB, the right way up, and between as big as render
+        needs it and F_OVERSAMPLE times that (or its full size, if that is
+        smaller)
+
+    Raises:
+        LM.LimitError if the image is over max_pixels
+        OSError if the image can not be read (Pillow raises OSError for
+        images it can't read)
+
+    With limits, the size is checked from the header, before anything is
+    decoded. An image over strip_pixels is never decoded whole: a JPEG is
+    decoded at the scale that fits (down to 1/8), and a PNG is decoded a
+    strip at a time, each strip reduced as it comes, so only one strip is
+    full size at once. Other formats are decoded whole, so that is what the
+    child's memory limit is for.
+    """
+
+    # NB: deferred import, only needed when we draw
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as img_file:
+
+        # check the size before we decode anything
+        strips = False
+        if dict_limits is not None:
+            LM.check_pixels(img_file.size, dict_limits)
+            strips = LM.use_strips(img_file.size, dict_limits)
+
+        # get the scale we need, the right way up
+        size = img_file.size
+        if _get_orient(img_file) in L_ORIENT_SWAP:
+            size = size[::-1]
+        need = min(1.0, get_scale(size, l_monitors, mode))
+
+        # the scale we can afford, which wins over the one we need
+        # NB: draft picks the smallest of 1, 1/2, 1/4, 1/8 that is not
+        # smaller than what we ask for, so ask for half of what we can afford
+        draft = need
+        factor = 1
+        if strips:
+            pixels = size[0] * size[1]
+            limit = LM.get_limits(dict_limits)[LM.S_KEY_STRIP_PIXELS]
+            afford = math.sqrt(limit / pixels)
+            draft = min(need, afford / 2)
+            factor = max(int(1 / need), math.ceil(1 / afford))
+
+        # a png that is too big is read a strip at a time
+        if strips and img_file.format == S_FMT_PNG:
+            img = _open_png_strips(path, factor)
+            if img is not None:
+                if "exif" in img_file.info:
+                    img.info["exif"] = img_file.info["exif"]
+                return ImageOps.exif_transpose(img)
+
+        # let the jpeg decoder skip what we don't need
+        # NB: draft does nothing for other formats
+        if draft < 1:
+            img_file.draft(
+                "RGB",
+                (
+                    math.ceil(img_file.size[0] * draft),
+                    math.ceil(img_file.size[1] * draft),
+                ),
+            )
+
+        img = ImageOps.exif_transpose(img_file).convert("RGB")
+
+    # box-reduce whatever is still too big
+    # NB: a whole number factor leaves it between 1 and 2 times what we need
+    if img.size[0] > size[0] * need * F_OVERSAMPLE:
+        factor = int(img.size[0] / (size[0] * need))
+        img = img.reduce(factor)
+
+    return img
+
+
+# ------------------------------------------------------------------------------
+# Get the scale an image needs for a monitor layout
+# ------------------------------------------------------------------------------
+def get_scale(img_size, l_monitors=None, mode=SC.S_MODE_FILL):
+    """
+    Get the scale an image needs for a monitor layout
+
+    Args:
+        img_size: The (width, height) of the image
+        l_monitors: The list of monitors, or None for the full size
+        (default: None)
+        mode: The scale mode, SC.S_MODE_FILL or SC.S_MODE_FIT (default:
+        SC.S_MODE_FILL)
+
+    Returns:
+        The biggest scale any monitor needs, ie. 0.25 if the image is four
+        times bigger than it needs to be, or 1.0 if there are no monitors
+    """
+
+    if not l_monitors:
+        return 1.0
+
+    # fill = max, fit = min
+    func = min if mode == SC.S_MODE_FIT else max
+    return max(
+        func(mon[2] / img_size[0], mon[3] / img_size[1]) for mon in l_monitors
+    )
+
+
+# ------------------------------------------------------------------------------
+# Render an image for a monitor layout
+# ------------------------------------------------------------------------------
+def render(img, l_monitors, mode=SC.S_MODE_FILL):
+    """
+    Render an image for a monitor layout
+
+    Args:
+        img: The Pillow image, in RGB
+        l_monitors: The list of monitors
+        mode: The scale mode, SC.S_MODE_FILL or SC.S_MODE_FIT (default:
+        SC.S_MODE_FILL)
+
+    Returns:
+        The canvas, a Pillow image the size of the layout, with the image
+        scaled to each monitor
+
+    Monitors of the same size share one scaled copy.
+    """
+
+    # NB: deferred import, only needed when we draw
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image
+
+    # one monitor, no canvas needed
+    size, l_moved = get_layout(l_monitors)
+    if len(l_moved) == 1:
+        return scale(img, size, mode)
+
+    # draw each monitor's part
+    canvas = Image.new("RGB", size, color=T_COLOR_BG)
+    dict_scaled = {}
+    for x, y, w, h in l_moved:
+        if (w, h) not in dict_scaled:
+            dict_scaled[(w, h)] = scale(img, (w, h), mode)
+        canvas.paste(dict_scaled[(w, h)], (x, y))
+
+    return canvas
+
+
+# ------------------------------------------------------------------------------
+# Scale an image to an exact size
+# ------------------------------------------------------------------------------
+def scale(img, size, mode=SC.S_MODE_FILL):
+    """
+    Scale an image to an exact size
+
+    Args:
+        img: The Pillow image, in RGB
+        size: The (width, height) to scale to
+        mode: The scale mode, SC.S_MODE_FILL or SC.S_MODE_FIT (default:
+        SC.S_MODE_FILL)
+
+    Returns:
+        A new Pillow image of the given size
+
+    In fill mode the image covers the whole size and the overflow is
+    cropped evenly from both sides. Only the part that is kept is resampled.
+    In fit mode the whole image is shown, centered, with bars to fill the
+    rest.
+    """
+
+    # NB: deferred import, only needed when we draw
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image
+
+    img_w, img_h = img.size
+    scr_w, scr_h = size
+
+    # fill = max, fit = min
+    rat_w = scr_w / img_w
+    rat_h = scr_h / img_h
+
+    # fill: resample only the part of the image that shows
+    if mode != SC.S_MODE_FIT:
+        ratio = max(rat_w, rat_h)
+        box_w = scr_w / ratio
+        box_h = scr_h / ratio
+        left = (img_w - box_w) / 2
+        top = (img_h - box_h) / 2
+        return img.resize(
+            size,
+            Image.Resampling.LANCZOS,
+            box=(left, top, left + box_w, top + box_h),
+        )
+
+    # fit: scale it all and center it on the bars
+    ratio = min(rat_w, rat_h)
+    fit_w = max(1, min(scr_w, round(img_w * ratio)))
+    fit_h = max(1, min(scr_h, round(img_h * ratio)))
+    img_fit = img.resize((fit_w, fit_h), Image.Resampling.LANCZOS)
+    if (fit_w, fit_h) == size:
+        return img_fit
+    canvas = Image.new("RGB", size, color=T_COLOR_BG)
+    canvas.paste(img_fit, ((scr_w - fit_w) // 2, (scr_h - fit_h) // 2))
+    return canvas
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Get the exif orientation of an image, without decoding it
+# ------------------------------------------------------------------------------
+def _get_orient(img_file):
+    """
+    Get the exif orientation of an image, without decoding it
+
+    Args:
+        img_file: The Pillow image, as opened
+
+    Returns:
+        The orientation, or None if it has none
+
+    NB: a png can keep its exif after the image data, and asking Pillow for
+    it then decodes the whole image, so a png only has one if it is already
+    in the header.
+    """
+
+    if img_file.format == S_FMT_PNG and "exif" not in img_file.info:
+        return None
+    return img_file.getexif().get(I_EXIF_ORIENTATION)
+
+
+# ------------------------------------------------------------------------------
+# Read a png a strip at a time, reducing each strip as it comes
+# ------------------------------------------------------------------------------
+def _open_png_strips(path, factor):
+    """
+    Read a png a strip at a time, reducing each strip as it comes
+
+    Args:
+        path: The path to the png
+        factor: The whole number to reduce the image by
+
+    Returns:
+        The reduced image, in RGB, or None if the png can't be read in
+        strips (it is interlaced, or not 8 bits per channel)
+
+    Raises:
+        OSError if the png can not be read
+
+    The image data is one zlib stream of filtered rows. We inflate only as
+    much as one strip needs, wrap those rows in a small png of their own,
+    and let Pillow decode that. A row's filter can depend on the row above
+    it, so each strip starts with the last row of the one before, as a
+    plain (unfiltered) row, which is cropped off again after decoding.
+    """
+
+    # NB: deferred import, only needed when we draw
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image
+
+    with open(path, "rb") as a_file:
+
+        # read the chunks up to the image data
+        if a_file.read(len(IS.B_SIG_PNG)) != IS.B_SIG_PNG:
+            return None
+        b_ihdr = b""
+        l_head = []
+        while True:
+            head = a_file.read(8)
+            if len(head) < 8:
+                raise OSError(S_ERR_PNG_SHORT)
+            length, name = struct.unpack(">I4s", head)
+            if name == B_PNG_IDAT:
+                break
+            data = a_file.read(length)
+            a_file.seek(4, io.SEEK_CUR)
+            if name == B_PNG_IHDR:
+                b_ihdr = data
+            elif name in L_PNG_COPY:
+                l_head.append((name, data))
+
+        # see if we can do it
+        width, height, depth, color, _comp, _filter, interlace = (
+            struct.unpack(">IIBBBBB", b_ihdr)
+        )
+        if depth != 8 or interlace or color not in D_PNG_BPP:
+            return None
+        stride = width * D_PNG_BPP[color] + 1
+        rows = max(factor, I_STRIP_BYTES // stride // factor * factor)
+
+        # make the output
+        img_out = Image.new(
+            "RGB", (math.ceil(width / factor), math.ceil(height / factor))
+        )
+
+        # inflate and decode a strip at a time
+        inflater = zlib.decompressobj()
+        l_idat = _iter_idat(a_file, length)
+        buf = bytearray()
+        data = b""
+        prev = b""
+        y = 0
+        while y < height:
+
+            # get the strip's rows
+            n_rows = min(rows, height - y)
+            want = n_rows * stride
+            while len(buf) < want:
+                if not data:
+                    data = next(l_idat, b"")
+                    if not data:
+                        raise OSError(S_ERR_PNG_SHORT)
+                buf += inflater.decompress(data, want - len(buf))
+                data = inflater.unconsumed_tail
+
+            # decode them
+            img = _decode_strip(
+                b_ihdr, l_head, prev, bytes(buf[:want]), n_rows
+            )
+            del buf[:want]
+
+            # keep the last row for the next strip's filters
+            prev = b"\x00" + img.crop((0, n_rows - 1, width, n_rows)).tobytes()
+
+            # add it to the output
+            img = img.convert("RGB")
+            if factor > 1:
+                img = img.reduce(factor)
+            img_out.paste(img, (0, y // factor))
+            y += n_rows
+
+    return img_out
+
+
+# ------------------------------------------------------------------------------
+# Get the compressed image data of a png, a piece at a time
+# ------------------------------------------------------------------------------
+def _iter_idat(a_file, length):
+    """
+    Get the compressed image data of a png, a piece at a time
+
+    Args:
+        a_file: The png file, just past the first IDAT chunk's header
+        length: The length of the first IDAT chunk
+
+    Yields:
+        Pieces of the data, up to I_READ_SIZE bytes each, from every IDAT
+        chunk in a row
+    """
+
+    while True:
+
+        # read this chunk
+        while length:
+            data = a_file.read(min(length, I_READ_SIZE))
+            if not data:
+                return
+            length -= len(data)
+            yield data
+
+        # skip its crc and see if the next one is more data
+        a_file.seek(4, io.SEEK_CUR)
+        head = a_file.read(8)
+        if len(head) < 8:
+            return
+        length, name = struct.unpack(">I4s", head)
+        if name != B_PNG_IDAT:
+            return
+
+
+# ------------------------------------------------------------------------------
+# Decode some rows of a png
+# ------------------------------------------------------------------------------
+def _decode_strip(b_ihdr, l_head, prev, data, n_rows):
+    """
+    Decode some rows of a png
+
+    Args:
+        b_ihdr: The whole png's IHDR data
+        l_head: The (name, data) of the chunks to copy, ie. the palette
+        prev: The row above these, with its filter byte, or b"" for none
+        data: The filtered rows, as inflated from the whole png
+        n_rows: The number of rows in data
+
+    Returns:
+        The rows as a Pillow image, in the png's own mode
+    """
+
+    # NB: deferred import, only needed when we draw
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image
+
+    # a png of just these rows
+    n_prev = 1 if prev else 0
+    b_head = struct.pack(">I", n_rows + n_prev)
+    b_png = b"".join(
+        [
+            IS.B_SIG_PNG,
+            _make_chunk(B_PNG_IHDR, b_ihdr[:4] + b_head + b_ihdr[8:]),
+            *(_make_chunk(name, chunk) for name, chunk in l_head),
+            _make_chunk(B_PNG_IDAT, zlib.compress(prev + data, 0)),
+            _make_chunk(B_PNG_IEND, b""),
+        ]
+    )
+
+    with Image.open(io.BytesIO(b_png)) as img:
+        img.load()
+        if n_prev:
+            return img.crop((0, n_prev, img.size[0], n_prev + n_rows))
+        return img.copy()
+
+
+# ------------------------------------------------------------------------------
+# Make a png chunk
+# ------------------------------------------------------------------------------
+def _make_chunk(name, data):
+    """
+    Make a png chunk
+
+    Args:
+        name: The chunk's type, ie. b"IDAT"
+        data: The chunk's data
+
+    Returns:
+        The chunk, with its length and crc
+    """
+
+    crc = zlib.crc32(name + data)
+    return struct.pack(">I", len(data)) + name + data + struct.pack(">I", crc)
+
+
+# -)
@@ -0,0 +1,504 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_sched.py                                  |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Decide when the next APOD check should happen
+
+A new APOD is published once a day, around midnight US Eastern time. This
+module uses the date of the last APOD we saw to work out when the next one is
+expected, and keeps a small state file so that a scheduled run can decide
+whether it has anything to do before importing anything heavy or touching the
+network.
+
+It also keeps track of failed checks (ie. the network is down). Each failure
+pushes the next attempt back exponentially, with some jitter so that many
+machines do not retry in step, and after enough of them in a row the circuit
+opens and scheduled runs stop trying for a while. A resume from suspend, a
+reboot, or a change in the default network route is taken as a sign that
+things may work again, and lifts the wait.
+
+NB: this module must stay pure python (stdlib only) and cheap to import, since
+it is loaded before everything else on every scheduled run.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+from datetime import datetime, time as dt_time, timedelta, timezone
+import json
+import os
+from pathlib import Path
+import random
+import time
+
+# local imports
+import spaceoddity_ratelimit as RL
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# path to state file
+P_STATE = Path(__file__).parents[1].resolve() / "conf/state.json"
+
+# cmd line option that marks a scheduled (cron) run
+S_ARG_SCHED_OPTION = "--scheduled"
+
+# tz where the APOD rolls over
+S_TZ_APOD = "America/New_York"
+# NB: used if the system has no tz database
+I_TZ_APOD_FALLBACK = -5
+
+# format of the APOD "date" key
+S_DATE_FMT = "%Y-%m-%d"
+
+# start checking this many seconds before the expected rollover
+F_LEAD = 5 * 60
+
+# first backoff after a miss, and the most we will ever wait
+F_BACKOFF_BASE = 10 * 60
+F_BACKOFF_MAX = 2 * 60 * 60
+
+# first wait after a failure, and the most we will wait before the circuit
+# opens
+F_FAIL_BASE = 60
+F_FAIL_MAX = 60 * 60
+
+# failures in a row that open the circuit, and how long it stays open
+I_FAIL_OPEN = 5
+F_FAIL_COOL = 6 * 60 * 60
+
+# the wait is randomly cut by up to this fraction
+F_FAIL_JITTER = 0.5
+
+# seconds of suspend that count as a resume, or of change in the boot time
+# that counts as a reboot
+F_EVENT_MIN = 60
+
+# file that lists the kernel's routes
+P_ROUTES = Path("/proc/net/route")
+# NB: the destination of the default route, in the format of that file
+S_ROUTE_DEFAULT = "00000000"
+
+# state dict keys
+S_KEY_SCHED = "sched"
+S_KEY_DATE = "date"
+S_KEY_NEXT = "next"
+S_KEY_MISSES = "misses"
+S_KEY_FAIL = "fail"
+S_KEY_COUNT = "count"
+S_KEY_ERROR = "error"
+S_KEY_OPEN = "open"
+S_KEY_SLEPT = "slept"
+S_KEY_BOOT = "boot"
+S_KEY_ROUTE = "route"
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Load the state file
+# ------------------------------------------------------------------------------
+def load_state(path=P_STATE):
+    """
+    Load the state file
+
+    Args:
+        path: The path to the state file (default: P_STATE)
+
+    Returns:
+        The state dict, or an empty dict if the file is missing or bad
+    """
+
+    try:
+        with open(path, "r", encoding="UTF-8") as a_file:
+            dict_state = json.load(a_file)
+    except (OSError, ValueError):
+        return {}
+
+    # sanity check
+    if not isinstance(dict_state, dict):
+        return {}
+    return dict_state
+
+
+# ------------------------------------------------------------------------------
+# Save the state file
+# ------------------------------------------------------------------------------
+def save_state(dict_state, path=P_STATE):
+    """
+    Save the state file
+
+    Args:
+        dict_state: The state dict to save
+        path: The path to the state file (default: P_STATE)
+
+    The file is written to a temp file and renamed, so a reader never sees a
+    half-written file.
+    """
+
+    path = Path(path)
+    path_tmp = path.with_name(path.name + ".tmp")
+    try:
+        with open(path_tmp, "w", encoding="UTF-8") as a_file:
+            json.dump(dict_state, a_file, indent=4)
+        os.replace(path_tmp, path)
+    except OSError:
+
+        # state is only an optimization, never fatal
+        pass
+
+
+# ------------------------------------------------------------------------------
+# Check if a scheduled run should do any work
+# ------------------------------------------------------------------------------
+def is_due(path=P_STATE, now=None):
+    """
+    Check if a scheduled run should do any work
+
+    Args:
+        path: The path to the state file (default: P_STATE)
+        now: The current time as a timestamp (default: time.time())
+
+    Returns:
+        True if it is time to check the server, False otherwise
+    """
+
+    # get current time
+    if now is None:
+        now = time.time()
+
+    # no state means we know nothing, so check
+    return now >= get_next_check(load_state(path))
+
+
+# ------------------------------------------------------------------------------
+# Get the time of the next check
+# ------------------------------------------------------------------------------
+def get_next_check(dict_state):
+    """
+    Get the time of the next check
+
+    Args:
+        dict_state: The state dict
+
+    Returns:
+        The timestamp of the next check, which is the latest of the
+        schedule, the failure backoff, and any rate limit pause (0 means
+        now)
+
+    The failure backoff is ignored if the machine has resumed from suspend,
+    rebooted, or the network has changed since the last failure.
+    """
+
+    # get time from schedule
+    next_check = dict_state.get(S_KEY_SCHED, {}).get(S_KEY_NEXT, 0)
+
+    # add time from a 429
+    next_check = max(next_check, RL.get_pause(dict_state, RL.S_SUB_POLL))
+
+    # add time from failures
+    dict_fail = dict_state.get(S_KEY_FAIL)
+    if dict_fail and not _had_event(dict_fail):
+        next_check = max(next_check, dict_fail.get(S_KEY_NEXT, 0))
+
+    return next_check
+
+
+# ------------------------------------------------------------------------------
+# Note a failed check of the server
+# ------------------------------------------------------------------------------
+def record_failure(dict_state, str_error, now=None):
+    """
+    Note a failed check of the server
+
+    Args:
+        dict_state: The state dict to update
+        str_error: The class name of the error
+        now: The current time as a timestamp (default: time.time())
+
+    Returns:
+        True if this failure opened the circuit
+
+    The wait doubles with each failure in a row, up to F_FAIL_MAX. After
+    I_FAIL_OPEN failures the circuit opens and the wait is F_FAIL_COOL.
+    Each wait is cut by a random amount, up to F_FAIL_JITTER of it. A
+    resume, reboot, or network change since the last failure starts the
+    count over.
+    """
+
+    # get current time
+    if now is None:
+        now = time.time()
+
+    # get fail dict, starting over after a resume or network change
+    dict_fail = dict_state.get(S_KEY_FAIL, {})
+    if dict_fail and _had_event(dict_fail):
+        dict_fail = {}
+    count = dict_fail.get(S_KEY_COUNT, 0) + 1
+    was_open = dict_fail.get(S_KEY_OPEN, False)
+
+    # get the wait
+    is_open = count >= I_FAIL_OPEN
+    if is_open:
+        delay = F_FAIL_COOL
+    else:
+        delay = min(F_FAIL_BASE * 2 ** (count - 1), F_FAIL_MAX)
+    delay *= 1 - random.uniform(0, F_FAIL_JITTER)
+
+    # save it, with what we need to spot a resume or network change
+    dict_state[S_KEY_FAIL] = {
+        S_KEY_COUNT: count,
+        S_KEY_ERROR: str_error,
+        S_KEY_NEXT: now + delay,
+        S_KEY_OPEN: is_open,
+        S_KEY_SLEPT: _get_slept(),
+        S_KEY_BOOT: _get_boot(),
+        S_KEY_ROUTE: _get_route(),
+    }
+
+    return is_open and not was_open
+
+
+# ------------------------------------------------------------------------------
+# Note a successful check of the server
+# ------------------------------------------------------------------------------
+def record_success(dict_state):
+    """
+    Note a successful check of the server
+
+    Args:
+        dict_state: The state dict to update
+
+    Closes the circuit and forgets any failures.
+    """
+
+    dict_state.pop(S_KEY_FAIL, None)
+
+
+# ------------------------------------------------------------------------------
+# Get the time when the APOD after a given date should appear
+# ------------------------------------------------------------------------------
+def get_next_release(str_date):
+    """
+    Get the time when the APOD after a given date should appear
+
+    Args:
+        str_date: The "date" key of an APOD dict, like "2026-10-18"
+
+    Returns:
+        The timestamp of the next rollover, or 0 if the date is bad
+    """
+
+    # get date of last APOD
+    try:
+        last_date = datetime.strptime(str_date, S_DATE_FMT).date()
+    except (TypeError, ValueError):
+        return 0
+
+    # next APOD is at midnight of the following day, in NY
+    next_date = last_date + timedelta(days=1)
+    next_dt = datetime.combine(next_date, dt_time(0, 0), tzinfo=_get_tz())
+
+    return next_dt.timestamp()
+
+
+# ------------------------------------------------------------------------------
+# Get the current date where the APOD rolls over
+# ------------------------------------------------------------------------------
+def get_apod_today():
+    """
+    Get the current date where the APOD rolls over
+
+    Returns:
+        Today's date in US Eastern time, which is the newest date the server
+        knows about
+    """
+
+    return datetime.now(_get_tz()).date()
+
+
+# ------------------------------------------------------------------------------
+# Update the schedule after a check of the server
+# ------------------------------------------------------------------------------
+def update(dict_state, str_date=None, now=None):
+    """
+    Update the schedule after a check of the server
+
+    Args:
+        dict_state: The state dict to update
+        str_date: The date of the APOD the server sent, or None if we did not
+        get one (ie. a 304) (default: None)
+        now: The current time as a timestamp (default: time.time())
+
+    Returns:
+        The timestamp of the next check
+
+    If the date we have seen means the next APOD is still in the future, the
+    next check is set to just before it is expected. Otherwise we are in the
+    window and the APOD has not shown up yet, so we back off exponentially.
+    """
+
+    # get current time
+    if now is None:
+        now = time.time()
+
+    # get sched dict
+    dict_sched = dict_state.setdefault(S_KEY_SCHED, {})
+
+    # remember latest date we have seen
+    if str_date:
+        dict_sched[S_KEY_DATE] = str_date
+
+    # find when the next one is expected
+    release = get_next_release(dict_sched.get(S_KEY_DATE, ""))
+    start = release - F_LEAD
+
+    # not in the window yet
+    if now < start:
+        dict_sched[S_KEY_MISSES] = 0
+        dict_sched[S_KEY_NEXT] = start
+
+    # in the window but no new APOD, back off
+    else:
+        misses = dict_sched.get(S_KEY_MISSES, 0) + 1
+        delay = min(F_BACKOFF_BASE * 2 ** (misses - 1), F_BACKOFF_MAX)
+        dict_sched[S_KEY_MISSES] = misses
+        dict_sched[S_KEY_NEXT] = now + delay
+
+    return dict_sched[S_KEY_NEXT]
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Check if something happened that may have fixed the network
+# ------------------------------------------------------------------------------
+def _had_event(dict_fail):
+    """
+    Check if something happened that may have fixed the network
+
+    Args:
+        dict_fail: The fail dict from the state
+
+    Returns:
+        True if the machine has resumed from suspend or rebooted, or the
+        default route has changed (and there is one), since the failure was
+        recorded
+    """
+
+    # resumed
+    slept = _get_slept()
+    if slept - dict_fail.get(S_KEY_SLEPT, slept) > F_EVENT_MIN:
+        return True
+
+    # rebooted
+    boot = _get_boot()
+    if abs(boot - dict_fail.get(S_KEY_BOOT, boot)) > F_EVENT_MIN:
+        return True
+
+    # network changed
+    route = _get_route()
+    return bool(route) and route != dict_fail.get(S_KEY_ROUTE, route)
+
+
+# ------------------------------------------------------------------------------
+# Get the time the machine has spent suspended since it booted
+# ------------------------------------------------------------------------------
+def _get_slept():
+    """
+    Get the time the machine has spent suspended since it booted
+
+    Returns:
+        The number of seconds, or 0 if the os can't tell us
+
+    The boot time clock runs during suspend and the monotonic clock does
+    not, so the difference only grows when the machine sleeps.
+    """
+
+    try:
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - time.monotonic()
+    except (AttributeError, OSError):
+        return 0
+
+
+# ------------------------------------------------------------------------------
+# Get the time the machine booted
+# ------------------------------------------------------------------------------
+def _get_boot():
+    """
+    Get the time the machine booted
+
+    Returns:
+        The timestamp of the boot, or 0 if the os can't tell us
+    """
+
+    try:
+        return time.time() - time.clock_gettime(time.CLOCK_BOOTTIME)
+    except (AttributeError, OSError):
+        return 0
+
+
+# ------------------------------------------------------------------------------
+# Get the default network route
+# ------------------------------------------------------------------------------
+def _get_route():
+    """
+    Get the default network route
+
+    Returns:
+        A string naming the interface and gateway of each default route, or
+        "" if there is none (or the os can't tell us)
+    """
+
+    try:
+        l_lines = P_ROUTES.read_text(encoding="UTF-8").splitlines()[1:]
+    except OSError:
+        return ""
+
+    l_routes = []
+    for line in l_lines:
+        l_fields = line.split()
+        if len(l_fields) > 2 and l_fields[1] == S_ROUTE_DEFAULT:
+            l_routes.append(f"{l_fields[0]}:{l_fields[2]}")
+
+    return ",".join(sorted(l_routes))
+
+
+# ------------------------------------------------------------------------------
+# Get the time zone of the APOD rollover
+# ------------------------------------------------------------------------------
+def _get_tz():
+    """
+    Get the time zone of the APOD rollover
+
+    Returns:
+        A tzinfo for US Eastern time
+
+    Falls back to a fixed offset if the system has no tz database, which can
+    be off by an hour in the summer but is close enough to find the window.
+    """
+
+    # NB: deferred import, only needed once we have seen a date
+    # pylint: disable=import-outside-toplevel
+    try:
+        from zoneinfo import ZoneInfo
+
+        return ZoneInfo(S_TZ_APOD)
+    except (ImportError, LookupError, ValueError):
+        return timezone(timedelta(hours=I_TZ_APOD_FALLBACK))
+
+
+# -)
@@ -0,0 +1,452 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_screen.py                                 |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Find out how big the screen is, and how big an image needs to be for it
+
+The monitor layout is read from files, so finding it never has to wait on
+a subprocess, and works from cron (no display) and on Wayland (no xrandr):
+
+    ~/.config/monitors.xml: where GNOME keeps the layout for each set of
+                            monitors it has seen (size, position, primary)
+    /sys/class/drm:         which monitors are plugged in, and the size of
+                            each one's preferred mode
+
+The layout in monitors.xml for the monitors that are plugged in is used. If
+there is none, one monitor is its preferred mode, and more than one (where
+the layout matters) falls back to asking xrandr. The result is kept, in
+memory and in a cache file, under a key made from the mtime of monitors.xml
+and what the drm files say (which is what changes when a monitor is plugged
+in, their mtimes don't), so a run only parses or asks again when something
+changed.
+
+An image "covers" the screen if it can be scaled to the screen in the
+configured mode (fill or fit) without being scaled up, which is when a
+bigger version of the image would look no better.
+
+Monitors are (x, y, width, height) tuples, in pixels, with x and y the
+monitor's top left corner on the combined screen.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import json
+import os
+from pathlib import Path
+import re
+import subprocess
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# scale modes
+# NB: fill covers the whole screen and crops, fit shows the whole image and
+# leaves bars
+S_MODE_FILL = "fill"
+S_MODE_FIT = "fit"
+
+# how to ask xrandr
+L_CMD_XRANDR = ["xrandr", "--current"]
+F_XRANDR_TIMEOUT = 5.0
+
+# parse "HDMI-1 connected primary 1920x1080+0+0 (normal left..."
+# NB: a monitor that is connected but turned off has no geometry
+R_XRANDR_MONITOR = (
+    r"^\S+ connected (primary )?(\d+)x(\d+)\+(-?\d+)\+(-?\d+)"
+)
+
+# where GNOME keeps its monitor layouts
+S_FILE_MONITORS = "~/.config/monitors.xml"
+
+# where the kernel lists the monitors
+P_DIR_DRM = Path("/sys/class/drm")
+S_FILE_DRM_STATUS = "status"
+S_FILE_DRM_ENABLED = "enabled"
+S_FILE_DRM_MODES = "modes"
+S_DRM_CONNECTED = "connected"
+S_DRM_DISABLED = "disabled"
+
+# parse "card0-HDMI-A-1" and "1920x1080"
+R_DRM_CONNECTOR = r"^card\d+-(.+)$"
+R_DRM_MODE = r"^(\d+)x(\d+)"
+
+# the kernel's connector names that GNOME writes differently
+D_DRM_NAMES = {"HDMI-A": "HDMI"}
+
+# monitors.xml rotations that turn a monitor on its side
+L_XML_SIDEWAYS = ["left", "right"]
+S_XML_YES = "yes"
+
+# where a layout came from
+S_SRC_XML = "monitors.xml"
+S_SRC_DRM = "drm"
+S_SRC_XRANDR = "xrandr"
+
+# cache keys
+S_KEY_KEY = "key"
+S_KEY_MONITORS = "monitors"
+S_KEY_SOURCE = "source"
+S_KEY_TIME = "time"
+
+# how long to trust an answer from xrandr, in seconds
+# NB: with no files to watch, a change can only be found by asking again
+F_XRANDR_MAX_AGE = 60 * 60
+
+# ------------------------------------------------------------------------------
+# Globals
+# ------------------------------------------------------------------------------
+
+# the last layout found, so a daemon does not read the cache file every cycle
+_CACHE = {}
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Get the monitors that are turned on
+# ------------------------------------------------------------------------------
+def get_monitors(path_cache=None):
+    """
+    Get the monitors that are turned on
+
+    Args:
+        path_cache: The file to keep the layout in between runs, or None to
+        only keep it in memory (default: None)
+
+    Returns:
+        A list of monitors, primary first, or an empty list if they could
+        not be found (ie. no monitors, no display, and no xrandr)
+
+    Only a few small files are read and stat'ed, unless the key has changed
+    since the layout was last found.
+    """
+
+    # get the key
+    l_drm = _get_drm()
+    path_xml = Path(S_FILE_MONITORS).expanduser()
+    try:
+        stat = path_xml.stat()
+        l_xml = [stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        l_xml = []
+    key = [l_xml, [list(item) for item in l_drm]]
+
+    # already found
+    dict_cache = _CACHE
+    if not _is_fresh(dict_cache, key):
+        dict_cache = _load_cache(path_cache)
+    if _is_fresh(dict_cache, key):
+        _CACHE.update(dict_cache)
+        return [tuple(mon) for mon in dict_cache[S_KEY_MONITORS]]
+
+    # find them
+    source = S_SRC_XML
+    l_monitors = _read_xml(path_xml, l_drm) if l_xml else []
+    if not l_monitors and len(l_drm) == 1:
+        source = S_SRC_DRM
+        l_monitors = [(0, 0, l_drm[0][1], l_drm[0][2])]
+    if not l_monitors:
+        source = S_SRC_XRANDR
+        l_monitors = _read_xrandr()
+
+    # keep them
+    dict_cache = {
+        S_KEY_KEY: key,
+        S_KEY_MONITORS: l_monitors,
+        S_KEY_SOURCE: source,
+        S_KEY_TIME: time.time(),
+    }
+    _CACHE.clear()
+    _CACHE.update(dict_cache)
+    _save_cache(path_cache, dict_cache)
+
+    return l_monitors
+
+
+# ------------------------------------------------------------------------------
+# Check if an image is big enough for the screen
+# ------------------------------------------------------------------------------
+def covers(img_size, scr_size, mode=S_MODE_FILL):
+    """
+    Check if an image is big enough for the screen
+
+    Args:
+        img_size: The (width, height) of the image
+        scr_size: The (width, height) of the screen
+        mode: The scale mode, S_MODE_FILL or S_MODE_FIT (default:
+        S_MODE_FILL)
+
+    Returns:
+        True if the image does not need to be scaled up in this mode, False
+        if it does, or if either size is not known (ie. 0)
+    """
+
+    # can't tell
+    if not all(img_size) or not all(scr_size):
+        return False
+
+    # get the scale that the mode would use
+    # NB: fit = min, fill = max
+    rat_w = scr_size[0] / img_size[0]
+    rat_h = scr_size[1] / img_size[1]
+    scale = min(rat_w, rat_h) if mode == S_MODE_FIT else max(rat_w, rat_h)
+
+    return scale <= 1
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Get the monitors that the kernel says are plugged in
+# ------------------------------------------------------------------------------
+def _get_drm():
+    """
+    Get the monitors that the kernel says are plugged in
+
+    Returns:
+        A list of (name, width, height) of the preferred mode of each
+        monitor that is connected and not disabled, sorted by name, or an
+        empty list if there are none (or no /sys/class/drm)
+
+    The names are the ones GNOME uses, ie. "HDMI-1", not "HDMI-A-1".
+    """
+
+    l_drm = []
+    try:
+        l_dirs = sorted(P_DIR_DRM.iterdir())
+    except OSError:
+        return l_drm
+
+    for dir_conn in l_dirs:
+
+        # only connectors
+        res = re.match(R_DRM_CONNECTOR, dir_conn.name)
+        if not res:
+            continue
+
+        # only ones that are on
+        try:
+            status = (dir_conn / S_FILE_DRM_STATUS).read_text().strip()
+            enabled = (dir_conn / S_FILE_DRM_ENABLED).read_text().strip()
+            modes = (dir_conn / S_FILE_DRM_MODES).read_text()
+        except OSError:
+            continue
+        mode = re.match(R_DRM_MODE, modes)
+        if status != S_DRM_CONNECTED or enabled == S_DRM_DISABLED or not mode:
+            continue
+
+        # get the name GNOME uses
+        name = res.group(1)
+        for kernel, gnome in D_DRM_NAMES.items():
+            if name.startswith(kernel + "-"):
+                name = gnome + name[len(kernel) :]
+
+        # NB: the first mode is the preferred one
+        l_drm.append((name, int(mode.group(1)), int(mode.group(2))))
+
+    return l_drm
+
+
+# ------------------------------------------------------------------------------
+# Get the layout for the plugged in monitors from monitors.xml
+# ------------------------------------------------------------------------------
+def _read_xml(path_xml, l_drm):
+    """
+    Get the layout for the plugged in monitors from monitors.xml
+
+    Args:
+        path_xml: The path to monitors.xml
+        l_drm: The monitors that are plugged in, from _get_drm
+
+    Returns:
+        The list of monitors, primary first, or an empty list if there is no
+        layout for these monitors (or the file can't be read)
+
+    GNOME keeps one configuration for each set of monitors it has seen. The
+    one we want has the same monitors that are plugged in now, turned on or
+    off. If we can't tell what is plugged in, it is used if it is the only
+    one.
+    """
+
+    # NB: deferred import, only needed when the layout changed
+    # pylint: disable=import-outside-toplevel
+    import xml.etree.ElementTree as ET
+
+    try:
+        root = ET.parse(path_xml).getroot()
+    except (OSError, ET.ParseError):
+        return []
+
+    # find the configuration for these monitors
+    set_drm = {item[0] for item in l_drm}
+    l_configs = root.findall("configuration")
+    for config in l_configs:
+        set_conns = {
+            conn.text for conn in config.iter("connector") if conn.text
+        }
+        if set_conns == set_drm or (not set_drm and len(l_configs) == 1):
+            break
+    else:
+        return []
+
+    # get each monitor that is on
+    l_primary = []
+    l_others = []
+    for logical in config.findall("logicalmonitor"):
+        try:
+            x = int(logical.findtext("x", "0"))
+            y = int(logical.findtext("y", "0"))
+            w = int(logical.findtext("monitor/mode/width"))
+            h = int(logical.findtext("monitor/mode/height"))
+        except (TypeError, ValueError):
+            return []
+        if logical.findtext("transform/rotation") in L_XML_SIDEWAYS:
+            w, h = h, w
+        is_primary = logical.findtext("primary") == S_XML_YES
+        (l_primary if is_primary else l_others).append((x, y, w, h))
+
+    return l_primary + l_others
+
+
+# ------------------------------------------------------------------------------
+# Get the layout from xrandr
+# ------------------------------------------------------------------------------
+def _read_xrandr():
+    """
+    Get the layout from xrandr
+
+    Returns:
+        The list of monitors, primary first, or an empty list if xrandr
+        could not be run
+    """
+
+    l_primary = []
+    l_others = []
+    for res in re.finditer(R_XRANDR_MONITOR, _run_xrandr(), re.MULTILINE):
+        mon = (
+            int(res.group(4)),
+            int(res.group(5)),
+            int(res.group(2)),
+            int(res.group(3)),
+        )
+        (l_primary if res.group(1) else l_others).append(mon)
+
+    return l_primary + l_others
+
+
+# ------------------------------------------------------------------------------
+# Check if a cached layout can still be used
+# ------------------------------------------------------------------------------
+def _is_fresh(dict_cache, key):
+    """
+    Check if a cached layout can still be used
+
+    Args:
+        dict_cache: The cached layout, or None
+        key: The key for the monitors as they are now
+
+    Returns:
+        True if the layout was found with the same key, and (if it came
+        from xrandr) not too long ago
+    """
+
+    if not dict_cache or dict_cache.get(S_KEY_KEY) != key:
+        return False
+    if dict_cache.get(S_KEY_SOURCE) == S_SRC_XRANDR:
+        age = time.time() - dict_cache.get(S_KEY_TIME, 0)
+        return age < F_XRANDR_MAX_AGE
+    return True
+
+
+# ------------------------------------------------------------------------------
+# Load the cached layout
+# ------------------------------------------------------------------------------
+def _load_cache(path_cache):
+    """
+    Load the cached layout
+
+    Args:
+        path_cache: The cache file, or None
+
+    Returns:
+        The cached dict, or None if there is no (good) cache file
+    """
+
+    if not path_cache:
+        return None
+    try:
+        with open(path_cache, "r", encoding="UTF-8") as a_file:
+            dict_cache = json.load(a_file)
+    except (OSError, ValueError):
+        return None
+    return dict_cache if isinstance(dict_cache, dict) else None
+
+
+# ------------------------------------------------------------------------------
+# Save the layout to the cache file
+# ------------------------------------------------------------------------------
+def _save_cache(path_cache, dict_cache):
+    """
+    Save the layout to the cache file
+
+    Args:
+        path_cache: The cache file, or None
+        dict_cache: The dict to save
+
+    Errors are ignored, the cache only saves time.
+    """
+
+    if not path_cache:
+        return
+    path_cache = Path(path_cache)
+    path_tmp = path_cache.with_name(path_cache.name + ".tmp")
+    try:
+        path_cache.parent.mkdir(parents=True, exist_ok=True)
+        with open(path_tmp, "w", encoding="UTF-8") as a_file:
+            json.dump(dict_cache, a_file)
+        os.replace(path_tmp, path_cache)
+    except OSError:
+        pass
+
+
+# ------------------------------------------------------------------------------
+# Get the output of xrandr
+# ------------------------------------------------------------------------------
+def _run_xrandr():
+    """
+    Get the output of xrandr
+
+    Returns:
+        What xrandr printed, or "" if it could not be run
+    """
+
+    try:
+        res = subprocess.run(
+            L_CMD_XRANDR,
+            check=True,
+            capture_output=True,
+            text=True,
+            timeout=F_XRANDR_TIMEOUT,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+    return res.stdout
+
+
+# -)
@@ -0,0 +1,629 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: spaceoddity_store.py                                  |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+A content-addressed store of downloaded images
+
+Every image is kept once, under the SHA-256 of its bytes, which is computed
+while the download streams in. The wallpaper file and the archive files are
+hard links to the object in the store, so the same picture reached by two
+urls, or kept as both the wallpaper and an archive day, takes up space once.
+A small SQLite index maps each url to its hash, so "do we already have this
+url" is one lookup instead of a download.
+
+The index also keeps the size, age, and last use of each object, and the
+links that point to it, so the store can be kept under a size, count, or age
+limit by evicting objects without walking the dirs.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+# local imports
+import spaceoddity_http as H
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# layout of the store dir
+S_DIR_OBJECTS = "objects"
+S_DIR_TMP = "tmp"
+S_FILE_DB = "index.db"
+
+# NB: format params are url hash and ext
+S_FILE_TMP = "{}.{}"
+
+# length of the url hash used for temp file names
+I_URL_HASH_LEN = 16
+
+# how long an abandoned partial download is kept, in seconds
+F_TMP_MAX_AGE = 7 * 24 * 60 * 60
+
+# suffix of a link that is not in place yet
+S_EXT_LINK = ".link"
+
+# retention keys
+S_KEY_MAX_BYTES = "max_bytes"
+S_KEY_MAX_COUNT = "max_count"
+S_KEY_MAX_DAYS = "max_days"
+S_KEY_ORDER = "order"
+
+# eviction orders
+S_ORDER_LRU = "lru"
+S_ORDER_OLDEST = "oldest"
+
+# default retention (0 means no limit)
+D_RETENTION = {
+    S_KEY_MAX_BYTES: 2 * 1024 * 1024 * 1024,
+    S_KEY_MAX_COUNT: 0,
+    S_KEY_MAX_DAYS: 0,
+    S_KEY_ORDER: S_ORDER_LRU,
+}
+
+# seconds in a day
+I_DAY_SECS = 24 * 60 * 60
+
+# schema
+L_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS objects (
+        sha256 TEXT PRIMARY KEY,
+        ext TEXT,
+        size INTEGER,
+        added REAL,
+        used REAL,
+        pinned INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS urls (
+        url TEXT PRIMARY KEY,
+        sha256 TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS links (
+        path TEXT PRIMARY KEY,
+        sha256 TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS links_sha256 ON links (sha256)",
+    "CREATE INDEX IF NOT EXISTS urls_sha256 ON urls (sha256)",
+]
+
+# columns added after the first version of the objects table
+# NB: only added if missing, see _migrate
+D_MIGRATE = {
+    "used": "ALTER TABLE objects ADD COLUMN used REAL",
+    "pinned": (
+        "ALTER TABLE objects ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0"
+    ),
+}
+
+# statements
+S_SQL_LOOKUP = """
+    SELECT objects.sha256
+    FROM urls JOIN objects ON objects.sha256 = urls.sha256
+    WHERE urls.url = ?
+"""
+S_SQL_ADD_OBJ = """
+    INSERT OR IGNORE INTO objects (sha256, ext, size, added, used)
+    VALUES (?, ?, ?, ?, ?)
+"""
+S_SQL_ADD_URL = "INSERT OR REPLACE INTO urls (url, sha256) VALUES (?, ?)"
+S_SQL_ADD_LINK = "INSERT OR REPLACE INTO links (path, sha256) VALUES (?, ?)"
+S_SQL_GET_LINK = "SELECT sha256 FROM links WHERE path = ?"
+S_SQL_GET_LINKS = "SELECT path FROM links WHERE sha256 = ?"
+S_SQL_GET_EXT = "SELECT ext FROM objects WHERE sha256 = ?"
+S_SQL_TOUCH = "UPDATE objects SET used = ? WHERE sha256 = ?"
+S_SQL_PIN = "UPDATE objects SET pinned = ? WHERE sha256 = ?"
+S_SQL_TOTALS = "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects"
+# NB: format param is the column to order by, "used" or "added"
+S_SQL_CANDIDATES = """
+    SELECT sha256, size, COALESCE({0}, added, 0) AS ts
+    FROM objects
+    WHERE pinned = 0
+    ORDER BY ts
+"""
+S_SQL_COLUMNS = "PRAGMA table_info(objects)"
+L_SQL_DEL = [
+    "DELETE FROM objects WHERE sha256 = ?",
+    "DELETE FROM urls WHERE sha256 = ?",
+    "DELETE FROM links WHERE sha256 = ?",
+]
+
+# ------------------------------------------------------------------------------
+# Classes
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# A content-addressed store of downloaded images
+# ------------------------------------------------------------------------------
+class Store:
+    """
+    A content-addressed store of downloaded images
+
+    Methods:
+        lookup(url): Get the object for a url we already have
+        fetch(url, timeout): Get the object for a url, downloading if needed
+        add(path_src, sha256, ext, url): Move a finished file into the store
+        link(path_obj, path_dst, sha256): Make a file that points to an
+        object
+        get_path(sha256): Get the path of an object
+        get_ext(sha256): Get the extension of an object
+        set_pinned(sha256, pinned): Keep an object from being evicted
+        evict(dict_retention, l_keep): Remove objects over the limits
+        clean_tmp(max_age): Remove old partial downloads
+        close(): Close the index
+
+    The store may be used from several threads at once (ie. by a backfill),
+    the index is guarded by a lock. Errors from the index are raised as
+    sqlite3.Error, errors from the disk or network as OSError.
+    """
+
+    # --------------------------------------------------------------------------
+    # Instance methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the new object
+    # --------------------------------------------------------------------------
+    def __init__(self, dir_store):
+        """
+        Initialize the new object
+
+        Args:
+            dir_store: The dir of the store
+
+        Initializes a new instance of the class, setting the default values
+        of its properties, and any other code that needs to run to create a
+        new object.
+        """
+
+        # set props
+        self._dir_objects = dir_store / S_DIR_OBJECTS
+        self._dir_tmp = dir_store / S_DIR_TMP
+        self._lock = threading.Lock()
+
+        # make sure dirs exist
+        self._dir_objects.mkdir(parents=True, exist_ok=True)
+        self._dir_tmp.mkdir(parents=True, exist_ok=True)
+
+        # open index and make tables
+        # NB: the lock does the job of check_same_thread
+        self._conn = sqlite3.connect(
+            dir_store / S_FILE_DB, check_same_thread=False
+        )
+        with self._conn:
+            for stmt in L_SCHEMA:
+                self._conn.execute(stmt)
+            self._migrate()
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Get the object for a url we already have
+    # --------------------------------------------------------------------------
+    def lookup(self, url):
+        """
+        Get the object for a url we already have
+
+        Args:
+            url: The url of the image
+
+        Returns:
+            A tuple of (object path, hash), or None if the url is not in the
+            store
+        """
+
+        with self._lock:
+            row = self._conn.execute(S_SQL_LOOKUP, (url,)).fetchone()
+        if not row:
+            return None
+
+        # the file may have been removed behind our back
+        sha256 = row[0]
+        path_obj = self.get_path(sha256)
+        if not path_obj.exists():
+            self._remove(sha256)
+            return None
+
+        # note the use, for lru
+        with self._lock, self._conn:
+            self._conn.execute(S_SQL_TOUCH, (time.time(), sha256))
+
+        return (path_obj, sha256)
+
+    # --------------------------------------------------------------------------
+    # Get the object for a url, downloading if needed
+    # --------------------------------------------------------------------------
+    def fetch(self, url, timeout=H.F_TIMEOUT, max_bytes=0):
+        """
+        Get the object for a url, downloading if needed
+
+        Args:
+            url: The url of the image
+            timeout: The socket timeout (default: H.F_TIMEOUT)
+            max_bytes: The largest download to accept, in bytes, or 0 for
+            any size (default: 0)
+
+        Returns:
+            A tuple of (object path, hash, size of the download). The size
+            is 0 if the url was already in the store.
+
+        Raises:
+            OSError: If the download fails or is too large
+
+        The partial file is named after the url, so an interrupted download
+        is resumed by the next call for the same url.
+        """
+
+        # already have it
+        res = self.lookup(url)
+        if res:
+            return (res[0], res[1], 0)
+
+        # get temp paths
+        ext = get_ext(url)
+        url_hash = hashlib.sha1(url.encode()).hexdigest()[:I_URL_HASH_LEN]
+        path_tmp = self._dir_tmp / S_FILE_TMP.format(url_hash, ext)
+
+        # download and hash in one pass
+        hasher = hashlib.sha256()
+        size = H.download(
+            url, path_tmp, timeout=timeout, hasher=hasher, max_bytes=max_bytes
+        )
+        sha256 = hasher.hexdigest()
+
+        # move it in
+        path_obj = self.add(path_tmp, sha256, ext, url)
+        return (path_obj, sha256, size)
+
+    # --------------------------------------------------------------------------
+    # Move a finished file into the store
+    # --------------------------------------------------------------------------
+    def add(self, path_src, sha256, ext, url=None):
+        """
+        Move a finished file into the store
+
+        Args:
+            path_src: The file to move, which must be on the same file system
+            sha256: The hash of the file
+            ext: The extension of the file, without a dot
+            url: The url the file came from (default: None)
+
+        Returns:
+            The path of the object
+
+        If the store already has an object with this hash, path_src is
+        removed and the existing object is used.
+        """
+
+        path_obj = self.get_path(sha256)
+        size = path_src.stat().st_size
+
+        # move it in, or drop the duplicate
+        if path_obj.exists():
+            path_src.unlink()
+        else:
+            path_obj.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path_src, path_obj)
+
+        # index it
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(S_SQL_ADD_OBJ, (sha256, ext, size, now, now))
+            if url:
+                self._conn.execute(S_SQL_ADD_URL, (url, sha256))
+
+        return path_obj
+
+    # --------------------------------------------------------------------------
+    # Make a file that points to an object
+    # --------------------------------------------------------------------------
+    def link(self, path_obj, path_dst, sha256=None):
+        """
+        Make a file that points to an object
+
+        Args:
+            path_obj: The path of the object, or of a file made from it
+            path_dst: The path of the new file
+            sha256: The hash of the object, if path_obj is a file made from
+            it, ie. the image with a caption (default: None)
+
+        A hard link is used, so removing path_dst never removes the object,
+        and the object is not duplicated on disk. If the file system does
+        not allow hard links, the object is copied instead. An existing
+        path_dst is replaced in one atomic step. The link is recorded in the
+        index, so it can be removed along with the object, and so evict can
+        tell which object a path needs. A file made from an object is not the
+        object, so it is never removed with it.
+        """
+
+        # make the link next to its final name
+        path_dst.parent.mkdir(parents=True, exist_ok=True)
+        path_link = path_dst.with_name(path_dst.name + S_EXT_LINK)
+        path_link.unlink(missing_ok=True)
+        try:
+            os.link(path_obj, path_link)
+        except OSError:
+            shutil.copyfile(path_obj, path_link)
+
+        # move it into place
+        # NB: if path_dst is already a link to the same file, rename does
+        # nothing, and the new link is left behind
+        os.replace(path_link, path_dst)
+        path_link.unlink(missing_ok=True)
+
+        # NB: objects are named by their hash
+        with self._lock, self._conn:
+            self._conn.execute(
+                S_SQL_ADD_LINK, (str(path_dst), sha256 or path_obj.name)
+            )
+
+    # --------------------------------------------------------------------------
+    # Get the path of an object
+    # --------------------------------------------------------------------------
+    def get_path(self, sha256):
+        """
+        Get the path of an object
+
+        Args:
+            sha256: The hash of the object
+
+        Returns:
+            The path where the object is (or would be) kept
+
+        Objects are named by their hash alone, so the same bytes are one
+        object whatever the url called them. The links carry the extension.
+        Objects are spread over subdirs named after the first two characters
+        of the hash, so no one dir gets too big.
+        """
+
+        return self._dir_objects / sha256[:2] / sha256
+
+    # --------------------------------------------------------------------------
+    # Get the extension of an object
+    # --------------------------------------------------------------------------
+    def get_ext(self, sha256):
+        """
+        Get the extension of an object
+
+        Args:
+            sha256: The hash of the object
+
+        Returns:
+            The extension of the url it was downloaded from, or "" if it is
+            not in the store
+        """
+
+        with self._lock:
+            row = self._conn.execute(S_SQL_GET_EXT, (sha256,)).fetchone()
+        return row[0] if row else ""
+
+    # --------------------------------------------------------------------------
+    # Keep an object from being evicted
+    # --------------------------------------------------------------------------
+    def set_pinned(self, sha256, pinned=True):
+        """
+        Keep an object from being evicted
+
+        Args:
+            sha256: The hash of the object
+            pinned: True to pin the object, False to unpin it (default: True)
+
+        Returns:
+            True if the object is in the store, else False
+        """
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(S_SQL_PIN, (int(pinned), sha256))
+        return cursor.rowcount > 0
+
+    # --------------------------------------------------------------------------
+    # Remove objects over the limits
+    # --------------------------------------------------------------------------
+    def evict(self, dict_retention=None, l_keep=None):
+        """
+        Remove objects over the limits
+
+        Args:
+            dict_retention: The limits, keyed by S_KEY_MAX_BYTES,
+            S_KEY_MAX_COUNT, S_KEY_MAX_DAYS, and S_KEY_ORDER (default: None,
+            uses D_RETENTION). Missing keys use the defaults, and a limit of
+            0 is no limit.
+            l_keep: Paths of links whose objects must not be evicted, ie. the
+            current wallpaper (default: None)
+
+        Returns:
+            A list of the hashes that were evicted
+
+        Objects are evicted least recently used first (S_ORDER_LRU) or
+        oldest first (S_ORDER_OLDEST), until the store is under the byte and
+        count limits and nothing is older than the age limit. The age is
+        measured the same way as the order, so with S_ORDER_LRU it is the
+        time since last use. Pinned objects and the objects of l_keep are
+        skipped. An evicted object's links are removed too, since a hard link
+        would keep its bytes on disk.
+
+        The totals come from the index, and the candidates are read in order
+        only until the limits are met, so a store that is already under its
+        limits costs one small query.
+        """
+
+        # combine defaults and passed limits
+        dict_ret = dict(D_RETENTION)
+        if dict_retention:
+            dict_ret.update(dict_retention)
+        max_bytes = dict_ret[S_KEY_MAX_BYTES]
+        max_count = dict_ret[S_KEY_MAX_COUNT]
+        max_days = dict_ret[S_KEY_MAX_DAYS]
+        col = "added" if dict_ret[S_KEY_ORDER] == S_ORDER_OLDEST else "used"
+        cutoff = time.time() - max_days * I_DAY_SECS if max_days else None
+
+        with self._lock:
+
+            # find the objects we must keep
+            set_keep = set()
+            for a_path in l_keep or []:
+                row = self._conn.execute(
+                    S_SQL_GET_LINK, (str(a_path),)
+                ).fetchone()
+                if row:
+                    set_keep.add(row[0])
+
+            # get totals
+            count, total = self._conn.execute(S_SQL_TOTALS).fetchone()
+
+            # walk the candidates until we are under the limits
+            l_evict = []
+            cursor = self._conn.execute(S_SQL_CANDIDATES.format(col))
+            for sha256, size, ts in cursor:
+                if not (
+                    (max_bytes and total > max_bytes)
+                    or (max_count and count > max_count)
+                    or (cutoff and ts < cutoff)
+                ):
+                    break
+                if sha256 in set_keep:
+                    continue
+                l_evict.append(sha256)
+                total -= size or 0
+                count -= 1
+            cursor.close()
+
+        # remove them
+        for sha256 in l_evict:
+            self._remove(sha256)
+
+        return l_evict
+
+    # --------------------------------------------------------------------------
+    # Remove old partial downloads
+    # --------------------------------------------------------------------------
+    def clean_tmp(self, max_age=F_TMP_MAX_AGE):
+        """
+        Remove old partial downloads
+
+        Args:
+            max_age: The age in seconds after which a file is removed
+            (default: F_TMP_MAX_AGE)
+
+        Newer files are kept so their downloads can still be resumed.
+        """
+
+        now = time.time()
+        for a_path in self._dir_tmp.iterdir():
+            try:
+                if now - a_path.stat().st_mtime > max_age:
+                    a_path.unlink()
+            except OSError:
+                pass
+
+    # --------------------------------------------------------------------------
+    # Close the index
+    # --------------------------------------------------------------------------
+    def close(self):
+        """
+        Close the index
+        """
+
+        self._conn.close()
+
+    # --------------------------------------------------------------------------
+    # Private methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Add columns that are missing from an older index
+    # --------------------------------------------------------------------------
+    def _migrate(self):
+        """
+        Add columns that are missing from an older index
+        """
+
+        set_cols = {row[1] for row in self._conn.execute(S_SQL_COLUMNS)}
+        for col, stmt in D_MIGRATE.items():
+            if col not in set_cols:
+                self._conn.execute(stmt)
+
+    # --------------------------------------------------------------------------
+    # Remove an object, its links, and its index rows
+    # --------------------------------------------------------------------------
+    def _remove(self, sha256):
+        """
+        Remove an object, its links, and its index rows
+
+        Args:
+            sha256: The hash of the object
+
+        Files that are already gone are ignored. A link is only removed if
+        it is still the same file as the object, so a path that has since
+        been replaced by something else is left alone.
+        """
+
+        path_obj = self.get_path(sha256)
+
+        # remove links
+        with self._lock:
+            l_links = [
+                row[0]
+                for row in self._conn.execute(S_SQL_GET_LINKS, (sha256,))
+            ]
+        for str_path in l_links:
+            try:
+                if os.path.samefile(str_path, path_obj):
+                    os.unlink(str_path)
+            except FileNotFoundError:
+                pass
+
+        # remove object
+        path_obj.unlink(missing_ok=True)
+
+        # remove rows
+        with self._lock, self._conn:
+            for stmt in L_SQL_DEL:
+                self._conn.execute(stmt, (sha256,))
+
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Get the extension of the file a url points to
+# ------------------------------------------------------------------------------
+def get_ext(url):
+    """
+    Get the extension of the file a url points to
+
+    Args:
+        url: The url
+
+    Returns:
+        The extension, without a dot, in lower case
+    """
+
+    return url.rsplit("/", 1)[-1].rsplit(".", 1)[-1].lower()
+
+
+# -)
@@ -0,0 +1,262 @@
+#! /usr/bin/env python
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: bench_cycle.py                                        |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Time whole runs of the program against the mock server
+
+This script copies the program to a temp dir, points its config at
+tests/mock_apod.py, and runs it (Spaceoddity.main, as a normal run) through
+the kinds of cycles it sees in real life:
+
+    new image:  a new day with an image, which is downloaded and set
+    no change:  the same day again, which the server answers with a 304
+    video day:  a new day that is not an image, which is skipped
+    failure:    the server answers with an error
+
+Each round starts from a clean copy of the config and state. For each cycle
+it prints the wall time, the cpu time, the peak memory, the requests and bytes
+the server saw, and the exit code. If strace is installed, one more round is
+run under "strace -f -c" to count syscalls.
+
+gsettings and xrandr are replaced with stubs, so the desktop is not touched.
+
+foo@bar:~$ cd [path to project]
+foo@bar:~[path to project] python tests/bench_cycle.py [-h]
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import argparse
+from pathlib import Path
+import shutil
+import statistics
+import sys
+import tempfile
+
+# local imports
+import bench_util as BU
+import mock_apod as M
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# dirs the program makes, which each round starts without
+L_DIRS_CLEAN = ["archive", "store", "log"]
+
+# lines of output to show when a cycle fails
+I_TAIL = 5
+
+# default number of rounds
+I_ROUNDS = 5
+
+# the cycles, in the order they run each round
+# NB: (name, day the server sends, error status, expected exit code)
+L_CYCLES = [
+    ("new image", "2026-10-17", 0, 0),
+    ("no change", "2026-10-17", 0, 0),
+    ("video day", "2026-10-16", 0, 0),
+    ("failure", "2026-10-16", 503, 255),
+]
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Run the benchmark
+# ------------------------------------------------------------------------------
+def main():
+    """
+    Run the benchmark
+
+    Starts the server, runs the rounds, and prints the results. Exits with 1
+    if any cycle did not exit the way it should.
+    """
+
+    # get settings
+    parser = argparse.ArgumentParser(
+        description="Time whole runs against the mock server"
+    )
+    parser.add_argument(
+        "rounds", type=int, nargs="?", default=I_ROUNDS, help="rounds"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds per response"
+    )
+    parser.add_argument(
+        "--bandwidth", type=int, default=0, help="bytes per second"
+    )
+    args = parser.parse_args()
+
+    # start the server
+    server = M.MockServer()
+    server.latency = args.latency
+    server.bandwidth = args.bandwidth
+    server.start()
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+
+        # make the copy and the stubs
+        dir_tmp = Path(dir_tmp)
+        dir_prj = BU.make_copy(dir_tmp)
+        path_cfg = dir_prj / BU.S_FILE_CFG
+        cfg_clean = BU.make_config(path_cfg, server.get_api_url())
+        env = BU.make_env(dir_tmp)
+
+        # time the rounds
+        dict_results = {cycle[0]: [] for cycle in L_CYCLES}
+        ok = True
+        for _i in range(args.rounds):
+            ok = _run_round(
+                server, dir_prj, cfg_clean, env, None, dict_results
+            ) and ok
+
+        # count syscalls
+        dict_calls = {}
+        path_strace = shutil.which("strace")
+        if path_strace:
+            path_out = dir_tmp / "strace.txt"
+            l_pre = [path_strace, "-f", "-c", "-o", str(path_out)]
+            dict_strace = {cycle[0]: [] for cycle in L_CYCLES}
+            _run_round(
+                server, dir_prj, cfg_clean, env, l_pre, dict_strace, path_out
+            )
+            for name, l_res in dict_strace.items():
+                dict_calls[name] = l_res[0]["calls"]
+
+    server.shutdown()
+    server.server_close()
+
+    # show results
+    print(
+        f"{'cycle':10} {'wall ms':>9} {'cpu ms':>8} {'max rss':>9} "
+        f"{'reqs':>5} {'bytes':>9} {'syscalls':>9} {'exit':>5}"
+    )
+    for name, l_res in dict_results.items():
+        calls = dict_calls.get(name)
+        print(
+            f"{name:10} "
+            f"{statistics.median(r['wall'] for r in l_res) * 1000:9.1f} "
+            f"{statistics.median(r['cpu'] for r in l_res) * 1000:8.1f} "
+            f"{max(r['rss'] for r in l_res) // 1024:6d} MB "
+            f"{l_res[-1]['reqs']:5d} "
+            f"{l_res[-1]['bytes']:9d} "
+            f"{calls if calls is not None else '-':>9} "
+            f"{l_res[-1]['exit']:5d}"
+        )
+    if not path_strace:
+        print("(install strace to count syscalls)")
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Run each cycle once, from a clean state
+# ------------------------------------------------------------------------------
+def _run_round(
+    server, dir_prj, cfg_clean, env, l_pre, dict_results, path_strace=None
+):
+    """
+    Run each cycle once, from a clean state
+
+    Args:
+        server: The mock server
+        dir_prj: The copy of the program
+        cfg_clean: The config to start with
+        env: The env to run in
+        l_pre: The command to run the program under, or None
+        dict_results: The dict of lists to add each cycle's results to
+        path_strace: The file strace writes its counts to (default: None)
+
+    Returns:
+        True if every cycle exited the way it should
+    """
+
+    # start clean
+    (dir_prj / BU.S_FILE_CFG).write_text(cfg_clean, encoding="UTF-8")
+    for path_old in (dir_prj / "conf").glob("*"):
+        if path_old.name != Path(BU.S_FILE_CFG).name:
+            path_old.unlink()
+    for name in L_DIRS_CLEAN:
+        shutil.rmtree(dir_prj / name, ignore_errors=True)
+    for name in BU.L_DIRS_MAKE:
+        (dir_prj / name).mkdir()
+
+    ok = True
+    for name, today, error, code in L_CYCLES:
+
+        # set up the server
+        server.today = today
+        server.error = error
+        server.get_stats()
+
+        # run it
+        res = BU.run_one(
+            (l_pre or []) + [sys.executable, str(dir_prj / BU.S_FILE_MAIN)],
+            env,
+        )
+        res["reqs"], res["bytes"] = server.get_stats()
+        if path_strace:
+            res["calls"] = _get_calls(path_strace)
+        dict_results[name].append(res)
+
+        # check it
+        if res["exit"] != code:
+            print(f"FAIL: {name} exited with {res['exit']}, not {code}")
+            print("\n".join(res["out"].strip().split("\n")[-I_TAIL:]))
+            ok = False
+
+    return ok
+
+
+# ------------------------------------------------------------------------------
+# Get the total syscall count from strace's summary
+# ------------------------------------------------------------------------------
+def _get_calls(path_strace):
+    """
+    Get the total syscall count from strace's summary
+
+    Args:
+        path_strace: The file strace wrote its counts to
+
+    Returns:
+        The number of syscalls, or None if the file could not be read
+    """
+
+    # the last line is "100.00  secs  usecs/call  calls  [errors]  total"
+    try:
+        lines = path_strace.read_text(encoding="UTF-8").split("\n")
+    except OSError:
+        return None
+    for line in reversed(lines):
+        parts = line.split()
+        if parts and parts[-1] == "total":
+            return int(parts[3])
+    return None
+
+
+# ------------------------------------------------------------------------------
+# Code to run when called from command line
+# ------------------------------------------------------------------------------
+if __name__ == "__main__":
+
+    # Code to run when called from command line
+    main()
+
+# -)
@@ -0,0 +1,183 @@
+#! /usr/bin/env python
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: bench_launch.py                                       |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Compare the startup cost of the old and new launchers
+
+The old launcher ran "cd; . activate; cd; spaceoddity.py" through a shell. The
+new one execs the venv's python directly. This script builds a throwaway
+install (a venv and a main file that exits at once) under a temp $HOME, then
+times both launch paths so only the launcher overhead is measured.
+
+foo@bar:~$ cd [path to project]
+foo@bar:~[path to project] python tests/bench_launch.py [runs]
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the launcher under test
+P_LAUNCHER = Path(__file__).parents[1].resolve() / "bin/spaceoddity.py"
+
+# default number of runs
+I_RUNS = 20
+
+# what the old launcher did
+# NB: format params are inst dir, cwd, and inst dir
+S_CMD_OLD = (
+    "cd {};"
+    ". .venv-spaceoddity/bin/activate;"
+    "cd {};"
+    "{}/src/spaceoddity.py"
+)
+
+# a main file that does nothing, so we only time the launch
+S_MAIN_STUB = "#! /usr/bin/env python\nimport sys\nsys.exit(0)\n"
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Run the benchmark
+# ------------------------------------------------------------------------------
+def main():
+    """
+    Run the benchmark
+
+    Builds the fake install, times each launch path, and prints the results.
+    """
+
+    # get number of runs
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else I_RUNS
+
+    with tempfile.TemporaryDirectory() as dir_home:
+
+        # make the fake install
+        dir_inst = Path(dir_home) / ".local/share/spaceoddity"
+        (dir_inst / "src").mkdir(parents=True)
+        path_main = dir_inst / "src/spaceoddity.py"
+        path_main.write_text(S_MAIN_STUB, encoding="UTF-8")
+        path_main.chmod(0o755)
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "venv",
+                "--without-pip",
+                str(dir_inst / ".venv-spaceoddity"),
+            ],
+            check=True,
+        )
+
+        # point the launcher at the fake install
+        env = dict(os.environ, HOME=dir_home)
+
+        # the old way, emulated as a python launcher that runs a shell
+        cmd_old = S_CMD_OLD.format(dir_inst, Path.cwd(), dir_inst)
+        args_old = [
+            sys.executable,
+            "-c",
+            "import subprocess,sys;"
+            "subprocess.run(sys.argv[1], shell=True, check=True)",
+            cmd_old,
+        ]
+
+        # the new way
+        args_new = [sys.executable, str(P_LAUNCHER)]
+
+        # time them
+        times_old = _time_runs(args_old, env, runs)
+        times_new = _time_runs(args_new, env, runs)
+
+    # show results
+    _report("old (shell + activate)", times_old)
+    _report("new (execv)", times_new)
+    speedup = statistics.median(times_old) / statistics.median(times_new)
+    print(f"median speedup: {speedup:.2f}x")
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Time a command several times
+# ------------------------------------------------------------------------------
+def _time_runs(args, env, runs):
+    """
+    Time a command several times
+
+    Args:
+        args: The command to run
+        env: The environment to run it in
+        runs: How many times to run it
+
+    Returns:
+        A list of wall times, in seconds
+    """
+
+    # warm up the page cache
+    subprocess.run(args, env=env, check=True)
+
+    # time each run
+    times = []
+    for _i in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, env=env, check=True)
+        times.append(time.perf_counter() - start)
+
+    return times
+
+
+# ------------------------------------------------------------------------------
+# Print the stats for a list of times
+# ------------------------------------------------------------------------------
+def _report(name, times):
+    """
+    Print the stats for a list of times
+
+    Args:
+        name: The name of the launch path
+        times: The list of wall times, in seconds
+    """
+
+    print(
+        f"{name:24} "
+        f"median {statistics.median(times) * 1000:7.1f} ms  "
+        f"min {min(times) * 1000:7.1f} ms  "
+        f"max {max(times) * 1000:7.1f} ms"
+    )
+
+
+# ------------------------------------------------------------------------------
+# Code to run when called from command line
+# ------------------------------------------------------------------------------
+if __name__ == "__main__":
+
+    # Code to run when called from command line
+    main()
+
+# -)
@@ -0,0 +1,332 @@
+#! /usr/bin/env python
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: bench_render.py                                       |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Compare reduced decoding of large images against a full decode
+
+This script makes a corpus of large images (or uses the ones you give it),
+and renders each one to the screen size two ways:
+
+    naive:  decode at full size, then resize with LANCZOS (as in
+            tests/test.py)
+    reduce: spaceoddity_render.open_image (JPEG draft and reduce to
+            between the size and twice it) and spaceoddity_render.render
+
+Each render runs in its own process, so the peak memory of one does not hide
+the other's. For each image it prints the time and peak memory of both
+paths, and how far apart the results are (mean difference per channel, out
+of 255).
+
+foo@bar:~$ cd [path to project]
+foo@bar:~[path to project] python tests/bench_render.py [-h] [paths ...]
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import argparse
+import os
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# where the modules under test live
+P_DIR_SRC = Path(__file__).parents[1].resolve() / "src"
+
+# the paths to compare
+S_PATH_NAIVE = "naive"
+S_PATH_REDUCE = "reduce"
+L_PATHS = [S_PATH_NAIVE, S_PATH_REDUCE]
+
+# the corpus to make if no images are given
+# NB: (name, width, height)
+L_CORPUS = [
+    ("4k.jpg", 4000, 3000),
+    ("6k.jpg", 6000, 4000),
+    ("10k.jpg", 10000, 6000),
+    ("tall.jpg", 4000, 9000),
+    ("6k.png", 6000, 4000),
+]
+
+# quality of the corpus jpegs
+I_JPEG_QUALITY = 90
+
+# default screen size
+S_SIZE = "1920x1080"
+
+# number of runs to take the best time of
+I_RUNS = 3
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Run the benchmark
+# ------------------------------------------------------------------------------
+def main():
+    """
+    Run the benchmark
+
+    Makes the corpus if needed, renders each image both ways, and prints the
+    results.
+    """
+
+    # get settings
+    parser = argparse.ArgumentParser(
+        description="Compare reduced decoding against a full decode"
+    )
+    parser.add_argument("paths", nargs="*", help="images (default: corpus)")
+    parser.add_argument(
+        "--size", default=S_SIZE, help=f"screen size (default: {S_SIZE})"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=I_RUNS, help="runs per image"
+    )
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    parser.add_argument("--corpus", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # NB: the children do one thing and exit
+    if args.child:
+        _render_one(*args.child, args.size)
+        return
+    if args.corpus:
+        _make_corpus(Path(args.corpus))
+        return
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        dir_tmp = Path(dir_tmp)
+
+        # get the images
+        # NB: the corpus is made in a child, since a child's peak memory
+        # starts at its parent's
+        l_images = [Path(path) for path in args.paths]
+        if not l_images:
+            print("making corpus...")
+            subprocess.run(
+                [sys.executable, __file__, "--corpus", str(dir_tmp)],
+                check=True,
+            )
+            l_images = [dir_tmp / item[0] for item in L_CORPUS]
+
+        # show results
+        print(
+            f"screen {args.size}\n"
+            f"{'image':12} {'size':>11} "
+            f"{'naive ms':>9} {'naive rss':>10} "
+            f"{'reduce ms':>10} {'reduce rss':>11} {'diff':>5}"
+        )
+        for path in l_images:
+            dict_res = {}
+            for name in L_PATHS:
+                path_out = dir_tmp / f"out_{name}.png"
+                l_res = [
+                    _run_child(name, path, path_out, args.size)
+                    for _i in range(args.runs)
+                ]
+                dict_res[name] = (
+                    min(res[0] for res in l_res),
+                    max(res[1] for res in l_res),
+                    path_out,
+                )
+            naive = dict_res[S_PATH_NAIVE]
+            reduce = dict_res[S_PATH_REDUCE]
+            print(
+                f"{path.name[:12]:12} {_get_size(path):>11} "
+                f"{naive[0] * 1000:9.1f} {naive[1] // 1024:7d} MB "
+                f"{reduce[0] * 1000:10.1f} {reduce[1] // 1024:8d} MB "
+                f"{_get_diff(naive[2], reduce[2]):5.2f}"
+            )
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Make a corpus of large images
+# ------------------------------------------------------------------------------
+def _make_corpus(dir_out):
+    """
+    Make a corpus of large images
+
+    Args:
+        dir_out: The dir to put the images in
+
+    The images are noise over gradients, so there is fine detail to lose
+    and the files are about as hard to decode as a photo.
+    """
+
+    # NB: deferred import, so only the child pays for it
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image
+
+    for name, width, height in L_CORPUS:
+        size = (width, height)
+        img = Image.merge(
+            "RGB",
+            (
+                Image.linear_gradient("L").resize(size),
+                Image.effect_noise(size, 64),
+                Image.radial_gradient("L").resize(size),
+            ),
+        )
+        path = dir_out / name
+        if path.suffix == ".png":
+            img.save(path, "PNG", compress_level=1)
+        else:
+            img.save(path, "JPEG", quality=I_JPEG_QUALITY)
+
+
+# ------------------------------------------------------------------------------
+# Render one image in a child process
+# ------------------------------------------------------------------------------
+def _run_child(name, path, path_out, size):
+    """
+    Render one image in a child process
+
+    Args:
+        name: The path to use, S_PATH_NAIVE or S_PATH_REDUCE
+        path: The image to render
+        path_out: Where to save the result
+        size: The screen size, as "WxH"
+
+    Returns:
+        A tuple of (seconds, peak rss in KB)
+    """
+
+    args = [
+        sys.executable,
+        __file__,
+        "--size",
+        size,
+        "--child",
+        name,
+        str(path),
+        str(path_out),
+    ]
+
+    # NB: wait4 gives us the child's own rusage
+    with subprocess.Popen(args, stdout=subprocess.PIPE, text=True) as proc:
+        out = proc.stdout.read()
+        _pid, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        print(f"FAIL: {name} {path}")
+        sys.exit(1)
+
+    return (float(out), rusage.ru_maxrss)
+
+
+# ------------------------------------------------------------------------------
+# Render one image and print the time it took
+# ------------------------------------------------------------------------------
+def _render_one(name, path, path_out, size):
+    """
+    Render one image and print the time it took
+
+    Args:
+        name: The path to use, S_PATH_NAIVE or S_PATH_REDUCE
+        path: The image to render
+        path_out: Where to save the result
+        size: The screen size, as "WxH"
+    """
+
+    # NB: deferred import, so only the child pays for it
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image, ImageOps
+
+    sys.path.insert(0, str(P_DIR_SRC))
+    import spaceoddity_render as R
+
+    scr_w, scr_h = (int(item) for item in size.split("x"))
+    l_monitors = [(0, 0, scr_w, scr_h)]
+
+    # time only the render, not the imports or the save
+    start = time.perf_counter()
+    if name == S_PATH_NAIVE:
+        with Image.open(path) as img_file:
+            img = ImageOps.exif_transpose(img_file).convert("RGB")
+        img = R.render(img, l_monitors)
+    else:
+        img = R.open_image(path, l_monitors)
+        img = R.render(img, l_monitors)
+    elapsed = time.perf_counter() - start
+
+    img.save(path_out, "PNG", compress_level=1)
+    print(elapsed)
+
+
+# ------------------------------------------------------------------------------
+# Get the size of an image, as "WxH"
+# ------------------------------------------------------------------------------
+def _get_size(path):
+    """
+    Get the size of an image, as "WxH"
+
+    Args:
+        path: The image
+
+    Returns:
+        The size, as "WxH"
+    """
+
+    # NB: deferred import, so the parent stays small
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image
+
+    with Image.open(path) as img:
+        return f"{img.size[0]}x{img.size[1]}"
+
+
+# ------------------------------------------------------------------------------
+# Get the mean difference between two images
+# ------------------------------------------------------------------------------
+def _get_diff(path_a, path_b):
+    """
+    Get the mean difference between two images
+
+    Args:
+        path_a: The first image
+        path_b: The second image
+
+    Returns:
+        The mean difference per channel, out of 255
+    """
+
+    # NB: deferred import, so the parent stays small
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image, ImageChops, ImageStat
+
+    with Image.open(path_a) as img_a, Image.open(path_b) as img_b:
+        diff = ImageChops.difference(img_a, img_b)
+        l_mean = ImageStat.Stat(diff).mean
+    return sum(l_mean) / len(l_mean)
+
+
+# ------------------------------------------------------------------------------
+# Code to run when called from command line
+# ------------------------------------------------------------------------------
+if __name__ == "__main__":
+
+    # Code to run when called from command line
+    main()
+
+# -)
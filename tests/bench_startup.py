@@ -0,0 +1,268 @@
+#! /usr/bin/env python
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: bench_startup.py                                      |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Check that startup stays cheap
+
+This script imports the main module under "python -X importtime", makes sure
+that none of the modules that should be deferred (crontab, Pillow, the
+network, sqlite3, ...) were loaded, and checks the import time against a
+budget.
+
+Then it runs a copy of the program against tests/mock_apod.py (see
+tests/bench_cycle.py), once to get an image and then again with nothing new,
+which the server answers with a 304. This is what almost every real run
+looks like. It checks that the no-change run does not load the modules that
+only a new image needs, and checks how much longer it takes than python needs
+to start and load the network code against a budget.
+
+It prints the slowest imports and exits with 1 if any check fails, so it can
+be used as a regression test.
+
+foo@bar:~$ cd [path to project]
+foo@bar:~[path to project] python tests/bench_startup.py
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+from pathlib import Path
+import re
+import subprocess
+import sys
+import tempfile
+
+# local imports
+import bench_util as BU
+import mock_apod as M
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# where the main module lives
+P_DIR_SRC = Path(__file__).parents[1].resolve() / "src"
+
+# module to check
+S_MOD_MAIN = "spaceoddity"
+
+# modules that must not be loaded by a run that gets a 304
+L_DEFERRED_RUN = [
+    "crontab",
+    "PIL",
+    "sqlite3",
+    "spaceoddity_archive",
+    "spaceoddity_backfill",
+    "spaceoddity_caption",
+    "spaceoddity_store",
+]
+
+# modules that must not be loaded at startup
+L_DEFERRED = L_DEFERRED_RUN + ["http", "ssl", "spaceoddity_http"]
+
+# the day the server sends for both runs
+S_DAY = "2026-10-17"
+
+# budgets, in ms
+# NB: the run budget is on top of the floor, which is how long python takes
+# to start and import the network code that any run that talks to the server
+# must load, so the check means the same thing on a slow machine
+F_BUDGET_IMPORT = 100.0
+F_BUDGET_RUN = 150.0
+
+# what the floor is made of
+S_CMD_FLOOR = "import http.client"
+
+# how many of the slowest imports to show
+I_TOP = 10
+
+# parse "import time:       123 |       456 | name"
+R_LINE = r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)"
+
+# number of runs to take the best of
+I_RUNS = 10
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Run the checks
+# ------------------------------------------------------------------------------
+def main():
+    """
+    Run the checks
+
+    Prints a report and exits with 0 if all checks passed, 1 if not.
+    """
+
+    # assume the best
+    ok = True
+
+    # --------------------------------------------------------------------------
+    # import time
+
+    l_imports = _get_imports(
+        [sys.executable, "-X", "importtime", "-c", f"import {S_MOD_MAIN}"],
+        P_DIR_SRC,
+    )
+
+    # show slowest
+    print(f"slowest imports (self, cumulative) importing {S_MOD_MAIN}:")
+    for item in sorted(l_imports, key=lambda x: x[0], reverse=True)[:I_TOP]:
+        print(f"  {item[0] / 1000:7.1f} ms {item[1] / 1000:7.1f} ms  {item[2]}")
+
+    # check for deferred mods
+    ok = _check_deferred(l_imports, L_DEFERRED, "at startup") and ok
+
+    # check total (cumulative time of the main module itself)
+    total = sum(item[1] for item in l_imports if item[2] == S_MOD_MAIN) / 1000
+    print(f"import {S_MOD_MAIN}: {total:.1f} ms (budget {F_BUDGET_IMPORT} ms)")
+    if total > F_BUDGET_IMPORT:
+        print("FAIL: import time over budget")
+        ok = False
+
+    # --------------------------------------------------------------------------
+    # wall time of a run that does no work
+
+    # start the server
+    server = M.MockServer()
+    server.today = S_DAY
+    server.start()
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+
+        # make the copy and the stubs
+        dir_tmp = Path(dir_tmp)
+        dir_prj = BU.make_copy(dir_tmp)
+        path_cfg = dir_prj / BU.S_FILE_CFG
+        path_cfg.write_text(
+            BU.make_config(path_cfg, server.get_api_url()),
+            encoding="UTF-8",
+        )
+        env = BU.make_env(dir_tmp)
+        l_args = [sys.executable, str(dir_prj / BU.S_FILE_MAIN)]
+
+        # get today's image, so the next runs have nothing to do
+        res = BU.run_one(l_args, env)
+        if res["exit"]:
+            print(res["out"])
+            sys.exit(1)
+
+        # see what a no-change run loads
+        l_imports = _get_imports(
+            [sys.executable, "-X", "importtime"] + l_args[1:], None, env
+        )
+        ok = _check_deferred(l_imports, L_DEFERRED_RUN, "by a 304 run") and ok
+
+        # time it, and the floor
+        best = min(BU.run_one(l_args, env)["wall"] for _i in range(I_RUNS))
+        floor = min(
+            BU.run_one([sys.executable, "-c", S_CMD_FLOOR], env)["wall"]
+            for _i in range(I_RUNS)
+        )
+
+    server.shutdown()
+    server.server_close()
+
+    best *= 1000
+    floor *= 1000
+    print(
+        f"no-change run: {best:.1f} ms, {best - floor:.1f} ms over the floor "
+        f"of {floor:.1f} ms (budget {F_BUDGET_RUN} ms)"
+    )
+    if best - floor > F_BUDGET_RUN:
+        print("FAIL: no-change run over budget")
+        ok = False
+
+    # --------------------------------------------------------------------------
+    # done
+
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+# ------------------------------------------------------------------------------
+# Private functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Run a command under "python -X importtime" and get its imports
+# ------------------------------------------------------------------------------
+def _get_imports(args, cwd, env=None):
+    """
+    Run a command under "python -X importtime" and get its imports
+
+    Args:
+        args: The command to run, which must include "-X importtime"
+        cwd: The dir to run it in
+        env: The env to run it in (default: None, uses ours)
+
+    Returns:
+        A list of (self, cumulative, name) for each import, with times in us
+    """
+
+    cp = subprocess.run(
+        args, cwd=cwd, env=env, capture_output=True, text=True, check=False
+    )
+    if cp.returncode:
+        print(cp.stdout, cp.stderr)
+        sys.exit(1)
+
+    # get each import as (self, cumulative, name)
+    l_imports = []
+    for line in cp.stderr.splitlines():
+        res = re.match(R_LINE, line)
+        if res:
+            l_imports.append(
+                (int(res.group(1)), int(res.group(2)), res.group(3))
+            )
+
+    return l_imports
+
+
+# ------------------------------------------------------------------------------
+# Make sure none of the deferred modules were imported
+# ------------------------------------------------------------------------------
+def _check_deferred(l_imports, l_deferred, str_when):
+    """
+    Make sure none of the deferred modules were imported
+
+    Args:
+        l_imports: The imports, from _get_imports
+        l_deferred: The names of the modules (or packages) to look for
+        str_when: What was run, for the report
+
+    Returns:
+        True if none of them were imported
+    """
+
+    ok = True
+    for item in l_imports:
+        root = item[2].split(".")[0]
+        if root in l_deferred:
+            print(f"FAIL: {item[2]} is imported {str_when}")
+            ok = False
+
+    return ok
+
+
+# ------------------------------------------------------------------------------
+# Code to run when called from command line
+# ------------------------------------------------------------------------------
+if __name__ == "__main__":
+
+    # Code to run when called from command line
+    main()
+
+# -)
@@ -0,0 +1,180 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: bench_util.py                                         |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+Shared setup for the benchmarks that run a copy of the program
+
+The benchmarks that run the whole program (tests/bench_cycle.py,
+tests/bench_startup.py) do it the same way: copy the program to a temp dir,
+point its config at tests/mock_apod.py, replace the desktop commands with
+stubs, keep $HOME away from the real one, and time each run as a child
+process. This module does those parts, so they stay the same in each.
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import json
+import os
+from pathlib import Path
+import shutil
+import subprocess
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the program under test
+P_DIR_PRJ = Path(__file__).parents[1].resolve()
+L_DIRS_COPY = ["src", "conf", "i18n"]
+S_FILE_MAIN = "src/spaceoddity.py"
+S_FILE_CFG = "conf/spaceoddity.json"
+
+# dirs the installer makes
+L_DIRS_MAKE = ["log"]
+
+# stubs for desktop commands
+D_STUBS = {
+    "gsettings": "#! /bin/sh\nexit 0\n",
+    "xrandr": (
+        "#! /bin/sh\n"
+        "echo 'Screen 0: minimum 8 x 8, current 1920 x 1080, "
+        "maximum 32767 x 32767'\n"
+        "echo 'HDMI-1 connected primary 1920x1080+0+0 (normal left "
+        "inverted right x axis y axis) 527mm x 296mm'\n"
+    ),
+}
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Copy the program to a temp dir
+# ------------------------------------------------------------------------------
+def make_copy(dir_tmp):
+    """
+    Copy the program to a temp dir
+
+    Args:
+        dir_tmp: The temp dir to put the copy in
+
+    Returns:
+        The path to the copy
+    """
+
+    dir_prj = dir_tmp / "spaceoddity"
+    for name in L_DIRS_COPY:
+        if (P_DIR_PRJ / name).exists():
+            shutil.copytree(
+                P_DIR_PRJ / name,
+                dir_prj / name,
+                ignore=shutil.ignore_patterns("__pycache__"),
+            )
+    for name in L_DIRS_MAKE:
+        (dir_prj / name).mkdir(exist_ok=True)
+    return dir_prj
+
+
+# ------------------------------------------------------------------------------
+# Point the copy's config at the server
+# ------------------------------------------------------------------------------
+def make_config(path_cfg, api_url):
+    """
+    Point the copy's config at the server
+
+    Args:
+        path_cfg: The path to the copy's config
+        api_url: The server's api url
+
+    Returns:
+        The config file's text, to start each run with
+    """
+
+    with open(path_cfg, "r", encoding="UTF-8") as a_file:
+        dict_cfg = json.load(a_file)
+    dict_cfg["api_url"] = api_url
+    return json.dumps(dict_cfg, indent=4)
+
+
+# ------------------------------------------------------------------------------
+# Make the environment to run the program in
+# ------------------------------------------------------------------------------
+def make_env(dir_tmp):
+    """
+    Make the environment to run the program in
+
+    Args:
+        dir_tmp: The temp dir to put the stubs and $HOME in
+
+    Returns:
+        The env dict
+    """
+
+    # add the stubs
+    dir_bin = dir_tmp / "bin"
+    dir_bin.mkdir()
+    for name, text in D_STUBS.items():
+        path_stub = dir_bin / name
+        path_stub.write_text(text, encoding="UTF-8")
+        path_stub.chmod(0o755)
+
+    # keep away from the real home
+    dir_home = dir_tmp / "home"
+    dir_home.mkdir()
+    return dict(
+        os.environ,
+        HOME=str(dir_home),
+        PATH=f"{dir_bin}{os.pathsep}{os.environ.get('PATH', '')}",
+    )
+
+
+# ------------------------------------------------------------------------------
+# Run the program once
+# ------------------------------------------------------------------------------
+def run_one(args, env):
+    """
+    Run the program once
+
+    Args:
+        args: The command to run
+        env: The env to run it in
+
+    Returns:
+        A dict of wall, cpu (user + sys, seconds), rss (peak, KB), exit, and
+        out (what it printed)
+    """
+
+    # NB: wait4 gives us the child's own rusage
+    start = time.perf_counter()
+    with subprocess.Popen(
+        args,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    ) as proc:
+        out = proc.stdout.read()
+        _pid, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - start
+
+    return {
+        "wall": wall,
+        "cpu": rusage.ru_utime + rusage.ru_stime,
+        "rss": rusage.ru_maxrss,
+        "exit": proc.returncode & 0xFF,
+        "out": out,
+    }
+
+
+# -)
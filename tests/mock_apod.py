@@ -0,0 +1,570 @@
+#! /usr/bin/env python
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: mock_apod.py                                          |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+"""
+A local stand-in for api.nasa.gov and apod.nasa.gov
+
+This server answers api requests with the recorded json in tests/fixtures/apod
+(one file per day) and serves the images they point to from tests/, so the
+whole fetch path can be run (and timed) without the network. The image urls in
+the json are rewritten to point back at this server.
+
+It can be made slow (latency per response, bandwidth for bodies), made to fail
+(every api request gets an error status), and told not to send ETags. It also
+sends the api's rate limit headers and counts requests and bytes, so a test
+can see what a run cost.
+
+To use it by hand, start it and put the url it prints in the config as
+"api_url":
+
+foo@bar:~$ cd [path to project]
+foo@bar:~[path to project] python tests/mock_apod.py [-h]
+
+The benchmarks import it and run it in a thread (see MockServer).
+"""
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# system imports
+import argparse
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from pathlib import Path
+import re
+import threading
+import time
+from urllib import parse
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# where the recorded data lives
+P_DIR_TESTS = Path(__file__).parent.resolve()
+P_DIR_FIXTURES = P_DIR_TESTS / "fixtures/apod"
+P_DIR_IMAGES = P_DIR_TESTS
+
+# paths we answer
+S_PATH_API = "/planetary/apod"
+S_PATH_IMAGE = "/apod/image/"
+
+# the host the recorded json points at, which we replace with our own
+S_HOST_REAL = "https://apod.nasa.gov"
+
+# api query params
+S_PARAM_DATE = "date"
+S_PARAM_START = "start_date"
+S_PARAM_END = "end_date"
+
+# rate limit the api says it has
+I_RATE_LIMIT = 1000
+
+# how much to send at a time when throttling
+I_CHUNK = 16 * 1024
+
+# content types by file ext
+D_TYPES = {
+    ".gif": "image/gif",
+    ".jpeg": "image/jpeg",
+    ".jpg": "image/jpeg",
+    ".png": "image/png",
+}
+S_TYPE_JSON = "application/json"
+S_TYPE_DEF = "application/octet-stream"
+
+# parse "bytes=100-" or "bytes=100-199"
+R_RANGE = r"bytes=(\d+)-(\d*)$"
+
+# format for Last-Modified
+S_FMT_HTTP_DATE = "%a, %d %b %Y %H:%M:%S GMT"
+
+# ------------------------------------------------------------------------------
+# Classes
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# The server
+# ------------------------------------------------------------------------------
+class MockServer(ThreadingHTTPServer):
+    """
+    The server
+
+    The public properties can be changed while the server is running, ie.
+    between two runs of the program:
+
+        today: The date (YYYY-MM-DD) of the json to send when no date is
+        asked for (default: the last day in the fixtures)
+        latency: Seconds to wait before each response (default: 0)
+        bandwidth: Bytes per second to send bodies at, 0 for no limit
+        (default: 0)
+        error: The http status to answer every api request with, 0 for none
+        (default: 0)
+        etag: Whether to send ETags and honor If-None-Match (default: True)
+    """
+
+    # don't hold up the process on exit
+    daemon_threads = True
+
+    # --------------------------------------------------------------------------
+    # Initialize the new object
+    # --------------------------------------------------------------------------
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        dir_fixtures=P_DIR_FIXTURES,
+        dir_images=P_DIR_IMAGES,
+    ):
+        """
+        Initialize the new object
+
+        Args:
+            address: The (host, port) to listen on, port 0 for any free one
+            (default: ("127.0.0.1", 0))
+            dir_fixtures: The dir of recorded json, one YYYY-MM-DD.json per
+            day (default: P_DIR_FIXTURES)
+            dir_images: The dir of images the json points at (default:
+            P_DIR_IMAGES)
+        """
+
+        # do super init
+        super().__init__(address, _Handler)
+
+        # load the days
+        self._dict_days = {}
+        for path_json in sorted(Path(dir_fixtures).glob("*.json")):
+            with open(path_json, "r", encoding="UTF-8") as a_file:
+                self._dict_days[path_json.stem] = json.load(a_file)
+        self._dir_images = Path(dir_images)
+
+        # settings
+        self.today = max(self._dict_days) if self._dict_days else ""
+        self.latency = 0.0
+        self.bandwidth = 0
+        self.error = 0
+        self.etag = True
+
+        # counters
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._bytes = 0
+        self._remaining = I_RATE_LIMIT
+
+    # --------------------------------------------------------------------------
+    # Public methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Get the base url of the server
+    # --------------------------------------------------------------------------
+    def get_url(self):
+        """
+        Get the base url of the server
+
+        Returns:
+            The url, ie. "http://127.0.0.1:8080"
+        """
+
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # --------------------------------------------------------------------------
+    # Get the api url of the server
+    # --------------------------------------------------------------------------
+    def get_api_url(self):
+        """
+        Get the api url of the server
+
+        Returns:
+            The url to put in the config as "api_url"
+        """
+
+        return self.get_url() + S_PATH_API
+
+    # --------------------------------------------------------------------------
+    # Get and reset the counters
+    # --------------------------------------------------------------------------
+    def get_stats(self, reset=True):
+        """
+        Get and reset the counters
+
+        Args:
+            reset: Whether to zero the counters after reading them (default:
+            True)
+
+        Returns:
+            A tuple of (requests, bytes sent)
+        """
+
+        with self._lock:
+            stats = (self._requests, self._bytes)
+            if reset:
+                self._requests = 0
+                self._bytes = 0
+        return stats
+
+    # --------------------------------------------------------------------------
+    # Start serving in a thread
+    # --------------------------------------------------------------------------
+    def start(self):
+        """
+        Start serving in a thread
+
+        Returns:
+            The thread, which stops when shutdown() is called
+        """
+
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    # --------------------------------------------------------------------------
+    # Get the json for one day
+    # --------------------------------------------------------------------------
+    def get_day(self, str_date):
+        """
+        Get the json for one day
+
+        Args:
+            str_date: The date as YYYY-MM-DD
+
+        Returns:
+            The day's dict, with its urls pointing at this server, or None if
+            there is no such day
+        """
+
+        a_dict = self._dict_days.get(str_date)
+        if a_dict is None:
+            return None
+
+        # point the images at us
+        a_dict = dict(a_dict)
+        for key, val in a_dict.items():
+            if isinstance(val, str) and val.startswith(S_HOST_REAL):
+                a_dict[key] = self.get_url() + val[len(S_HOST_REAL) :]
+        return a_dict
+
+    # --------------------------------------------------------------------------
+    # Get the days in a range
+    # --------------------------------------------------------------------------
+    def get_range(self, str_start, str_end):
+        """
+        Get the days in a range
+
+        Args:
+            str_start: The first date as YYYY-MM-DD
+            str_end: The last date as YYYY-MM-DD
+
+        Returns:
+            A list of the day dicts we have in the range
+        """
+
+        return [
+            self.get_day(key)
+            for key in sorted(self._dict_days)
+            if str_start <= key <= str_end
+        ]
+
+    # --------------------------------------------------------------------------
+    # Get the path of an image
+    # --------------------------------------------------------------------------
+    def get_image(self, url_path):
+        """
+        Get the path of an image
+
+        Args:
+            url_path: The path part of the image url
+
+        Returns:
+            The path of the file, or None if we don't have it
+
+        Only the file name is used, the year/month dirs of the real site are
+        ignored.
+        """
+
+        path_img = self._dir_images / Path(url_path).name
+        return path_img if path_img.is_file() else None
+
+    # --------------------------------------------------------------------------
+    # Count a request, and take one off the rate limit if it was to the api
+    # --------------------------------------------------------------------------
+    def count(self, api):
+        """
+        Count a request, and take one off the rate limit if it was to the api
+
+        Args:
+            api: Whether the request was to the api
+
+        Returns:
+            The number of api requests left
+        """
+
+        with self._lock:
+            self._requests += 1
+            if api:
+                self._remaining = max(0, self._remaining - 1)
+            return self._remaining
+
+    # --------------------------------------------------------------------------
+    # Count bytes sent
+    # --------------------------------------------------------------------------
+    def add_bytes(self, count):
+        """
+        Count bytes sent
+
+        Args:
+            count: The number of bytes
+        """
+
+        with self._lock:
+            self._bytes += count
+
+
+# ------------------------------------------------------------------------------
+# Answers one request
+# ------------------------------------------------------------------------------
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Answers one request
+    """
+
+    # keep-alive, like the real servers
+    protocol_version = "HTTP/1.1"
+
+    # --------------------------------------------------------------------------
+    # Answer a GET
+    # --------------------------------------------------------------------------
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Answer a GET
+        """
+
+        # be slow if asked
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        # find what was asked for
+        parts = parse.urlsplit(self.path)
+        if parts.path == S_PATH_API:
+            self._do_api(dict(parse.parse_qsl(parts.query)))
+        elif parts.path.startswith(S_PATH_IMAGE):
+            self._do_image(parts.path)
+        else:
+            self.server.count(False)
+            self._send(404, b"")
+
+    # --------------------------------------------------------------------------
+    # Don't print every request
+    # --------------------------------------------------------------------------
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """
+        Don't print every request
+        """
+
+    # --------------------------------------------------------------------------
+    # Answer an api request
+    # --------------------------------------------------------------------------
+    def _do_api(self, dict_query):
+        """
+        Answer an api request
+
+        Args:
+            dict_query: The query params
+        """
+
+        remaining = self.server.count(True)
+        dict_hdrs = {
+            "X-RateLimit-Limit": str(I_RATE_LIMIT),
+            "X-RateLimit-Remaining": str(remaining),
+        }
+
+        # fail if asked
+        if self.server.error:
+            self._send(self.server.error, b"", dict_hdrs=dict_hdrs)
+            return
+
+        # get the day (or days)
+        if S_PARAM_START in dict_query:
+            data = self.server.get_range(
+                dict_query[S_PARAM_START],
+                dict_query.get(S_PARAM_END, self.server.today),
+            )
+        else:
+            data = self.server.get_day(
+                dict_query.get(S_PARAM_DATE, self.server.today)
+            )
+            if data is None:
+                self._send(404, b"", dict_hdrs=dict_hdrs)
+                return
+        body = json.dumps(data).encode("UTF-8")
+
+        # check the validator
+        if self.server.etag:
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            dict_hdrs["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, b"", dict_hdrs=dict_hdrs)
+                return
+
+        self._send(200, body, S_TYPE_JSON, dict_hdrs)
+
+    # --------------------------------------------------------------------------
+    # Answer an image request
+    # --------------------------------------------------------------------------
+    def _do_image(self, url_path):
+        """
+        Answer an image request
+
+        Args:
+            url_path: The path part of the url
+        """
+
+        self.server.count(False)
+
+        # find the file
+        path_img = self.server.get_image(url_path)
+        if not path_img:
+            self._send(404, b"")
+            return
+        data = path_img.read_bytes()
+        str_type = D_TYPES.get(path_img.suffix.lower(), S_TYPE_DEF)
+        dict_hdrs = {
+            "Accept-Ranges": "bytes",
+            "Last-Modified": time.strftime(
+                S_FMT_HTTP_DATE, time.gmtime(path_img.stat().st_mtime)
+            ),
+        }
+
+        # whole file
+        # NB: also if the client's copy is of some other version
+        str_range = self.headers.get("Range")
+        res = re.match(R_RANGE, str_range or "")
+        str_if = self.headers.get("If-Range")
+        if not res or (str_if and str_if != dict_hdrs["Last-Modified"]):
+            self._send(200, data, str_type, dict_hdrs)
+            return
+
+        # part of the file
+        start = int(res.group(1))
+        end = int(res.group(2)) if res.group(2) else len(data) - 1
+        end = min(end, len(data) - 1)
+        if start > end:
+            dict_hdrs["Content-Range"] = f"bytes */{len(data)}"
+            self._send(416, b"", dict_hdrs=dict_hdrs)
+            return
+        dict_hdrs["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        self._send(206, data[start : end + 1], str_type, dict_hdrs)
+
+    # --------------------------------------------------------------------------
+    # Send a response
+    # --------------------------------------------------------------------------
+    def _send(self, status, body, str_type=S_TYPE_DEF, dict_hdrs=None):
+        """
+        Send a response
+
+        Args:
+            status: The http status
+            body: The body, as bytes
+            str_type: The Content-Type (default: S_TYPE_DEF)
+            dict_hdrs: More headers to send (default: None)
+        """
+
+        # send the headers
+        self.send_response(status)
+        for key, val in (dict_hdrs or {}).items():
+            self.send_header(key, val)
+        if status != 304:
+            self.send_header("Content-Type", str_type)
+            self.send_header("Content-Length", str(len(body)))
+
+        # count the headers
+        # NB: the base class buffers them until end_headers, +2 for the
+        # blank line
+        size = len(b"".join(getattr(self, "_headers_buffer", []))) + 2
+        self.server.add_bytes(size)
+        self.end_headers()
+
+        # send the body, throttled if asked
+        # NB: count each chunk before it goes out, so the count is right as
+        # soon as the client has it
+        bandwidth = self.server.bandwidth
+        for pos in range(0, len(body), I_CHUNK):
+            chunk = body[pos : pos + I_CHUNK]
+            start = time.monotonic()
+            self.server.add_bytes(len(chunk))
+            self.wfile.write(chunk)
+            if bandwidth:
+                wait = len(chunk) / bandwidth - (time.monotonic() - start)
+                if wait > 0:
+                    time.sleep(wait)
+
+
+# ------------------------------------------------------------------------------
+# Public functions
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Run the server from the command line
+# ------------------------------------------------------------------------------
+def main():
+    """
+    Run the server from the command line
+    """
+
+    # get settings
+    parser = argparse.ArgumentParser(
+        description="A local stand-in for the APOD api"
+    )
+    parser.add_argument("--port", type=int, default=8080, help="port")
+    parser.add_argument("--today", help="date to send when none is asked for")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds per response"
+    )
+    parser.add_argument(
+        "--bandwidth", type=int, default=0, help="bytes per second"
+    )
+    parser.add_argument(
+        "--error", type=int, default=0, help="status for every api request"
+    )
+    parser.add_argument(
+        "--no-etag", action="store_true", help="don't send ETags"
+    )
+    args = parser.parse_args()
+
+    # make the server
+    server = MockServer(("127.0.0.1", args.port))
+    if args.today:
+        server.today = args.today
+    server.latency = args.latency
+    server.bandwidth = args.bandwidth
+    server.error = args.error
+    server.etag = not args.no_etag
+
+    # run it
+    print(f'"api_url": "{server.get_api_url()}"')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+# ------------------------------------------------------------------------------
+# Code to run when called from command line
+# ------------------------------------------------------------------------------
+if __name__ == "__main__":
+
+    # Code to run when called from command line
+    main()
+
+# -)